@@ -0,0 +1,156 @@
+"""Microbenchmarks for ``MCPConfigServer``.
+
+Run from the repository root::
+
+    python benchmarks/bench_config_server.py --sizes 1kb 1mb --output config.json
+
+Synthetic configuration directories are generated for each requested size,
+both as a single flat ``configuration`` file and as an include-heavy package
+layout, and the public server methods are timed against them.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Any
+
+from common import load_component_module, time_async, write_results
+from configgen import (
+    SIZES,
+    write_filler_files,
+    write_flat_config,
+    write_include_heavy_config,
+)
+
+
+def runs_for(size_name: str, base_runs: int) -> int:
+    """Scale the number of runs down for the large sizes."""
+    return max(3, base_runs // max(1, SIZES[size_name] // SIZES["100kb"]))
+
+
+async def bench_size(
+    server: Any, thread_server: Any, config_dir: Path, size_name: str, runs: int
+) -> dict:
+    """Benchmark one synthetic size.
+
+    ``thread_server`` never parses in a worker process, for comparison.
+    """
+    flat = write_flat_config(config_dir, size_name)
+    write_include_heavy_config(config_dir, size_name)
+    packages = sorted(
+        path.relative_to(config_dir).as_posix()
+        for path in (config_dir / "packages").glob("*.yaml")
+    )
+    count = runs_for(size_name, runs)
+    counter = iter(range(1 << 30))
+
+    async def read_includes() -> None:
+        for name in packages:
+            await server.read_config_file(name)
+
+    results = {
+        "bytes": (config_dir / flat).stat().st_size,
+        "read_config_file": await time_async(
+            lambda: server.read_config_file(flat), count
+        ),
+        "read_config_file_threads_only": await time_async(
+            lambda: thread_server.read_config_file(flat), count
+        ),
+        "get_config_value": await time_async(
+            lambda: server.get_config_value(flat, "recorder.purge_keep_days"), count
+        ),
+        "set_config_value": await time_async(
+            lambda: server.set_config_value(
+                flat, "recorder.purge_keep_days", next(counter)
+            ),
+            count,
+        ),
+        "read_include_tree": await time_async(read_includes, max(3, count // 10)),
+        "read_config_files": await time_async(
+            lambda: server.read_config_files(packages), max(3, count // 10)
+        ),
+        "read_config_files_threads_only": await time_async(
+            lambda: thread_server.read_config_files(packages), max(3, count // 10)
+        ),
+    }
+
+    # A conditional read of an unchanged file only re-stats it. Files changed
+    # in the last two seconds are always hashed, so backdate the file first.
+    stamp = time.time_ns() - 10 * 10**9
+    os.utime(config_dir / flat, ns=(stamp, stamp))
+    results["file_etag_unchanged"] = await time_async(
+        lambda: server.file_etag(flat), count
+    )
+
+    # Cold build of the key path index, then warm lookups that only re-stat.
+    config_index = load_component_module("config_index")
+    index = config_index.ConfigIndex(config_dir)
+
+    async def build_index() -> None:
+        config_index.ConfigIndex(config_dir).refresh()
+
+    async def find_config() -> None:
+        index.find(key="purge_keep_days")
+
+    results["config_index_build"] = await time_async(build_index, max(3, count // 10))
+    results["find_config"] = await time_async(find_config, count)
+    return results
+
+
+async def run(sizes: list[str], runs: int, filler: int) -> dict[str, Any]:
+    """Run all config server benchmarks."""
+    mcp_server = load_component_module("mcp_server")
+    parse_backend = load_component_module("parse_backend")
+    results: dict[str, Any] = {}
+    for size_name in sizes:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_dir = Path(tmpdir)
+            # Forked, because the loaded modules are not importable by name
+            # in a spawned worker.
+            executor = ProcessPoolExecutor(
+                2, mp_context=multiprocessing.get_context("fork")
+            )
+            server = mcp_server.MCPConfigServer(
+                tmpdir, parser=parse_backend.ParseBackend(executor)
+            )
+            thread_server = mcp_server.MCPConfigServer(
+                tmpdir, parser=parse_backend.ParseBackend(process_min_bytes=1 << 62)
+            )
+            try:
+                results[size_name] = await bench_size(
+                    server, thread_server, config_dir, size_name, runs
+                )
+            finally:
+                executor.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_filler_files(Path(tmpdir), filler)
+        server = mcp_server.MCPConfigServer(tmpdir)
+        results["list_config_files"] = {
+            "files": filler,
+            **await time_async(server.list_config_files, runs),
+        }
+    return results
+
+
+def main() -> None:
+    """Parse arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=list(SIZES))
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--filler", type=int, default=2000)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.runs, args.filler))
+    write_results("config_server", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
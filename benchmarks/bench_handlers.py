@@ -0,0 +1,91 @@
+"""Benchmark the service handlers against a large synthetic ``hass``.
+
+Requires Home Assistant to be importable. Run from the repository root::
+
+    python benchmarks/bench_handlers.py --entities 50000 --devices 5000 --output handlers.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+import tempfile
+from typing import Any
+
+from common import time_async, write_results
+from fake_hass import build_fake_hass, patched_registries, service_call
+
+
+async def run(entities: int, devices: int, runs: int) -> dict[str, Any]:
+    """Run every data handler against the fake instance."""
+    from custom_components.ha_mcp_server import data_handlers
+    from custom_components.ha_mcp_server.history_cache import HistoryCache
+    from custom_components.ha_mcp_server.home_index import HomeIndex
+    from custom_components.ha_mcp_server.mcp_server import MCPConfigServer
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        hass = build_fake_hass(entities=entities, devices=devices, config_dir=tmpdir)
+        entry_data = {
+            "server": MCPConfigServer(tmpdir),
+            "index": HomeIndex(hass),
+            "history": HistoryCache(),
+            "loop_budget": 0.005,
+        }
+        some_entity = next(iter(hass.entity_registry.entities))
+        some_device = next(iter(hass.device_registry.devices))
+
+        cases = {
+            "list_users": (data_handlers.handle_list_users, {}),
+            "list_integrations": (data_handlers.handle_list_integrations, {}),
+            "list_devices": (data_handlers.handle_list_devices, {}),
+            "list_devices_domain": (data_handlers.handle_list_devices, {"domain": "hue"}),
+            "get_device": (data_handlers.handle_get_device, {"device_id": some_device}),
+            "list_entities": (data_handlers.handle_list_entities, {}),
+            "list_entities_domain": (
+                data_handlers.handle_list_entities, {"domain": "light"}
+            ),
+            "get_entity": (data_handlers.handle_get_entity, {"entity_id": some_entity}),
+            "get_entity_history": (
+                data_handlers.handle_get_entity_history, {"entity_id": some_entity}
+            ),
+        }
+
+        results: dict[str, Any] = {"entities": entities, "devices": devices}
+        with patched_registries(hass):
+            for name, (handler, data) in cases.items():
+                call = service_call(**data)
+                results[name] = await time_async(
+                    lambda handler=handler, call=call: handler(hass, entry_data, call),
+                    runs,
+                )
+            # Conditional listings answered from the change log revision; the
+            # revision is only handed out once the index is built.
+            await entry_data["index"].async_ensure_ready(entry_data["loop_budget"])
+            for name in ("list_devices", "list_entities"):
+                handler, data = cases[name]
+                response = await handler(
+                    hass, entry_data, service_call(**data, include_etag=True)
+                )
+                call = service_call(**data, if_none_match=response["etag"])
+                results[f"{name}_not_modified"] = await time_async(
+                    lambda handler=handler, call=call: handler(hass, entry_data, call),
+                    runs,
+                )
+    return results
+
+
+def main() -> None:
+    """Parse arguments and run the handler benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=50_000)
+    parser.add_argument("--devices", type=int, default=5_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.entities, args.devices, args.runs))
+    write_results("handlers", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
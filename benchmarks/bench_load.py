@@ -0,0 +1,406 @@
+"""Load-test the service handlers with many concurrent clients on a fake ``hass``.
+
+Requires Home Assistant to be importable. Run from the repository root::
+
+    python benchmarks/bench_load.py --rates 50 100 200 --duration 20 --output load.json
+
+Each target rate is one stage. Calls arrive as a Poisson process at that rate
+and are drawn from a weighted mix of operations, for example
+``--mix get_entity=60,get_entity_history=20,get_config_value=15,set_config_value=5``.
+A call takes the same path as a real service call: the service schema, then
+the callback ``async_register_services`` would register, with admission by
+the scheduler, metrics and the handler itself.
+
+At most ``--clients`` calls are in flight at once. An arrival while every
+client is waiting for an answer is counted as missed, as no client would send
+it. Every ``--interval`` seconds a sample records the throughput, p50 and p99
+latency per operation, errors, event loop lag and resident memory, so the
+timeline shows the rate at which latency collapses.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Any
+
+import yaml
+
+from common import write_results
+from fake_hass import DOMAINS, build_fake_hass, patched_registries, service_call
+
+CONFIG_FILE = "load_test.yaml"
+CONFIG_KEYS = 200
+DEFAULT_MIX = (
+    "get_entity=50,list_entities=5,get_entity_history=20,"
+    "get_config_value=20,set_config_value=5"
+)
+# How often the event loop lag probe wakes up.
+LAG_PROBE_INTERVAL = 0.01
+
+
+@dataclass
+class Fixture:
+    """Ids the request builders draw from."""
+
+    entity_ids: list[str]
+    history_ids: list[str]
+
+
+OPERATIONS: dict[str, Callable[[random.Random, Fixture], dict[str, Any]]] = {
+    "get_entity": lambda rng, fixture: {"entity_id": rng.choice(fixture.entity_ids)},
+    "list_entities": lambda rng, fixture: {"domain": rng.choice(DOMAINS)},
+    "get_entity_history": lambda rng, fixture: {
+        "entity_id": rng.choice(fixture.history_ids)
+    },
+    "get_config_value": lambda rng, fixture: {
+        "filename": CONFIG_FILE,
+        "key_path": f"load.key_{rng.randrange(CONFIG_KEYS)}",
+    },
+    "set_config_value": lambda rng, fixture: {
+        "filename": CONFIG_FILE,
+        "key_path": f"load.key_{rng.randrange(CONFIG_KEYS)}",
+        "value": rng.randrange(1000),
+    },
+}
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Parse ``name=weight,...`` into operation weights."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}"
+            )
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def rss_bytes() -> int:
+    """Return the resident set size, or the peak where it is not available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            return int(file.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentile_ms(ordered: list[float], fraction: float) -> float | None:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+
+class Window:
+    """Latencies, errors and loop lag observed over one period."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.missed = 0
+        self.lags: list[float] = []
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize the window; latencies and lags in milliseconds."""
+        seconds = time.perf_counter() - self.started
+        overall = sorted(
+            latency for latencies in self.latencies.values() for latency in latencies
+        )
+        lags = sorted(self.lags)
+        return {
+            "seconds": seconds,
+            "completed": len(overall),
+            "throughput": len(overall) / seconds if seconds else 0.0,
+            "p50_ms": _percentile_ms(overall, 0.50),
+            "p99_ms": _percentile_ms(overall, 0.99),
+            "operations": {
+                name: {
+                    "completed": len(latencies),
+                    "p50_ms": _percentile_ms(sorted(latencies), 0.50),
+                    "p99_ms": _percentile_ms(sorted(latencies), 0.99),
+                }
+                for name, latencies in self.latencies.items()
+            },
+            "errors": dict(self.errors),
+            "missed": self.missed,
+            "loop_lag_p99_ms": _percentile_ms(lags, 0.99),
+            "loop_lag_max_ms": lags[-1] * 1000 if lags else None,
+            "rss_mb": rss_bytes() / 2**20,
+        }
+
+
+class Recorder:
+    """Feed every observation to the current window and the stage total."""
+
+    def __init__(self) -> None:
+        self.total = Window()
+        self.current = Window()
+
+    def latency(self, name: str, seconds: float) -> None:
+        self.total.latencies[name].append(seconds)
+        self.current.latencies[name].append(seconds)
+
+    def error(self, name: str, err: Exception) -> None:
+        key = f"{name}:{type(err).__name__}"
+        self.total.errors[key] += 1
+        self.current.errors[key] += 1
+
+    def missed(self) -> None:
+        self.total.missed += 1
+        self.current.missed += 1
+
+    def lag(self, seconds: float) -> None:
+        self.total.lags.append(seconds)
+        self.current.lags.append(seconds)
+
+    def rotate(self) -> dict[str, Any]:
+        """Close the current window and return its summary."""
+        window, self.current = self.current, Window()
+        return window.summary()
+
+
+class LocalTransport:
+    """Dispatch calls by service name the way Home Assistant would."""
+
+    def __init__(self, hass: Any, entry_data: dict[str, Any]) -> None:
+        from custom_components.ha_mcp_server.services import (
+            SERVICES,
+            _make_service_callback,
+        )
+
+        self._services = {
+            service.name: (
+                service.schema,
+                _make_service_callback(hass, entry_data, service),
+            )
+            for service in SERVICES
+        }
+
+    async def call(self, name: str, data: dict[str, Any]) -> Any:
+        """Validate ``data`` and call service ``name`` with it."""
+        schema, callback = self._services[name]
+        return await callback(service_call(**schema(data)))
+
+
+def build_entry_data(hass: Any, config_dir: str) -> dict[str, Any]:
+    """Build the same entry data ``async_setup_entry`` does, without storage."""
+    from custom_components.ha_mcp_server.config_index import ConfigIndex
+    from custom_components.ha_mcp_server.const import DEFAULT_LOOP_BUDGET
+    from custom_components.ha_mcp_server.history_cache import HistoryCache
+    from custom_components.ha_mcp_server.home_index import HomeIndex
+    from custom_components.ha_mcp_server.mcp_server import MCPConfigServer
+    from custom_components.ha_mcp_server.metrics import MetricsRegistry
+    from custom_components.ha_mcp_server.profiler import SamplingProfiler
+    from custom_components.ha_mcp_server.scheduler import OperationScheduler
+    from custom_components.ha_mcp_server.template_cache import TemplateCache
+    from custom_components.ha_mcp_server.watchdog import LoopWatchdog
+
+    return {
+        "server": MCPConfigServer(config_dir),
+        "metrics": MetricsRegistry(),
+        "profiler": SamplingProfiler(),
+        "scheduler": OperationScheduler(),
+        "index": HomeIndex(hass),
+        "history": HistoryCache(),
+        "templates": TemplateCache(),
+        "config_index": ConfigIndex(Path(config_dir)),
+        "watchdog": LoopWatchdog(),
+        "loop_budget": DEFAULT_LOOP_BUDGET / 1000,
+    }
+
+
+async def _call(
+    transport: LocalTransport, recorder: Recorder, name: str, data: dict[str, Any]
+) -> None:
+    start = time.perf_counter()
+    try:
+        await transport.call(name, data)
+    except Exception as err:  # noqa: BLE001 - counted per operation
+        recorder.error(name, err)
+        return
+    recorder.latency(name, time.perf_counter() - start)
+
+
+async def _probe_lag(recorder: Recorder, stop: asyncio.Event) -> None:
+    """Record how late the event loop wakes a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        recorder.lag(max(0.0, loop.time() - start - LAG_PROBE_INTERVAL))
+
+
+async def _sample(
+    recorder: Recorder,
+    timeline: list[dict[str, Any]],
+    interval: float,
+    rate: float,
+    stop: asyncio.Event,
+) -> None:
+    """Close a window every ``interval`` seconds until the stage stops."""
+    started = time.perf_counter()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except TimeoutError:
+            pass
+        sample = {"t": time.perf_counter() - started, **recorder.rotate()}
+        timeline.append(sample)
+        print(
+            f"rate {rate:g}/s t={sample['t']:5.1f}s "
+            f"done={sample['throughput']:7.1f}/s "
+            f"p50={sample['p50_ms'] or 0:7.1f}ms p99={sample['p99_ms'] or 0:7.1f}ms "
+            f"lag={sample['loop_lag_max_ms'] or 0:6.1f}ms "
+            f"missed={sample['missed']} errors={sum(sample['errors'].values())} "
+            f"rss={sample['rss_mb']:.0f}MB",
+            file=sys.stderr,
+        )
+
+
+async def run_stage(
+    transport: LocalTransport,
+    fixture: Fixture,
+    mix: dict[str, float],
+    rate: float,
+    clients: int,
+    duration: float,
+    interval: float,
+    rng: random.Random,
+) -> dict[str, Any]:
+    """Offer calls at ``rate`` per second for ``duration`` seconds."""
+    recorder = Recorder()
+    timeline: list[dict[str, Any]] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_lag(recorder, stop))
+    sampler = asyncio.create_task(_sample(recorder, timeline, interval, rate, stop))
+    names, weights = list(mix), list(mix.values())
+    in_flight: set[asyncio.Task[None]] = set()
+    offered = 0
+
+    loop = asyncio.get_running_loop()
+    arrival = loop.time()
+    end = arrival + duration
+    while (arrival := arrival + rng.expovariate(rate)) < end:
+        # Arrivals keep to their schedule; a late loop sends them in a burst.
+        if (delay := arrival - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        offered += 1
+        if len(in_flight) >= clients:
+            recorder.missed()
+            continue
+        name = rng.choices(names, weights)[0]
+        task = asyncio.create_task(
+            _call(transport, recorder, name, OPERATIONS[name](rng, fixture))
+        )
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    stop.set()
+    await asyncio.gather(probe, sampler)
+    return {
+        "target_rate": rate,
+        "offered": offered,
+        "total": recorder.total.summary(),
+        "timeline": timeline,
+    }
+
+
+async def run(
+    entities: int,
+    devices: int,
+    rates: list[float],
+    mix: dict[str, float],
+    clients: int,
+    duration: float,
+    interval: float,
+    history_entities: int,
+    seed: int,
+) -> dict[str, Any]:
+    """Run one stage per rate against a single fake instance."""
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        hass = build_fake_hass(entities=entities, devices=devices, config_dir=tmpdir)
+        values = {f"key_{index}": index for index in range(CONFIG_KEYS)}
+        (Path(tmpdir) / CONFIG_FILE).write_text(yaml.safe_dump({"load": values}))
+        entity_ids = list(hass.entity_registry.entities)
+        fixture = Fixture(entity_ids, entity_ids[:history_entities])
+
+        entry_data = build_entry_data(hass, tmpdir)
+        transport = LocalTransport(hass, entry_data)
+        entry_data["watchdog"].start(asyncio.get_running_loop())
+        stages = []
+        with patched_registries(hass):
+            for rate in rates:
+                stages.append(
+                    await run_stage(
+                        transport, fixture, mix, rate, clients, duration, interval, rng
+                    )
+                )
+        entry_data["watchdog"].stop()
+        entry_data["server"].close()
+    return {
+        "entities": entities,
+        "devices": devices,
+        "clients": clients,
+        "mix": mix,
+        "stages": stages,
+        "metrics": entry_data["metrics"].as_dict(),
+        "scheduler": entry_data["scheduler"].as_dict(),
+        "loop_watchdog": entry_data["watchdog"].as_dict(),
+    }
+
+
+def main() -> None:
+    """Parse arguments and run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=10_000)
+    parser.add_argument("--devices", type=int, default=1_000)
+    parser.add_argument(
+        "--rates", type=float, nargs="+", default=[25, 50, 100, 200],
+        help="target calls per second, one stage each",
+    )
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per stage")
+    parser.add_argument("--interval", type=float, default=1, help="seconds per sample")
+    parser.add_argument(
+        "--history-entities", type=int, default=200,
+        help="entities get_entity_history asks about",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run(
+            args.entities,
+            args.devices,
+            args.rates,
+            args.mix,
+            args.clients,
+            args.duration,
+            args.interval,
+            args.history_entities,
+            args.seed,
+        )
+    )
+    write_results("load", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Measure the memory the registry indexes hold per 10k entities.
+
+Run from the repository root::
+
+    python benchmarks/bench_memory.py --entities 50000 --output memory.json
+
+A synthetic registry and state machine are built first and left out of the
+measurement, since Home Assistant holds them anyway. The area/device/entity
+graph, the field indexes and the search index are then filled the way
+``HomeIndex`` fills them, and ``tracemalloc`` reports what each one added.
+Home Assistant is not needed.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+from pathlib import Path
+import time
+import tracemalloc
+from typing import Any
+
+from common import load_component_module, write_results
+from fake_hass import build_fake_hass
+
+
+def _search_fields(graph: Any, entry: Any) -> dict[str, str | None]:
+    """Return the searchable text of an entity, as ``HomeIndex`` builds it."""
+    fields: dict[str, str | None] = {
+        "entity_id": entry.entity_id,
+        "name": entry.name,
+        "original_name": entry.original_name,
+    }
+    if entry.device_id is not None and (device := graph.devices.get(entry.device_id)):
+        fields["device"] = device.name
+        fields["manufacturer"] = device.manufacturer
+        fields["model"] = device.model
+    if (area_id := graph.entity_area(entry.entity_id)) is not None:
+        fields["area"] = graph.areas.get(area_id)
+    return fields
+
+
+def run(entities: int, devices: int) -> dict[str, Any]:
+    """Fill each index in turn and report the memory it added."""
+    entity_query = load_component_module("entity_query")
+    search_index = load_component_module("search_index")
+    topology = load_component_module("topology")
+
+    hass = build_fake_hass(entities=entities, devices=devices)
+    registry = hass.entity_registry.entities
+    gc.collect()
+    tracemalloc.start()
+    results: dict[str, Any] = {"entities": entities, "devices": devices}
+    per_10k = 10_000 / entities
+
+    def measure(name: str, fill: Any) -> Any:
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        built = fill()
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        added = tracemalloc.get_traced_memory()[0] - before
+        results[name] = {
+            "bytes": added,
+            "mb_per_10k_entities": added * per_10k / 2**20,
+            "build_ms": elapsed * 1000,
+        }
+        return built
+
+    def fill_graph() -> Any:
+        graph = topology.TopologyGraph()
+        for area_id, area in hass.area_registry.areas.items():
+            graph.set_area(area_id, area.name)
+        for device_id, device in hass.device_registry.devices.items():
+            graph.set_device(
+                device_id,
+                topology.DeviceNode(
+                    device.name_by_user or device.name,
+                    device.manufacturer,
+                    device.model,
+                    device.area_id,
+                ),
+            )
+        for entity_id, entry in registry.items():
+            graph.set_entity(
+                entity_id, entry.name or entry.original_name, entry.device_id, entry.area_id
+            )
+        return graph
+
+    def fill_fields() -> Any:
+        fields = {name: entity_query.FieldIndex() for name in entity_query.INDEXED_FIELDS}
+        for entity_id, entry in registry.items():
+            state = hass.states.get(entity_id)
+            fields["domain"].set(entity_id, entity_id.partition(".")[0])
+            fields["platform"].set(entity_id, entry.platform)
+            fields["area_id"].set(entity_id, graph.entity_area(entity_id))
+            fields["device_class"].set(
+                entity_id, entry.device_class or entry.original_device_class
+            )
+            fields["state"].set(entity_id, state.state)
+        return fields
+
+    def fill_search() -> Any:
+        search = search_index.SearchIndex()
+        for entity_id, entry in registry.items():
+            search.upsert(entity_id, _search_fields(graph, entry))
+        return search
+
+    graph = measure("graph", fill_graph)
+    measure("fields", fill_fields)
+    measure("search", fill_search)
+    total = sum(results[name]["bytes"] for name in ("graph", "fields", "search"))
+    results["total_mb_per_10k_entities"] = total * per_10k / 2**20
+    tracemalloc.stop()
+    return results
+
+
+def main() -> None:
+    """Parse arguments and run the memory benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=50_000)
+    parser.add_argument("--devices", type=int, default=5_000)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    write_results("memory", run(args.entities, args.devices), args.output)
+
+
+if __name__ == "__main__":
+    main()
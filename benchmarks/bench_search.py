@@ -0,0 +1,120 @@
+"""Microbenchmarks for the fuzzy entity search index.
+
+Run from the repository root::
+
+    python benchmarks/bench_search.py --entities 25000 --output search.json
+
+A synthetic registry of the requested size is indexed, then a fixed set of
+queries (exact words, multi-word, typos and prefixes) is timed against it,
+along with the cost of one incremental update.
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import time
+from typing import Any
+
+from common import load_component_module, time_sync, write_results
+
+ROOMS = (
+    "kitchen", "living room", "bedroom", "bathroom", "hallway", "garage",
+    "office", "attic", "basement", "porch", "garden", "laundry", "nursery",
+    "dining room", "guest room", "pantry", "study", "patio", "driveway", "shed",
+)
+FLOORS = ("ground floor", "first floor", "second floor", "annex", "cottage")
+KINDS = {
+    "light": ("ceiling", "lamp", "spot", "strip", "pendant", "sconce"),
+    "sensor": ("temperature", "humidity", "illuminance", "power", "energy", "battery"),
+    "binary_sensor": ("motion", "door", "window", "occupancy", "leak", "smoke"),
+    "switch": ("outlet", "plug", "fan", "heater", "pump", "charger"),
+    "cover": ("blind", "shade", "curtain", "garage door", "awning", "shutter"),
+}
+VENDORS = (
+    ("Signify", "Hue White"), ("IKEA", "Tradfri"), ("Aqara", "Motion P1"),
+    ("Shelly", "Plus 1PM"), ("Sonoff", "S31"), ("Ecobee", "SmartSensor"),
+)
+QUERIES = (
+    "kitchen",
+    "temperature",
+    "kitchen light",
+    "garage door",
+    "first floor bedroom motion",
+    "temprature",
+    "livng rom lamp",
+    "hum",
+    "shelly plug office",
+)
+
+
+def build_documents(count: int, seed: int = 0) -> list[tuple[str, dict[str, str]]]:
+    """Return ``count`` synthetic entity documents."""
+    rng = random.Random(seed)
+    areas = [f"{floor} {room}" for floor in FLOORS for room in ROOMS]
+    documents = []
+    for number in range(count):
+        domain = rng.choice(tuple(KINDS))
+        kind = rng.choice(KINDS[domain])
+        area = rng.choice(areas)
+        manufacturer, model = rng.choice(VENDORS)
+        name = f"{area} {kind}".title()
+        slug = f"{area} {kind} {number}".replace(" ", "_")
+        documents.append(
+            (
+                f"{domain}.{slug}",
+                {
+                    "entity_id": f"{domain}.{slug}",
+                    "name": name,
+                    "device": f"{name} {model}",
+                    "area": area.title(),
+                    "manufacturer": manufacturer,
+                    "model": model,
+                },
+            )
+        )
+    return documents
+
+
+def run(entities: int, runs: int) -> dict[str, Any]:
+    """Run all search benchmarks."""
+    search_index = load_component_module("search_index")
+    documents = build_documents(entities)
+    index = search_index.SearchIndex()
+    start = time.perf_counter()
+    for doc_id, fields in documents:
+        index.upsert(doc_id, fields)
+    results: dict[str, Any] = {
+        "entities": entities,
+        "build_ms": (time.perf_counter() - start) * 1000,
+    }
+    for query in QUERIES:
+        # Clear the expansion cache so typo expansion is part of every run.
+        def search(query: str = query) -> None:
+            index._expansions.clear()  # pylint: disable=protected-access
+            index.search(query, 10)
+
+        results[f"search[{query}]"] = time_sync(search, runs)
+
+    doc_id, fields = documents[0]
+    renamed = {**fields, "name": "Renamed Entity"}
+    flip = iter(range(1 << 30))
+    results["upsert"] = time_sync(
+        lambda: index.upsert(doc_id, renamed if next(flip) % 2 else fields), runs
+    )
+    return results
+
+
+def main() -> None:
+    """Parse arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=25_000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    write_results("search", run(args.entities, args.runs), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Measure how long the integration takes to import and set up.
+
+Run from the repository root with Home Assistant installed::
+
+    python benchmarks/bench_setup.py --runs 200 --output setup.json
+
+Three numbers are reported, all against a minimal fake ``hass`` object:
+- the cold import time of the integration package, in a fresh interpreter
+- the first ``async_setup_entry`` in a fresh interpreter, after the package
+  import; anything setup imports or initializes lazily shows up here, since
+  Home Assistant runs setup on the event loop
+- the wall time of repeated ``async_setup_entry`` calls in a warm process
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from common import ROOT, summarize, write_results
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); "
+    "import custom_components.ha_mcp_server; "
+    "print(time.perf_counter() - t)"
+)
+SETUP_SNIPPET = (
+    "import asyncio, sys; sys.path.insert(0, 'benchmarks'); "
+    "import bench_setup; print(asyncio.run(bench_setup.measure_first_setup()))"
+)
+
+
+def measure_cold_import(runs: int) -> list[float]:
+    """Import the integration in fresh interpreters and return the timings."""
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        timings.append(float(out.stdout.strip()))
+    return timings
+
+
+def measure_cold_setup(runs: int) -> list[float]:
+    """Time the first setup in fresh interpreters and return the timings."""
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", SETUP_SNIPPET],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+async def measure_first_setup() -> float:
+    """Import the integration, then time its first ``async_setup_entry``."""
+    from custom_components.ha_mcp_server import async_setup_entry, async_unload_entry
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = make_fake_hass(config_dir)
+        entry = MagicMock()
+        entry.entry_id = "bench_cold"
+        entry.options = {}
+        start = time.perf_counter()
+        await async_setup_entry(hass, entry)
+        elapsed = time.perf_counter() - start
+        await async_unload_entry(hass, entry)
+    return elapsed
+
+
+def make_fake_hass(config_dir: str) -> MagicMock:
+    """Create the smallest hass stand-in that async_setup_entry touches."""
+    hass = MagicMock()
+    hass.data = {}
+    hass.config.path = MagicMock(return_value=config_dir)
+    hass.config_entries.async_forward_entry_setups = AsyncMock(return_value=True)
+    hass.config_entries.async_unload_platforms = AsyncMock(return_value=True)
+    hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+    return hass
+
+
+async def measure_setup(runs: int) -> list[float]:
+    """Run async_setup_entry/async_unload_entry repeatedly and time the setup."""
+    from custom_components.ha_mcp_server import async_setup_entry, async_unload_entry
+
+    timings = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        for index in range(runs):
+            hass = make_fake_hass(config_dir)
+            entry = MagicMock()
+            entry.entry_id = f"bench_{index}"
+            entry.options = {}
+            start = time.perf_counter()
+            await async_setup_entry(hass, entry)
+            timings.append(time.perf_counter() - start)
+            await async_unload_entry(hass, entry)
+    return timings
+
+
+def main() -> None:
+    """Run the setup benchmark and print or store the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = {
+        "cold_import": summarize(measure_cold_import(args.import_runs)),
+        "cold_async_setup_entry": summarize(measure_cold_setup(args.import_runs)),
+        "async_setup_entry": summarize(asyncio.run(measure_setup(args.runs))),
+    }
+    write_results("setup", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Shared helpers for the benchmark scripts."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import importlib
+import json
+from pathlib import Path
+import platform
+import statistics
+import sys
+import time
+from types import ModuleType
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+COMPONENT_DIR = ROOT / "custom_components" / "ha_mcp_server"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def load_component_module(name: str) -> ModuleType:
+    """Import an integration module without running the package ``__init__``.
+
+    The package ``__init__`` needs Home Assistant; the modules benchmarked here
+    do not, so they are imported into a bare package of their own.
+    """
+    if "ha_mcp_server" not in sys.modules:
+        package = ModuleType("ha_mcp_server")
+        package.__path__ = [str(COMPONENT_DIR)]
+        sys.modules["ha_mcp_server"] = package
+    return importlib.import_module(f"ha_mcp_server.{name}")
+
+
+def summarize(timings: list[float]) -> dict[str, float]:
+    """Summarize a list of timings (in seconds) as milliseconds."""
+    ordered = sorted(timings)
+    count = len(ordered)
+    return {
+        "runs": count,
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p95_ms": ordered[max(0, int(count * 0.95) - 1)] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def time_async(
+    func: Callable[[], Awaitable[Any]], runs: int, warmup: int = 1
+) -> dict[str, float]:
+    """Time an async callable ``runs`` times after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        await func()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def time_sync(func: Callable[[], Any], runs: int, warmup: int = 1) -> dict[str, float]:
+    """Time a synchronous callable the same way as ``time_async``."""
+    return asyncio.run(time_async(_as_async(func), runs, warmup))
+
+
+def _as_async(func: Callable[[], Any]) -> Callable[[], Awaitable[Any]]:
+    async def _call() -> Any:
+        return func()
+
+    return _call
+
+
+def environment() -> dict[str, str]:
+    """Describe the machine the benchmark ran on."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def write_results(name: str, results: dict[str, Any], output: Path | None) -> None:
+    """Print results as JSON and optionally store them for ``compare.py``."""
+    document = {
+        "benchmark": name,
+        "timestamp": time.time(),
+        "environment": environment(),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2, sort_keys=True)
+    if output is not None:
+        output.write_text(text)
+    print(text)
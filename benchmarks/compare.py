@@ -0,0 +1,83 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage::
+
+    python benchmarks/compare.py baseline.json candidate.json --threshold 0.10
+
+Every ``median_ms`` value present in both files is compared. The script exits
+with status 1 when any of them got slower by more than ``threshold``.
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterator
+import json
+from pathlib import Path
+import sys
+from typing import Any
+
+METRIC = "median_ms"
+
+
+def iter_metrics(node: Any, prefix: str = "") -> Iterator[tuple[str, float]]:
+    """Yield ``(path, value)`` for every ``METRIC`` in a results tree."""
+    if not isinstance(node, dict):
+        return
+    for key, value in node.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if key == METRIC and isinstance(value, (int, float)):
+            yield prefix, float(value)
+        else:
+            yield from iter_metrics(value, path)
+
+
+def compare(
+    baseline: dict[str, Any], candidate: dict[str, Any], threshold: float
+) -> list[dict[str, Any]]:
+    """Return one row per metric present in both documents."""
+    before = dict(iter_metrics(baseline.get("results", {})))
+    after = dict(iter_metrics(candidate.get("results", {})))
+    rows = []
+    for path in sorted(before.keys() & after.keys()):
+        old, new = before[path], after[path]
+        change = (new - old) / old if old else 0.0
+        rows.append(
+            {
+                "metric": path,
+                "baseline_ms": old,
+                "candidate_ms": new,
+                "change": change,
+                "regression": change > threshold,
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    """Compare two result files and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--json", action="store_true", help="emit rows as JSON")
+    args = parser.parse_args()
+
+    rows = compare(
+        json.loads(args.baseline.read_text()),
+        json.loads(args.candidate.read_text()),
+        args.threshold,
+    )
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(
+                f"{row['metric']:<50} {row['baseline_ms']:>10.3f} "
+                f"{row['candidate_ms']:>10.3f} {row['change']:>+8.1%} {flag}"
+            )
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
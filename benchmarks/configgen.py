@@ -0,0 +1,106 @@
+"""Generate synthetic Home Assistant configuration directories."""
+from __future__ import annotations
+
+from pathlib import Path
+import random
+
+import yaml
+
+SIZES = {
+    "1kb": 1 << 10,
+    "100kb": 100 << 10,
+    "1mb": 1 << 20,
+    "10mb": 10 << 20,
+    "50mb": 50 << 20,
+}
+
+
+def _automation(rng: random.Random, index: int) -> dict:
+    return {
+        "id": f"auto_{index}",
+        "alias": f"Synthetic automation {index}",
+        "trigger": [
+            {
+                "platform": "state",
+                "entity_id": f"binary_sensor.motion_{rng.randrange(500)}",
+                "to": "on",
+            }
+        ],
+        "condition": [
+            {
+                "condition": "numeric_state",
+                "entity_id": f"sensor.lux_{rng.randrange(500)}",
+                "below": rng.randrange(10, 200),
+            }
+        ],
+        "action": [
+            {
+                "service": "light.turn_on",
+                "target": {"entity_id": f"light.room_{rng.randrange(500)}"},
+                "data": {"brightness_pct": rng.randrange(1, 100)},
+            }
+        ],
+        "mode": "single",
+    }
+
+
+def automations_yaml(target_bytes: int, seed: int = 0) -> str:
+    """Return an automations document of roughly ``target_bytes``."""
+    rng = random.Random(seed)
+    sample = yaml.dump([_automation(rng, 0)], default_flow_style=False)
+    count = max(1, target_bytes // len(sample))
+    return yaml.dump(
+        [_automation(rng, index) for index in range(count)],
+        default_flow_style=False,
+    )
+
+
+def write_flat_config(config_dir: Path, size_name: str, seed: int = 0) -> str:
+    """Write ``configuration.yaml`` with all content inline and return its name."""
+    body = {
+        "homeassistant": {"name": "Benchmark Home", "unit_system": "metric"},
+        "recorder": {"purge_keep_days": 10},
+    }
+    text = yaml.dump(body, default_flow_style=False)
+    text += "automation:\n"
+    automations = automations_yaml(SIZES[size_name], seed)
+    text += "".join(f"  {line}\n" for line in automations.splitlines())
+    filename = f"configuration_{size_name}.yaml"
+    (config_dir / filename).write_text(text)
+    return filename
+
+
+def write_include_heavy_config(
+    config_dir: Path, size_name: str, files: int = 200, seed: int = 0
+) -> str:
+    """Write a package-style layout that spreads content over many includes.
+
+    ``configuration.yaml`` only holds ``!include`` references; the content is
+    split across ``files`` package files under ``packages/``.
+    """
+    packages = config_dir / "packages"
+    packages.mkdir(exist_ok=True)
+    per_file = max(1, SIZES[size_name] // files)
+    for index in range(files):
+        (packages / f"package_{index:04d}.yaml").write_text(
+            "automation:\n"
+            + "".join(
+                f"  {line}\n"
+                for line in automations_yaml(per_file, seed + index).splitlines()
+            )
+        )
+    filename = f"configuration_includes_{size_name}.yaml"
+    (config_dir / filename).write_text(
+        "homeassistant:\n"
+        "  name: Benchmark Home\n"
+        "  packages: !include_dir_named packages\n"
+        "recorder:\n"
+        "  purge_keep_days: 10\n"
+    )
+    return filename
+
+
+def write_filler_files(config_dir: Path, count: int) -> None:
+    """Write ``count`` small config files so directory listings have work to do."""
+    for index in range(count):
+        (config_dir / f"filler_{index:05d}.yaml").write_text(f"value: {index}\n")
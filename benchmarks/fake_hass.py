@@ -0,0 +1,320 @@
+"""A synthetic, in-memory stand-in for ``hass`` used by the benchmarks.
+
+Only the attributes the integration's handlers touch are implemented. The
+registries are plain objects populated deterministically from a seed so runs
+are comparable between machines and commits.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone
+import random
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+DOMAINS = ("light", "switch", "sensor", "binary_sensor", "climate", "cover", "media_player")
+PLATFORMS = ("hue", "zha", "mqtt", "esphome", "shelly", "tasmota")
+DEVICE_CLASSES = {
+    "sensor": ("temperature", "humidity", "power", "energy", "illuminance"),
+    "binary_sensor": ("motion", "door", "window", "occupancy"),
+}
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeState:
+    """Minimal replica of ``homeassistant.core.State``."""
+
+    __slots__ = ("entity_id", "state", "attributes", "last_changed", "last_updated")
+
+    def __init__(self, entity_id: str, state: str, attributes: dict[str, Any]) -> None:
+        self.entity_id = entity_id
+        self.state = state
+        self.attributes = attributes
+        self.last_changed = BASE_TIME
+        self.last_updated = BASE_TIME
+
+    @property
+    def domain(self) -> str:
+        return self.entity_id.split(".", 1)[0]
+
+
+class FakeStates:
+    """Replica of the state machine lookups used by the handlers."""
+
+    def __init__(self) -> None:
+        self._states: dict[str, FakeState] = {}
+
+    def get(self, entity_id: str) -> FakeState | None:
+        return self._states.get(entity_id)
+
+    def async_entity_ids(self, domain: str | None = None) -> list[str]:
+        return [state.entity_id for state in self.async_all(domain)]
+
+    def async_all(self, domain: str | None = None) -> list[FakeState]:
+        if domain is None:
+            return list(self._states.values())
+        return [state for state in self._states.values() if state.domain == domain]
+
+    def async_set(
+        self, entity_id: str, state: str, attributes: dict[str, Any] | None = None
+    ) -> None:
+        self._states[entity_id] = FakeState(entity_id, state, attributes or {})
+
+
+class FakeEntityRegistry:
+    """Replica of ``EntityRegistry`` lookups."""
+
+    def __init__(self) -> None:
+        self.entities: dict[str, SimpleNamespace] = {}
+
+    def async_get(self, entity_id: str) -> SimpleNamespace | None:
+        return self.entities.get(entity_id)
+
+
+class FakeDeviceRegistry:
+    """Replica of ``DeviceRegistry`` lookups."""
+
+    def __init__(self) -> None:
+        self.devices: dict[str, SimpleNamespace] = {}
+
+    def async_get(self, device_id: str) -> SimpleNamespace | None:
+        return self.devices.get(device_id)
+
+
+class FakeAreaRegistry:
+    """Replica of ``AreaRegistry`` lookups."""
+
+    def __init__(self) -> None:
+        self.areas: dict[str, SimpleNamespace] = {}
+
+    def async_get_area(self, area_id: str) -> SimpleNamespace | None:
+        return self.areas.get(area_id)
+
+
+class FakeBus:
+    """Event bus that records listeners and can fire events synchronously."""
+
+    def __init__(self) -> None:
+        self.listeners: dict[str, list[Callable[[Any], Any]]] = {}
+
+    def async_listen(self, event_type: str, listener: Callable[[Any], Any], **kwargs: Any):
+        self.listeners.setdefault(event_type, []).append(listener)
+
+        def _remove() -> None:
+            self.listeners[event_type].remove(listener)
+
+        return _remove
+
+    def async_fire(self, event_type: str, data: dict[str, Any]) -> None:
+        event = SimpleNamespace(event_type=event_type, data=data)
+        for listener in list(self.listeners.get(event_type, ())):
+            listener(event)
+
+
+class FakeHass:
+    """The subset of ``HomeAssistant`` used by the integration."""
+
+    def __init__(self, config_dir: str = "/tmp") -> None:
+        self.data: dict[str, Any] = {}
+        self.states = FakeStates()
+        self.bus = FakeBus()
+        self.entity_registry = FakeEntityRegistry()
+        self.device_registry = FakeDeviceRegistry()
+        self.area_registry = FakeAreaRegistry()
+        self.config = SimpleNamespace(
+            path=lambda *parts: "/".join((config_dir, *parts)), config_dir=config_dir
+        )
+        self.auth = SimpleNamespace(
+            async_get_users=lambda: self._users,
+            async_get_user=self._async_get_user,
+        )
+        self.config_entries = SimpleNamespace(
+            async_entries=lambda domain=None: self._entries,
+            async_get_entry=lambda entry_id: next(
+                (entry for entry in self._entries if entry.entry_id == entry_id), None
+            ),
+        )
+        self._users: list[SimpleNamespace] = []
+        self._entries: list[SimpleNamespace] = []
+
+    async def _async_get_user(self, user_id: str) -> SimpleNamespace | None:
+        return next((user for user in self._users if user.id == user_id), None)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    async def async_add_executor_job(self, target: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+    async def async_add_import_executor_job(
+        self, target: Callable[..., Any], *args: Any
+    ) -> Any:
+        return await self.async_add_executor_job(target, *args)
+
+    def async_create_task(self, coro: Any, *args: Any, **kwargs: Any) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(coro)
+
+    def async_create_background_task(
+        self, coro: Any, *args: Any, **kwargs: Any
+    ) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(coro)
+
+
+def build_fake_hass(
+    entities: int = 50_000,
+    devices: int = 5_000,
+    areas: int = 100,
+    users: int = 10,
+    integrations: int = 200,
+    config_dir: str = "/tmp",
+    seed: int = 0,
+) -> FakeHass:
+    """Populate a ``FakeHass`` with synthetic registries and states."""
+    rng = random.Random(seed)
+    hass = FakeHass(config_dir)
+
+    for index in range(users):
+        hass._users.append(
+            SimpleNamespace(
+                id=f"user_{index}",
+                name=f"User {index}",
+                is_owner=index == 0,
+                is_active=True,
+                system_generated=False,
+                local_only=False,
+                groups=[],
+            )
+        )
+    for index in range(integrations):
+        hass._entries.append(
+            SimpleNamespace(
+                entry_id=f"entry_{index}",
+                domain=PLATFORMS[index % len(PLATFORMS)],
+                title=f"Integration {index}",
+                state=SimpleNamespace(name="LOADED"),
+                source="user",
+                data={},
+                options={},
+            )
+        )
+    for index in range(areas):
+        area_id = f"area_{index}"
+        hass.area_registry.areas[area_id] = SimpleNamespace(
+            id=area_id, name=f"Area {index}", floor_id=None
+        )
+    for index in range(devices):
+        platform = PLATFORMS[index % len(PLATFORMS)]
+        device_id = f"device_{index:06d}"
+        hass.device_registry.devices[device_id] = SimpleNamespace(
+            id=device_id,
+            name=f"Device {index}",
+            name_by_user=None,
+            manufacturer=f"Maker {index % 40}",
+            model=f"Model {index % 300}",
+            sw_version="1.0",
+            hw_version=None,
+            identifiers={(platform, device_id)},
+            connections=set(),
+            config_entries={f"entry_{index % integrations}"},
+            area_id=f"area_{rng.randrange(areas)}",
+            disabled_by=None,
+        )
+    device_ids = list(hass.device_registry.devices)
+    for index in range(entities):
+        domain = DOMAINS[index % len(DOMAINS)]
+        entity_id = f"{domain}.synthetic_{index:06d}"
+        device_classes = DEVICE_CLASSES.get(domain)
+        device_class = device_classes[index % len(device_classes)] if device_classes else None
+        device_id = device_ids[index % len(device_ids)] if device_ids else None
+        hass.entity_registry.entities[entity_id] = SimpleNamespace(
+            entity_id=entity_id,
+            name=None,
+            original_name=f"Synthetic {domain} {index}",
+            platform=PLATFORMS[index % len(PLATFORMS)],
+            domain=domain,
+            device_id=device_id,
+            area_id=None,
+            disabled_by=None,
+            unique_id=f"uid_{index}",
+            capabilities=None,
+            supported_features=0,
+            device_class=device_class,
+            original_device_class=device_class,
+            unit_of_measurement=None,
+        )
+        if domain == "sensor":
+            value = f"{rng.uniform(10, 35):.1f}"
+        else:
+            value = rng.choice(("on", "off"))
+        attributes = {"friendly_name": f"Synthetic {domain} {index}"}
+        if device_class:
+            attributes["device_class"] = device_class
+        hass.states.async_set(entity_id, value, attributes)
+    return hass
+
+
+def stub_history(hass: FakeHass, points_per_hour: int = 12) -> Callable[..., Any]:
+    """Return a stand-in for ``recorder.history.state_changes_during_period``."""
+
+    def state_changes_during_period(_hass, start_time, end_time, entity_id, *args, **kwargs):
+        current = hass.states.get(entity_id)
+        if current is None:
+            return {}
+        if end_time is None:
+            end_time = datetime.now(timezone.utc)
+        step = timedelta(hours=1) / points_per_hour
+        states = []
+        moment = start_time
+        while moment < end_time:
+            state = FakeState(entity_id, current.state, current.attributes)
+            state.last_changed = state.last_updated = moment
+            states.append(state)
+            moment += step
+        return {entity_id: states}
+
+    return state_changes_during_period
+
+
+@contextmanager
+def patched_registries(hass: FakeHass) -> Iterator[None]:
+    """Route the registry helpers and recorder history to the fake hass."""
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch(
+                "homeassistant.helpers.entity_registry.async_get",
+                lambda _hass: hass.entity_registry,
+            )
+        )
+        stack.enter_context(
+            patch(
+                "homeassistant.helpers.device_registry.async_get",
+                lambda _hass: hass.device_registry,
+            )
+        )
+        stack.enter_context(
+            patch(
+                "homeassistant.helpers.area_registry.async_get",
+                lambda _hass: hass.area_registry,
+            )
+        )
+        # The fake hass stands in for the recorder too; its executor is the
+        # one the history queries run in.
+        stack.enter_context(
+            patch("homeassistant.components.recorder.get_instance", lambda _hass: hass)
+        )
+        stack.enter_context(
+            patch(
+                "homeassistant.components.recorder.history.state_changes_during_period",
+                stub_history(hass),
+            )
+        )
+        yield
+
+
+def service_call(**data: Any) -> SimpleNamespace:
+    """Build a stand-in for ``ServiceCall`` carrying ``data``."""
+    return SimpleNamespace(data=data, return_response=True)
@@ -7,10 +7,21 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import DOMAIN
+from .const import (
+    CONF_LOOP_BUDGET,
+    CONF_PROFILE_SLOW_CALLS,
+    CONF_SLOW_CALL_THRESHOLD,
+    CONF_TRACE_EXPORT,
+    CONF_VALIDATE_BEFORE_WRITE,
+    DEFAULT_LOOP_BUDGET,
+    DEFAULT_SLOW_CALL_THRESHOLD,
+    DOMAIN,
+    TRACE_EXPORT_DISABLED,
+    TRACE_EXPORTS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,6 +31,22 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_PROFILE_SLOW_CALLS, default=False): bool,
+        vol.Optional(
+            CONF_SLOW_CALL_THRESHOLD, default=DEFAULT_SLOW_CALL_THRESHOLD
+        ): vol.All(int, vol.Range(min=10)),
+        vol.Optional(CONF_TRACE_EXPORT, default=TRACE_EXPORT_DISABLED): vol.In(
+            TRACE_EXPORTS
+        ),
+        vol.Optional(CONF_LOOP_BUDGET, default=DEFAULT_LOOP_BUDGET): vol.All(
+            int, vol.Range(min=1, max=100)
+        ),
+        vol.Optional(CONF_VALIDATE_BEFORE_WRITE, default=False): bool,
+    }
+)
+
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Home Assistant MCP Server."""
@@ -42,3 +69,29 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             title="Home Assistant MCP Server",
             data=user_input,
         )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler()
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options of Home Assistant MCP Server."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                OPTIONS_SCHEMA, self.config_entry.options
+            ),
+        )
@@ -0,0 +1,188 @@
+"""Configuration file service handlers for the Home Assistant MCP Server."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall
+
+from .etags import not_modified, value_etag, wants_etag
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def handle_read_config(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle read_config service call.
+
+    The version token is taken before the file is read. A file that changes
+    in between is therefore sent again on the next call, never missed.
+    """
+    server = entry_data["server"]
+    filename = call.data["filename"]
+    if not wants_etag(call.data):
+        result = await server.read_config_file(filename)
+        _LOGGER.info(f"Read config file {filename}")
+        return result
+    etag = await server.file_etag(filename)
+    if call.data.get("if_none_match") == etag:
+        _LOGGER.info(f"Config file {filename} not modified")
+        return not_modified(etag)
+    result = await server.read_config_file(filename)
+    _LOGGER.info(f"Read config file {filename}")
+    return {"content": result, "etag": etag}
+
+
+async def handle_read_config_files(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle read_config_files service call."""
+    result = await entry_data["server"].read_config_files(
+        call.data.get("filenames"), call.data.get("pattern")
+    )
+    errors = sum(1 for value in result.values() if "error" in value)
+    _LOGGER.info(f"Read {len(result)} config files ({errors} failed)")
+    return {"files": result}
+
+
+async def handle_write_config(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle write_config service call."""
+    server = entry_data["server"]
+    filename = call.data["filename"]
+    content = call.data["content"]
+    await server.write_config_file(
+        filename, content, call.data.get("validate"), call.data.get("if_match")
+    )
+    entry_data["config_index"].invalidate()
+    _LOGGER.info(f"Wrote config file {filename}")
+    if wants_etag(call.data) or "if_match" in call.data:
+        return {"etag": await server.file_etag(filename)}
+    return None
+
+
+async def handle_list_configs(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle list_configs service call."""
+    result = await entry_data["server"].list_config_files()
+    if not wants_etag(call.data):
+        _LOGGER.info(f"Listed {len(result)} config files")
+        return result
+    etag = value_etag(result)
+    if call.data.get("if_none_match") == etag:
+        _LOGGER.info("Config file list not modified")
+        return not_modified(etag)
+    _LOGGER.info(f"Listed {len(result)} config files")
+    return {"files": result, "etag": etag}
+
+
+async def handle_get_config_value(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle get_config_value service call.
+
+    The version token is the file's, so it changes with any edit to the file.
+    """
+    server = entry_data["server"]
+    filename = call.data["filename"]
+    key_path = call.data["key_path"]
+    if not wants_etag(call.data):
+        result = await server.get_config_value(filename, key_path)
+        _LOGGER.info(f"Got config value {key_path} from {filename}")
+        return result
+    etag = await server.file_etag(filename)
+    if call.data.get("if_none_match") == etag:
+        _LOGGER.info(f"Config value {key_path} in {filename} not modified")
+        return not_modified(etag)
+    result = await server.get_config_value(filename, key_path)
+    _LOGGER.info(f"Got config value {key_path} from {filename}")
+    return {"value": result, "etag": etag}
+
+
+async def handle_set_config_value(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle set_config_value service call."""
+    filename = call.data["filename"]
+    key_path = call.data["key_path"]
+    value = call.data["value"]
+    server = entry_data["server"]
+    await server.set_config_value(
+        filename, key_path, value, call.data.get("validate"), call.data.get("if_match")
+    )
+    entry_data["config_index"].invalidate()
+    _LOGGER.info(f"Set config value {key_path} in {filename}")
+    if wants_etag(call.data) or "if_match" in call.data:
+        return {"etag": await server.file_etag(filename)}
+    return None
+
+
+async def handle_validate_config(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle validate_config service call."""
+    from .config_validation import issues_as_dicts
+
+    filename = call.data["filename"]
+    issues = await entry_data["server"].validate_config_file(
+        filename, call.data.get("content")
+    )
+    _LOGGER.info(f"Validated {filename}: {len(issues)} issues")
+    return {"valid": not issues, "errors": issues_as_dicts(issues)}
+
+
+async def handle_find_config(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle find_config service call."""
+    index = entry_data["config_index"]
+    limit = call.data["limit"]
+    found = await hass.async_add_executor_job(
+        index.find, call.data.get("key"), call.data.get("entity_id")
+    )
+    result: dict[str, Any] = {"files_indexed": len(index.files)}
+    for kind, matches in found.items():
+        result[kind] = matches[:limit]
+        result[f"{kind}_total"] = len(matches)
+    _LOGGER.info(
+        f"Found {sum(len(matches) for matches in found.values())} config matches"
+    )
+    return result
+
+
+async def handle_list_config_versions(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle list_config_versions service call."""
+    filename = call.data["filename"]
+    versions = await entry_data["server"].list_config_versions(filename)
+    _LOGGER.info(f"Listed {len(versions)} versions of {filename}")
+    return {"versions": versions}
+
+
+async def handle_diff_config_versions(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle diff_config_versions service call."""
+    filename = call.data["filename"]
+    diff = await entry_data["server"].diff_config_versions(
+        filename, call.data["from_version"], call.data.get("to_version")
+    )
+    _LOGGER.info(f"Diffed versions of {filename}")
+    return {"diff": diff}
+
+
+async def handle_rollback_config(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> Any:
+    """Handle rollback_config service call."""
+    filename = call.data["filename"]
+    version = await entry_data["server"].rollback_config_file(
+        filename, call.data["version"]
+    )
+    entry_data["config_index"].invalidate()
+    _LOGGER.info(f"Rolled back {filename} to version {call.data['version']}")
+    return {"version": version}
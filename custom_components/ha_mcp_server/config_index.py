@@ -0,0 +1,340 @@
+"""Cross-file index of key paths and entity references in YAML configuration.
+
+Every ``.yaml``/``.yml`` file under the config directory is composed into a
+YAML node tree, except those in hidden directories such as ``.storage`` and
+in ``SKIP_DIRS``, which hold code, assets and blueprints rather than
+configuration.
+Composing, rather than loading, keeps line numbers and tolerates tags such as
+``!include`` and ``!secret`` without resolving them. Two maps come out of it:
+- every key path (``recorder.purge_keep_days``; list positions are left out,
+  so ``automation.trigger.platform`` covers all automations) to
+  ``(file, line)``
+- every entity ID mentioned in a key or value, including inside templates, to
+  ``(file, line)``
+
+``refresh`` re-stats the tree and re-composes only the files whose size or
+modification time changed, then removes the postings of the files that
+disappeared. After each refresh that changed something, the index is handed
+to the ``WarmCache``, which saves it to ``.storage``. The next start only
+parses files that changed while Home Assistant was down.
+
+``find`` refreshes at most once every ``REFRESH_INTERVAL`` seconds, so a
+burst of queries costs one walk of the tree. Writes made through this
+integration call ``invalidate`` so that the next query sees them at once.
+
+All methods block and are meant to be called from a worker thread; ``find``
+serializes concurrent callers.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import fnmatch
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import yaml
+
+    from .warm_cache import WarmCache
+
+# yaml is imported on first refresh so that loading the integration does not
+# pay for it.
+
+WARM_SECTION = "config_index"
+INDEX_VERSION = 1
+YAML_SUFFIXES = (".yaml", ".yml")
+# Top-level directories that are not configuration.
+SKIP_DIRS = frozenset({"blueprints", "custom_components", "deps", "tts", "www"})
+REFRESH_INTERVAL = 10.0
+
+# Entity IDs inside arbitrary strings, e.g. templates. A match must not be
+# part of a longer dotted name or a method call.
+ENTITY_ID_RE = re.compile(r"(?<![\w.])([a-z][a-z0-9_]*\.[a-z0-9_]+)(?![\w.(])")
+# Object IDs that make a match a file name rather than an entity.
+NOT_ENTITY_SUFFIXES = frozenset(
+    {"yaml", "yml", "json", "txt", "py", "jinja", "j2", "log", "db", "pem", "key", "conf"}
+)
+
+Posting = tuple[str, int]
+
+
+@dataclass(slots=True)
+class FileEntry:
+    """What one file contributes to the index."""
+
+    mtime_ns: int
+    size: int
+    keys: list[tuple[str, int]] = field(default_factory=list)
+    entities: list[tuple[str, int]] = field(default_factory=list)
+    error: str | None = None
+
+
+def _entity_ids(text: str) -> list[tuple[str, int]]:
+    """Return ``(entity_id, line offset)`` for each entity ID in ``text``."""
+    found = []
+    for match in ENTITY_ID_RE.finditer(text):
+        entity_id = match.group(1)
+        if entity_id.rpartition(".")[2] in NOT_ENTITY_SUFFIXES:
+            continue
+        found.append((entity_id, text.count("\n", 0, match.start())))
+    return found
+
+
+def scan_yaml(text: str) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+    """Return the key paths and entity IDs in ``text`` with 1-based lines.
+
+    Raises:
+        yaml.YAMLError: If ``text`` is not well-formed YAML
+    """
+    import yaml
+
+    keys: list[tuple[str, int]] = []
+    entities: list[tuple[str, int]] = []
+
+    def scalar(node: yaml.ScalarNode) -> None:
+        if not isinstance(node.value, str) or "." not in node.value:
+            return
+        # Block scalars start on the line after their indicator. Only literal
+        # blocks keep their line breaks; other multi-line scalars are folded,
+        # so their matches are reported on the scalar's first line.
+        first_line = node.start_mark.line + 1 + (node.style in ("|", ">"))
+        literal = node.style == "|"
+        for entity_id, offset in _entity_ids(node.value):
+            entities.append((entity_id, first_line + (offset if literal else 0)))
+
+    stack: list[tuple[yaml.Node, str]] = []
+    root = yaml.compose(text, Loader=yaml.SafeLoader)
+    if root is not None:
+        stack.append((root, ""))
+    while stack:
+        node, path = stack.pop()
+        if isinstance(node, yaml.MappingNode):
+            for key_node, value_node in node.value:
+                if not isinstance(key_node, yaml.ScalarNode):
+                    continue
+                key_path = f"{path}.{key_node.value}" if path else str(key_node.value)
+                keys.append((key_path, key_node.start_mark.line + 1))
+                scalar(key_node)
+                stack.append((value_node, key_path))
+        elif isinstance(node, yaml.SequenceNode):
+            stack.extend((item, path) for item in node.value)
+        elif isinstance(node, yaml.ScalarNode):
+            scalar(node)
+    keys.sort(key=lambda item: item[1])
+    entities.sort(key=lambda item: item[1])
+    return keys, entities
+
+
+def _add(index: dict[str, dict[str, list[int]]], name: str, posting: Posting) -> None:
+    index.setdefault(name, {}).setdefault(posting[0], []).append(posting[1])
+
+
+def _remove(index: dict[str, dict[str, list[int]]], name: str, filename: str) -> None:
+    files = index.get(name)
+    if files is not None:
+        files.pop(filename, None)
+        if not files:
+            del index[name]
+
+
+class ConfigIndex:
+    """Key path and entity ID index over a configuration directory."""
+
+    def __init__(
+        self,
+        config_dir: Path,
+        cache: WarmCache | None = None,
+        refresh_interval: float = REFRESH_INTERVAL,
+    ) -> None:
+        """Initialize the index.
+
+        Args:
+            config_dir: Home Assistant configuration directory
+            cache: Cache the index is persisted in; not persisted when
+                ``None``
+            refresh_interval: Seconds ``find`` answers from the index before
+                walking the directory again
+        """
+        self.config_dir = config_dir
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+        self._refreshed_at: float | None = None
+        self.files: dict[str, FileEntry] = {}
+        self._keys: dict[str, dict[str, list[int]]] = {}
+        self._entities: dict[str, dict[str, list[int]]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats: dict[str, Any] = {
+            "files": 0,
+            "keys": 0,
+            "entities": 0,
+            "errors": [],
+        }
+
+    def _load(self) -> None:
+        self._loaded = True
+        if self.cache is None:
+            return
+        files = self.cache.get(WARM_SECTION, INDEX_VERSION)
+        if files is None:
+            return
+        for filename, (mtime_ns, size, keys, entities, error) in files.items():
+            self._set(filename, FileEntry(mtime_ns, size, keys, entities, error))
+
+    def _save(self) -> None:
+        if self.cache is None:
+            return
+        self.cache.put(
+            WARM_SECTION,
+            INDEX_VERSION,
+            {
+                filename: (entry.mtime_ns, entry.size, entry.keys, entry.entities, entry.error)
+                for filename, entry in self.files.items()
+            },
+        )
+
+    def _set(self, filename: str, entry: FileEntry | None) -> None:
+        """Replace the postings of one file."""
+        old = self.files.pop(filename, None)
+        if old is not None:
+            for key, _ in old.keys:
+                _remove(self._keys, key, filename)
+            for entity_id, _ in old.entities:
+                _remove(self._entities, entity_id, filename)
+        if entry is None:
+            return
+        self.files[filename] = entry
+        for key, line in entry.keys:
+            _add(self._keys, key, (filename, line))
+        for entity_id, line in entry.entities:
+            _add(self._entities, entity_id, (filename, line))
+
+    def _walk(self) -> dict[str, os.stat_result]:
+        found = {}
+        for directory, dirnames, filenames in os.walk(self.config_dir):
+            top = directory == str(self.config_dir)
+            dirnames[:] = [
+                name
+                for name in dirnames
+                if not name.startswith(".") and not (top and name in SKIP_DIRS)
+            ]
+            for name in filenames:
+                if name.endswith(YAML_SUFFIXES) and not name.startswith("."):
+                    path = Path(directory, name)
+                    try:
+                        found[path.relative_to(self.config_dir).as_posix()] = path.stat()
+                    except OSError:
+                        continue
+        return found
+
+    def refresh(self) -> tuple[int, int]:
+        """Bring the index up to date with the directory.
+
+        Returns:
+            The number of files re-indexed and the number removed
+        """
+        import yaml
+
+        if not self._loaded:
+            self._load()
+        self._refreshed_at = time.monotonic()
+        current = self._walk()
+        removed = [filename for filename in self.files if filename not in current]
+        for filename in removed:
+            self._set(filename, None)
+        changed = 0
+        for filename, stat in current.items():
+            entry = self.files.get(filename)
+            if (
+                entry is not None
+                and entry.mtime_ns == stat.st_mtime_ns
+                and entry.size == stat.st_size
+            ):
+                continue
+            changed += 1
+            entry = FileEntry(stat.st_mtime_ns, stat.st_size)
+            try:
+                text = (self.config_dir / filename).read_text(encoding="utf-8")
+                entry.keys, entry.entities = scan_yaml(text)
+            except (OSError, UnicodeDecodeError, yaml.YAMLError) as err:
+                entry.error = str(err).splitlines()[0] if str(err) else type(err).__name__
+            self._set(filename, entry)
+        if changed or removed:
+            self._save()
+        # Taken here, where the index is not changing, so that ``as_dict``
+        # never reads it while a refresh runs in a worker thread.
+        self._stats = {
+            "files": len(self.files),
+            "keys": len(self._keys),
+            "entities": len(self._entities),
+            "errors": sorted(
+                filename for filename, entry in self.files.items() if entry.error
+            ),
+        }
+        return changed, len(removed)
+
+    def invalidate(self) -> None:
+        """Make the next ``find`` refresh, e.g. after a file was written."""
+        self._refreshed_at = None
+
+    def find(
+        self, key: str | None = None, entity_id: str | None = None
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Look up a key path and/or an entity ID.
+
+        The index is refreshed first unless it was refreshed within the last
+        ``refresh_interval`` seconds.
+        """
+        with self._lock:
+            if (
+                self._refreshed_at is None
+                or time.monotonic() - self._refreshed_at >= self.refresh_interval
+            ):
+                self.refresh()
+            result = {}
+            if key is not None:
+                result["keys"] = self.find_key(key)
+            if entity_id is not None:
+                result["entities"] = self.find_entity(entity_id)
+            return result
+
+    def find_key(self, query: str) -> list[dict[str, Any]]:
+        """Return where a key path is set.
+
+        ``query`` is an exact key path, a glob such as ``*.purge_keep_days``,
+        or a trailing part of a path (``purge_keep_days`` finds
+        ``recorder.purge_keep_days``).
+        """
+        if any(char in query for char in "*?["):
+            names = [name for name in self._keys if fnmatch.fnmatchcase(name, query)]
+        elif query in self._keys:
+            names = [query]
+        else:
+            suffix = "." + query
+            names = [name for name in self._keys if name.endswith(suffix)]
+        return self._matches(self._keys, names, "key")
+
+    def find_entity(self, entity_id: str) -> list[dict[str, Any]]:
+        """Return where an entity ID is mentioned."""
+        return self._matches(self._entities, [entity_id], "entity_id")
+
+    @staticmethod
+    def _matches(
+        index: dict[str, dict[str, list[int]]], names: list[str], label: str
+    ) -> list[dict[str, Any]]:
+        matches = [
+            {"file": filename, "line": line, label: name}
+            for name in names
+            for filename, lines in index.get(name, {}).items()
+            for line in lines
+        ]
+        matches.sort(key=lambda match: (match["file"], match["line"]))
+        return matches
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return index size statistics as of the last refresh."""
+        return {**self._stats, "errors": list(self._stats["errors"])}
@@ -0,0 +1,421 @@
+"""Off-loop validation of configuration files before they are written.
+
+``check_config_text`` parses the proposed content of one file, follows its
+``!include`` tags into the files they name, resolves ``!secret`` references
+against ``secrets.yaml`` and applies structural checks for the files Home
+Assistant gives a fixed shape (automations, scripts, scenes). It is a plain
+top-level function, so ``ConfigValidator`` can run it in a worker process
+while the event loop keeps serving calls.
+
+Results are cached by content hash together with the modification stamp of
+every other file the check read, so validating content that has not changed
+since the last check costs a hash and a few ``stat`` calls.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+DEFAULT_CACHE_SIZE = 256
+MAX_INCLUDE_DEPTH = 20
+
+# (path, mtime_ns, size) of a file the check read; size is -1 if it was missing
+Stamp = tuple[str, int, int]
+
+
+@dataclass(frozen=True, slots=True)
+class ValidationIssue:
+    """One problem found in a configuration file."""
+
+    file: str
+    line: int | None
+    column: int | None
+    message: str
+
+    def __str__(self) -> str:
+        """Return ``file:line:column: message``."""
+        location = self.file
+        if self.line is not None:
+            location += f":{self.line}"
+            if self.column is not None:
+                location += f":{self.column}"
+        return f"{location}: {self.message}"
+
+
+class ConfigValidationError(ValueError):
+    """Raised when content fails validation and is not written."""
+
+    def __init__(self, filename: str, issues: list[ValidationIssue]) -> None:
+        """Initialize with the issues found."""
+        self.filename = filename
+        self.issues = issues
+        summary = "; ".join(str(issue) for issue in issues[:3])
+        if len(issues) > 3:
+            summary += f"; and {len(issues) - 3} more"
+        super().__init__(f"Refusing to write invalid {filename}: {summary}")
+
+
+def _stamp(path: Path) -> Stamp:
+    try:
+        stat = path.stat()
+    except OSError:
+        return (str(path), 0, -1)
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def stamps_current(stamps: list[Stamp]) -> bool:
+    """Return whether every stamped file is unchanged."""
+    return all(_stamp(Path(stamp[0])) == tuple(stamp) for stamp in stamps)
+
+
+class _Check:
+    """State of one validation run: issues found and files read."""
+
+    def __init__(self, config_dir: Path) -> None:
+        self.config_dir = config_dir
+        self.issues: list[ValidationIssue] = []
+        self.stamps: dict[str, Stamp] = {}
+        self._secrets: dict[str, Any] | None = None
+        self._stack: list[Path] = []
+
+    def relative(self, path: Path) -> str:
+        try:
+            return path.relative_to(self.config_dir).as_posix()
+        except ValueError:
+            return str(path)
+
+    def report(
+        self, path: Path, message: str, mark: yaml.Mark | None = None
+    ) -> None:
+        self.issues.append(
+            ValidationIssue(
+                self.relative(path),
+                None if mark is None else mark.line + 1,
+                None if mark is None else mark.column + 1,
+                message,
+            )
+        )
+
+    def read(self, path: Path) -> str | None:
+        """Read a file the checked content depends on, stamping it."""
+        self.stamps[str(path)] = _stamp(path)
+        try:
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def secrets(self) -> dict[str, Any]:
+        if self._secrets is None:
+            path = self.config_dir / "secrets.yaml"
+            text = self.read(path)
+            self._secrets = {}
+            if text is not None:
+                try:
+                    loaded = yaml.safe_load(text)
+                except yaml.YAMLError:
+                    loaded = None
+                if isinstance(loaded, dict):
+                    self._secrets = loaded
+        return self._secrets
+
+    def parse_yaml(self, path: Path, text: str) -> Any:
+        """Parse ``text`` as the content of ``path`` and check its includes."""
+        if len(self._stack) >= MAX_INCLUDE_DEPTH or path in self._stack:
+            self.report(path, "Include cycle or nesting too deep")
+            return None
+        self._stack.append(path)
+        try:
+            loader = _Loader(text, self, path)
+            try:
+                return loader.get_single_data()
+            finally:
+                loader.dispose()
+        except yaml.MarkedYAMLError as err:
+            self.report(path, err.problem or str(err), err.problem_mark)
+        except yaml.YAMLError as err:
+            self.report(path, str(err))
+        finally:
+            self._stack.pop()
+        return None
+
+    def confine(self, path: Path, node: yaml.Node, source: Path) -> Path | None:
+        """Resolve an include target, or report it if it leaves the config dir."""
+        resolved = path.resolve()
+        if not resolved.is_relative_to(self.config_dir):
+            self.report(
+                source,
+                f"Included path {self.relative(path)} is outside the "
+                "configuration directory",
+                node.start_mark,
+            )
+            return None
+        return resolved
+
+    def include(self, path: Path, node: yaml.Node, source: Path) -> Any:
+        path = self.confine(path, node, source)
+        if path is None:
+            return None
+        text = self.read(path)
+        if text is None:
+            self.report(
+                source, f"Included file {self.relative(path)} not found", node.start_mark
+            )
+            return None
+        return self.parse_yaml(path, text)
+
+    def include_dir(self, path: Path, node: yaml.Node, source: Path) -> list[Any]:
+        path = self.confine(path, node, source)
+        if path is None:
+            return []
+        self.stamps[str(path)] = _stamp(path)
+        if not path.is_dir():
+            self.report(
+                source,
+                f"Included directory {self.relative(path)} not found",
+                node.start_mark,
+            )
+            return []
+        return [
+            self.include(child, node, source)
+            for child in sorted(path.rglob("*.yaml"))
+            if not child.name.startswith(".")
+        ]
+
+
+class _Loader(yaml.SafeLoader):
+    """Safe loader that understands Home Assistant's YAML tags."""
+
+    def __init__(self, stream: str, check: _Check, path: Path) -> None:
+        super().__init__(stream)
+        self.check = check
+        self.path = path
+
+    def construct_mapping(self, node: yaml.MappingNode, deep: bool = False) -> Any:
+        seen: dict[Any, yaml.Node] = {}
+        for key_node, _ in node.value:
+            key = self.construct_object(key_node, deep=deep)
+            try:
+                duplicate = key in seen
+            except TypeError:
+                continue
+            if duplicate:
+                self.check.report(
+                    self.path, f"Duplicate key '{key}'", key_node.start_mark
+                )
+            seen[key] = key_node
+        return super().construct_mapping(node, deep=deep)
+
+
+def _construct_include(loader: _Loader, node: yaml.Node) -> Any:
+    target = loader.path.parent / loader.construct_scalar(node)
+    return loader.check.include(target, node, loader.path)
+
+
+def _construct_include_dir(loader: _Loader, node: yaml.Node) -> Any:
+    target = loader.path.parent / loader.construct_scalar(node)
+    return loader.check.include_dir(target, node, loader.path)
+
+
+def _construct_secret(loader: _Loader, node: yaml.Node) -> Any:
+    name = loader.construct_scalar(node)
+    secrets = loader.check.secrets()
+    if name not in secrets:
+        loader.check.report(
+            loader.path, f"Secret '{name}' is not defined in secrets.yaml", node.start_mark
+        )
+        return None
+    return secrets[name]
+
+
+def _construct_placeholder(loader: _Loader, node: yaml.Node) -> Any:
+    if isinstance(node, yaml.ScalarNode):
+        return loader.construct_scalar(node)
+    if isinstance(node, yaml.SequenceNode):
+        return loader.construct_sequence(node)
+    return loader.construct_mapping(node)
+
+
+_Loader.add_constructor("!include", _construct_include)
+for _tag in (
+    "!include_dir_list",
+    "!include_dir_named",
+    "!include_dir_merge_list",
+    "!include_dir_merge_named",
+):
+    _Loader.add_constructor(_tag, _construct_include_dir)
+_Loader.add_constructor("!secret", _construct_secret)
+for _tag in ("!env_var", "!input"):
+    _Loader.add_constructor(_tag, _construct_placeholder)
+
+
+def _check_automations(check: _Check, path: Path, data: Any) -> None:
+    if not isinstance(data, list):
+        check.report(path, "Expected a list of automations")
+        return
+    for position, automation in enumerate(data, 1):
+        label = f"Automation {position}"
+        if isinstance(automation, dict):
+            label = f"Automation '{automation.get('alias', automation.get('id', position))}'"
+        else:
+            check.report(path, f"{label} is not a mapping")
+            continue
+        if "use_blueprint" in automation:
+            continue
+        if not ({"trigger", "triggers"} & automation.keys()):
+            check.report(path, f"{label} has no triggers")
+        if not ({"action", "actions"} & automation.keys()):
+            check.report(path, f"{label} has no actions")
+
+
+def _check_scripts(check: _Check, path: Path, data: Any) -> None:
+    if not isinstance(data, dict):
+        check.report(path, "Expected a mapping of script ids to scripts")
+        return
+    for script_id, script in data.items():
+        if not isinstance(script, dict):
+            check.report(path, f"Script '{script_id}' is not a mapping")
+        elif "sequence" not in script and "use_blueprint" not in script:
+            check.report(path, f"Script '{script_id}' has no sequence")
+
+
+def _check_scenes(check: _Check, path: Path, data: Any) -> None:
+    if not isinstance(data, list):
+        check.report(path, "Expected a list of scenes")
+        return
+    for position, scene in enumerate(data, 1):
+        if not isinstance(scene, dict):
+            check.report(path, f"Scene {position} is not a mapping")
+        elif "entities" not in scene:
+            check.report(path, f"Scene '{scene.get('name', position)}' has no entities")
+
+
+def _check_configuration(check: _Check, path: Path, data: Any) -> None:
+    if not isinstance(data, dict):
+        check.report(path, "Expected a mapping of integration names to settings")
+        return
+    core = data.get("homeassistant")
+    if isinstance(core, dict):
+        for key in ("latitude", "longitude", "elevation"):
+            if key in core and not isinstance(core[key], (int, float)):
+                check.report(path, f"homeassistant.{key} must be a number")
+
+
+# Structural checks for the files Home Assistant gives a fixed shape; empty
+# files are valid for all of them.
+SCHEMAS: dict[str, Callable[[_Check, Path, Any], None]] = {
+    "configuration.yaml": _check_configuration,
+    "automations.yaml": _check_automations,
+    "scripts.yaml": _check_scripts,
+    "scenes.yaml": _check_scenes,
+}
+
+
+def check_config_text(
+    config_dir: str, filename: str, text: str
+) -> tuple[list[ValidationIssue], list[Stamp]]:
+    """Validate ``text`` as the new content of ``filename``.
+
+    Returns the issues found and the stamps of the other files that were
+    read (includes, included directories and ``secrets.yaml``).
+    """
+    root = Path(config_dir).resolve()
+    path = root / filename
+    check = _Check(root)
+    if filename.endswith((".yaml", ".yml")):
+        data = check.parse_yaml(path, text)
+        schema = SCHEMAS.get(check.relative(path))
+        if schema is not None and data is not None and not check.issues:
+            schema(check, path, data)
+    elif filename.endswith(".json"):
+        try:
+            json.loads(text)
+        except json.JSONDecodeError as err:
+            check.issues.append(
+                ValidationIssue(check.relative(path), err.lineno, err.colno, err.msg)
+            )
+    check.stamps.pop(str(path), None)
+    issues = sorted(
+        check.issues,
+        key=lambda issue: (issue.file, issue.line or 0, issue.column or 0),
+    )
+    return issues, list(check.stamps.values())
+
+
+class ConfigValidator:
+    """Validates configuration content in a worker process, with a cache."""
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        """Initialize the validator.
+
+        Args:
+            executor: Executor to run checks in; a single-worker process pool
+                is created on first use when none is given
+            cache_size: Validation results kept
+        """
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[list[ValidationIssue], list[Stamp]]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # Spawned workers do not inherit the event loop's threads or locks.
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def validate(
+        self, config_dir: str | os.PathLike[str], filename: str, text: str
+    ) -> list[ValidationIssue]:
+        """Return the issues in ``text`` as the new content of ``filename``."""
+        key = hashlib.sha256(f"{filename}\0{text}".encode()).hexdigest()
+        cached = self._cache.get(key)
+        if cached is not None and await asyncio.to_thread(stamps_current, cached[1]):
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self._get_executor(), check_config_text, str(config_dir), filename, text
+        )
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result[0]
+
+    def shutdown(self) -> None:
+        """Stop the worker process, if this validator started one."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return cache statistics."""
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def issues_as_dicts(issues: list[ValidationIssue]) -> list[dict[str, Any]]:
+    """Return issues as plain dictionaries for service responses."""
+    return [asdict(issue) for issue in issues]
@@ -1,3 +1,42 @@
 """Constants for the Home Assistant MCP Server integration."""
+from enum import IntEnum
 
 DOMAIN = "ha_mcp_server"
+
+# Options
+CONF_PROFILE_SLOW_CALLS = "profile_slow_calls"
+CONF_SLOW_CALL_THRESHOLD = "slow_call_threshold"
+CONF_TRACE_EXPORT = "trace_export"
+CONF_LOOP_BUDGET = "loop_budget"
+CONF_VALIDATE_BEFORE_WRITE = "validate_before_write"
+
+DEFAULT_SLOW_CALL_THRESHOLD = 1000  # milliseconds
+DEFAULT_LOOP_BUDGET = 5  # milliseconds of event loop time per listing slice
+
+TRACE_EXPORT_DISABLED = "disabled"
+TRACE_EXPORT_MEMORY = "memory"
+TRACE_EXPORT_FILE = "file"
+TRACE_EXPORTS = [TRACE_EXPORT_DISABLED, TRACE_EXPORT_MEMORY, TRACE_EXPORT_FILE]
+
+# Directory, relative to the config dir, that profiles are written to
+PROFILE_DIR = "ha_mcp_server_profiles"
+# OTLP/JSON trace file, inside PROFILE_DIR
+TRACE_FILE = "traces.otlp.jsonl"
+# Directory, relative to the config dir, that config file snapshots are kept in
+SNAPSHOT_DIR = ".storage/ha_mcp_server_snapshots"
+# Warm start cache of the search and config indexes, relative to the config dir
+WARM_CACHE_FILE = ".storage/ha_mcp_server.warm_cache"
+# Directory, relative to the config dir, that state exports are written to
+EXPORT_DIR = "ha_mcp_server_exports"
+# State export file formats
+FORMAT_JSONL = "jsonl"
+FORMAT_MSGPACK = "msgpack"
+FORMATS = [FORMAT_JSONL, FORMAT_MSGPACK]
+
+
+class CostClass(IntEnum):
+    """Cost classes, in priority order (lowest value is served first)."""
+
+    CHEAP = 0
+    LISTING = 1
+    HEAVY = 2
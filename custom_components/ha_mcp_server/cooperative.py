@@ -0,0 +1,57 @@
+"""Helpers for doing bulk work on the event loop without stalling it."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+import time
+from typing import TypeVar
+
+_ItemT = TypeVar("_ItemT")
+_ResultT = TypeVar("_ResultT")
+
+DEFAULT_LOOP_BUDGET = 0.005  # seconds
+
+# The clock is only read every CHECK_EVERY items; per-item work in the
+# builders is a few microseconds, so this overshoots the budget by well under
+# a millisecond while keeping the clock reads out of the hot path.
+CHECK_EVERY = 64
+
+
+async def async_build_list(
+    items: Iterable[_ItemT],
+    build: Callable[[_ItemT], _ResultT | None],
+    budget: float = DEFAULT_LOOP_BUDGET,
+) -> list[_ResultT]:
+    """Map ``build`` over ``items`` in slices of at most ``budget`` seconds.
+
+    ``items`` is copied into a list first, so registries may change while the
+    builder is suspended without affecting the result. Items for which
+    ``build`` returns ``None`` are skipped. Between slices control goes back to
+    the event loop.
+    """
+    snapshot = list(items)
+    results: list[_ResultT] = []
+    append = results.append
+    deadline = time.perf_counter() + budget
+    for index, item in enumerate(snapshot, 1):
+        result = build(item)
+        if result is not None:
+            append(result)
+        if index % CHECK_EVERY == 0 and time.perf_counter() >= deadline:
+            await asyncio.sleep(0)
+            deadline = time.perf_counter() + budget
+    return results
+
+
+async def async_for_each(
+    items: Iterable[_ItemT],
+    func: Callable[[_ItemT], object],
+    budget: float = DEFAULT_LOOP_BUDGET,
+) -> None:
+    """Call ``func`` on each of ``items``, sliced like ``async_build_list``."""
+    deadline = time.perf_counter() + budget
+    for index, item in enumerate(list(items), 1):
+        func(item)
+        if index % CHECK_EVERY == 0 and time.perf_counter() >= deadline:
+            await asyncio.sleep(0)
+            deadline = time.perf_counter() + budget
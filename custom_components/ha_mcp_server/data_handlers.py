@@ -0,0 +1,429 @@
+"""Home Assistant data access service handlers for the MCP Server."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall, State
+import homeassistant.helpers.device_registry as dr
+import homeassistant.helpers.entity_registry as er
+import homeassistant.util.dt as dt_util
+
+from .cooperative import async_build_list
+from .etags import not_modified, value_etag, wants_etag
+from .history_cache import HistoryCache, HistoryRow
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def handle_list_users(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle list_users service call."""
+    users = []
+    for user in hass.auth.async_get_users():
+        users.append(
+            {
+                "id": user.id,
+                "name": user.name,
+                "is_owner": user.is_owner,
+                "is_active": user.is_active,
+                "system_generated": user.system_generated,
+                "local_only": user.local_only,
+            }
+        )
+    _LOGGER.info(f"Listed {len(users)} users")
+    if not wants_etag(call.data):
+        return {"users": users}
+    etag = value_etag(users)
+    if call.data.get("if_none_match") == etag:
+        return not_modified(etag)
+    return {"users": users, "etag": etag}
+
+
+async def handle_get_user(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle get_user service call."""
+    user_id = call.data["user_id"]
+    user = await hass.auth.async_get_user(user_id)
+    if user:
+        result = {
+            "id": user.id,
+            "name": user.name,
+            "is_owner": user.is_owner,
+            "is_active": user.is_active,
+            "system_generated": user.system_generated,
+            "local_only": user.local_only,
+            "groups": [{"id": g.id, "name": g.name} for g in user.groups],
+        }
+        _LOGGER.info(f"Got user {user_id}")
+        return result
+    else:
+        raise ValueError(f"User {user_id} not found")
+
+
+async def handle_list_integrations(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle list_integrations service call."""
+    entries = []
+    for entry in hass.config_entries.async_entries():
+        entries.append(
+            {
+                "entry_id": entry.entry_id,
+                "domain": entry.domain,
+                "title": entry.title,
+                "state": entry.state.name,
+                "source": entry.source,
+            }
+        )
+    _LOGGER.info(f"Listed {len(entries)} integrations")
+    if not wants_etag(call.data):
+        return {"integrations": entries}
+    etag = value_etag(entries)
+    if call.data.get("if_none_match") == etag:
+        return not_modified(etag)
+    return {"integrations": entries, "etag": etag}
+
+
+async def handle_get_integration(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle get_integration service call."""
+    entry_id = call.data["entry_id"]
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry:
+        result = {
+            "entry_id": entry.entry_id,
+            "domain": entry.domain,
+            "title": entry.title,
+            "state": entry.state.name,
+            "source": entry.source,
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        }
+        _LOGGER.info(f"Got integration {entry_id}")
+        return result
+    else:
+        raise ValueError(f"Integration {entry_id} not found")
+
+
+async def handle_list_devices(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle list_devices service call.
+
+    The version token is the change log revision of the last device change,
+    so an unchanged listing is answered without walking the registry.
+    """
+    device_registry = dr.async_get(hass)
+    domain = call.data.get("domain")
+    etag = await _async_listing_etag(entry_data, call, "device", domain)
+    if etag is not None and call.data.get("if_none_match") == etag:
+        _LOGGER.info("Device list not modified")
+        return not_modified(etag)
+
+    def build(device: dr.DeviceEntry) -> dict[str, Any] | None:
+        if domain is not None and not any(
+            entry[0] == domain for entry in device.config_entries
+        ):
+            return None
+        return {
+            "id": device.id,
+            "name": device.name or device.name_by_user,
+            "manufacturer": device.manufacturer,
+            "model": device.model,
+            "sw_version": device.sw_version,
+            "identifiers": list(device.identifiers),
+            "connections": list(device.connections),
+        }
+
+    devices = await async_build_list(
+        device_registry.devices.values(), build, entry_data["loop_budget"]
+    )
+    _LOGGER.info(f"Listed {len(devices)} devices")
+    return _listing_response(call, "devices", devices, etag)
+
+
+async def handle_get_device(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle get_device service call."""
+    device_registry = dr.async_get(hass)
+    device_id = call.data["device_id"]
+    device = device_registry.async_get(device_id)
+
+    if device:
+        result = {
+            "id": device.id,
+            "name": device.name or device.name_by_user,
+            "manufacturer": device.manufacturer,
+            "model": device.model,
+            "sw_version": device.sw_version,
+            "hw_version": device.hw_version,
+            "identifiers": list(device.identifiers),
+            "connections": list(device.connections),
+            "config_entries": list(device.config_entries),
+            "area_id": device.area_id,
+            "disabled_by": device.disabled_by,
+        }
+        if call.data.get("include_entities"):
+            # Neither source scans the entity registry: the index keeps
+            # device_id -> entity ids current from registry events, and the
+            # registry keeps its own index by device. One device's entities
+            # are not worth building the index for, so its graph is only used
+            # once something else has built it.
+            index = entry_data["index"]
+            entity_registry = er.async_get(hass)
+            if index.ready:
+                entity_ids = index.graph.device_entities(device_id)
+            else:
+                entity_ids = [
+                    entity.entity_id
+                    for entity in er.async_entries_for_device(
+                        entity_registry, device_id, include_disabled_entities=True
+                    )
+                ]
+            result["entities"] = [
+                _entity_dict(
+                    entity_registry.async_get(entity_id), hass.states.get(entity_id)
+                )
+                for entity_id in sorted(entity_ids)
+            ]
+        _LOGGER.info(f"Got device {device_id}")
+        return result
+    else:
+        raise ValueError(f"Device {device_id} not found")
+
+
+async def handle_list_entities(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle list_entities service call.
+
+    The version token is the change log revision of the last entity or state
+    change, so an unchanged listing is answered without walking the registry.
+    """
+    entity_registry = er.async_get(hass)
+    domain = call.data.get("domain")
+    etag = await _async_listing_etag(entry_data, call, "entity", domain)
+    if etag is not None and call.data.get("if_none_match") == etag:
+        _LOGGER.info("Entity list not modified")
+        return not_modified(etag)
+    get_state = hass.states.get
+
+    def build(entity: er.RegistryEntry) -> dict[str, Any] | None:
+        if domain is not None and entity.domain != domain:
+            return None
+        state = get_state(entity.entity_id)
+        return {
+            "entity_id": entity.entity_id,
+            "name": entity.name or entity.original_name,
+            "platform": entity.platform,
+            "domain": entity.domain,
+            "device_id": entity.device_id,
+            "area_id": entity.area_id,
+            "disabled_by": entity.disabled_by,
+            "state": state.state if state else None,
+        }
+
+    entities = await async_build_list(
+        entity_registry.entities.values(), build, entry_data["loop_budget"]
+    )
+    _LOGGER.info(f"Listed {len(entities)} entities")
+    return _listing_response(call, "entities", entities, etag)
+
+
+async def _async_listing_etag(
+    entry_data: dict[str, Any], call: ServiceCall, kind: str, domain: str | None
+) -> str | None:
+    """Return the change log token of a listing of ``kind`` records.
+
+    The token needs the built index. The index is only built for a caller
+    holding a token to compare; a plain listing never waits for the build.
+    ``None`` means no token was asked for, or it would cost the build. The
+    filter is part of the token, so a token from a listing filtered one way
+    never matches a listing filtered another.
+    """
+    if not wants_etag(call.data):
+        return None
+    index = entry_data["index"]
+    if not index.ready and "if_none_match" not in call.data:
+        return None
+    await index.async_ensure_ready(entry_data["loop_budget"])
+    return f"{index.changes.kind_token(kind)}-{domain or ''}"
+
+
+def _listing_response(
+    call: ServiceCall, key: str, items: list[dict[str, Any]], etag: str | None
+) -> dict[str, Any]:
+    """Return a listing, with its version token if the caller asked for one.
+
+    Before the index is built, the token is a hash of the listing. The
+    caller's next ``if_none_match`` then builds the index, misses once and
+    gets a change log token from there on.
+    """
+    if not wants_etag(call.data):
+        return {key: items}
+    return {key: items, "etag": etag if etag is not None else value_etag(items)}
+
+
+async def handle_get_entity(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle get_entity service call."""
+    entity_registry = er.async_get(hass)
+    entity_id = call.data["entity_id"]
+
+    entity = entity_registry.async_get(entity_id)
+    state = hass.states.get(entity_id)
+
+    if not entity and not state:
+        raise ValueError(f"Entity {entity_id} not found")
+
+    _LOGGER.info(f"Got entity {entity_id}")
+    return _entity_dict(entity, state)
+
+
+def _entity_dict(
+    entity: er.RegistryEntry | None, state: State | None
+) -> dict[str, Any]:
+    """Return the registry entry and current state of an entity as one dict."""
+    result: dict[str, Any] = {}
+    if entity:
+        result.update(
+            {
+                "entity_id": entity.entity_id,
+                "name": entity.name or entity.original_name,
+                "platform": entity.platform,
+                "domain": entity.domain,
+                "device_id": entity.device_id,
+                "area_id": entity.area_id,
+                "disabled_by": entity.disabled_by,
+                "unique_id": entity.unique_id,
+                "capabilities": entity.capabilities,
+                "supported_features": entity.supported_features,
+                "device_class": entity.device_class,
+                "unit_of_measurement": entity.unit_of_measurement,
+            }
+        )
+
+    if state:
+        result.update(
+            {
+                "state": state.state,
+                "attributes": dict(state.attributes),
+                "last_changed": state.last_changed.isoformat(),
+                "last_updated": state.last_updated.isoformat(),
+            }
+        )
+    return result
+
+
+async def handle_update_entity_state(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> None:
+    """Handle update_entity_state service call."""
+    entity_id = call.data["entity_id"]
+    state = call.data["state"]
+    attributes = call.data.get("attributes", {})
+
+    hass.states.async_set(entity_id, state, attributes)
+    _LOGGER.info(f"Updated entity state {entity_id} to {state}")
+
+
+async def handle_get_entity_history(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle get_entity_history service call.
+
+    Windows that start within the cache's retention period are answered from
+    ``entry_data["history"]``. Only on a miss is the recorder queried.
+    """
+    entity_id = call.data["entity_id"]
+    start_time_str = call.data.get("start_time")
+    end_time_str = call.data.get("end_time")
+
+    # Parse time strings or use defaults
+    if start_time_str:
+        start_time = dt_util.parse_datetime(start_time_str)
+        if start_time is None:
+            raise ValueError(f"Invalid start_time {start_time_str}")
+        start_time = dt_util.as_utc(start_time)
+    else:
+        start_time = dt_util.now() - timedelta(hours=24)
+
+    if end_time_str:
+        end_time = dt_util.parse_datetime(end_time_str)
+        if end_time is None:
+            raise ValueError(f"Invalid end_time {end_time_str}")
+        end_time = dt_util.as_utc(end_time)
+    else:
+        end_time = dt_util.now()
+
+    if start_time > end_time:
+        raise ValueError(f"start_time {start_time} is after end_time {end_time}")
+
+    cache = entry_data["history"]
+    start_ts = start_time.timestamp()
+    end_ts = end_time.timestamp()
+    rows = cache.lookup(entity_id, start_ts, end_ts)
+    if rows is None:
+        rows = await _async_load_history(hass, cache, entity_id, start_time, end_time)
+
+    result = [
+        {
+            "state": row.state,
+            "attributes": dict(row.attributes),
+            "last_changed": dt_util.utc_from_timestamp(row.last_changed).isoformat(),
+            "last_updated": dt_util.utc_from_timestamp(row.last_updated).isoformat(),
+        }
+        for row in rows
+    ]
+
+    _LOGGER.info(f"Got {len(result)} history entries for {entity_id}")
+    return {"history": result}
+
+
+async def _async_load_history(
+    hass: HomeAssistant,
+    cache: HistoryCache,
+    entity_id: str,
+    start_time: datetime,
+    end_time: datetime,
+) -> list[HistoryRow]:
+    """Query the recorder, filling the cache when the window is recent enough.
+
+    A fill loads everything from ``start_time`` to now rather than to
+    ``end_time``, so that live changes can be appended to it. Queries run in
+    the recorder's own executor, as database access must.
+    """
+    from homeassistant.components.recorder import get_instance, history
+
+    recorder = get_instance(hass)
+    start_ts = start_time.timestamp()
+    if not cache.cacheable(start_ts) or not cache.begin_fill(entity_id):
+        history_list = await recorder.async_add_executor_job(
+            history.state_changes_during_period, hass, start_time, end_time, entity_id
+        )
+        states = history_list.get(entity_id, [])
+        return [HistoryRow.from_state(state) for state in states]
+
+    try:
+        history_list = await recorder.async_add_executor_job(
+            history.state_changes_during_period, hass, start_time, None, entity_id
+        )
+    except BaseException:
+        cache.abort_fill(entity_id)
+        raise
+    states = history_list.get(entity_id, [])
+    rows = [HistoryRow.from_state(state) for state in states]
+    # The recorder commits in batches, so the latest change may be missing.
+    if (current := hass.states.get(entity_id)) is not None:
+        row = HistoryRow.from_state(current)
+        if not rows or row.last_changed > rows[-1].last_changed:
+            rows.append(row)
+    history_window = cache.complete_fill(entity_id, start_ts, rows)
+    return history_window.window(start_ts, end_time.timestamp())
@@ -0,0 +1,40 @@
+"""Debugging service handlers for the Home Assistant MCP Server."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall
+
+from .const import PROFILE_DIR
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def handle_profile(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle profile service call.
+
+    Samples the event loop for ``duration`` seconds under whatever load is
+    running and writes the collapsed stacks to the profile directory.
+    """
+    duration = call.data["duration"]
+    profiler = entry_data["profiler"]
+
+    token = profiler.begin_window()
+    start = time.monotonic()
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        capture = profiler.end_window(token, time.monotonic() - start)
+
+    path = await hass.async_add_executor_job(
+        capture.write, Path(hass.config.path(PROFILE_DIR))
+    )
+    samples = sum(capture.samples.values())
+    _LOGGER.info(f"Wrote {samples} profile samples to {path}")
+    return {"path": str(path), "samples": samples}
@@ -0,0 +1,45 @@
+"""Diagnostics support for the Home Assistant MCP Server."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .tracing import RingBufferExporter
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    server = entry_data["server"]
+    exporter = server.tracer.exporter
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "metrics": entry_data["metrics"].as_dict(),
+        "scheduler": entry_data["scheduler"].as_dict(),
+        "history_cache": entry_data["history"].as_dict(),
+        "template_cache": entry_data["templates"].as_dict(),
+        "changes": entry_data["index"].changes.as_dict(),
+        "config_index": entry_data["config_index"].as_dict(),
+        "warm_cache": {
+            "sections": entry_data["warm_cache"].as_dict(),
+            "restored_entities": entry_data["index"].restored,
+        },
+        "parser": server.parser.as_dict(),
+        "file_versions": server.versions.as_dict(),
+        "loop_watchdog": entry_data["watchdog"].as_dict(),
+        "validation": (
+            server.validator.as_dict() if server.validator is not None else None
+        ),
+        "traces": (
+            exporter.spans() if isinstance(exporter, RingBufferExporter) else None
+        ),
+    }
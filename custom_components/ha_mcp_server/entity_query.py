@@ -0,0 +1,377 @@
+"""Predicate language and planner for entity queries.
+
+A query is a list of clauses joined by ``and``::
+
+    domain = sensor and device_class = temperature and area_id = kitchen
+    and state > 25
+
+Each clause compares one field with a literal. The supported operators are:
+- ``=`` and ``!=``
+- ``<``, ``<=``, ``>`` and ``>=``
+- ``in (a, b, ...)``
+- ``~``, a case-insensitive glob
+
+Literals may be quoted strings, numbers, ``true``, ``false`` or ``null``.
+Any other bare word is a string. Numbers compare numerically with states
+and attributes that parse as numbers, so ``state > 25`` works on sensor
+states even though they are strings.
+
+Some fields have a ``FieldIndex``: a map from each distinct value to the
+entities that have it. ``plan_query`` answers what it can from those
+indexes. It starts with the cheapest predicate and narrows from there. Only
+the predicates it could not answer from an index are checked entity by
+entity.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+import operator
+import re
+from sys import intern
+from typing import Any
+
+# Fields with a secondary index.
+INDEXED_FIELDS = ("domain", "device_class", "area_id", "platform", "state")
+# Registry fields that can be filtered on but are checked per entity.
+REGISTRY_FIELDS = frozenset(
+    {"entity_id", "device_id", "disabled_by", "name", "unit_of_measurement"}
+)
+ATTRIBUTE_PREFIX = "attributes."
+
+_RANGE_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+_KEYWORDS = {"null": None, "none": None, "true": True, "false": False}
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|!=|==|=|<|>|~)
+      | (?P<punct>[(),])
+      | (?P<word>[^\s(),=<>!~"']+)
+    )""",
+    re.VERBOSE,
+)
+
+
+class QueryError(ValueError):
+    """Raised for a query that cannot be parsed."""
+
+
+@dataclass(frozen=True, slots=True)
+class Predicate:
+    """One ``field operator value`` clause."""
+
+    field: str
+    op: str
+    value: Any
+
+    def test(self, actual: Any) -> bool:
+        """Return whether ``actual`` satisfies the clause."""
+        if self.op == "=":
+            return _equal(actual, self.value)
+        if self.op == "!=":
+            return not _equal(actual, self.value)
+        if self.op == "in":
+            return any(_equal(actual, value) for value in self.value)
+        if self.op == "~":
+            return actual is not None and fnmatchcase(str(actual).lower(), self.value)
+        pair = _comparable(actual, self.value)
+        return pair is not None and _RANGE_OPERATORS[self.op](*pair)
+
+
+def _number(value: Any) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _equal(actual: Any, expected: Any) -> bool:
+    if expected is None or actual is None:
+        return actual is expected
+    if isinstance(expected, bool):
+        if isinstance(actual, bool):
+            return actual is expected
+        return str(actual).lower() == str(expected).lower()
+    if isinstance(expected, (int, float)):
+        return _number(actual) == expected
+    return str(actual) == expected
+
+
+def _comparable(actual: Any, expected: Any) -> tuple[Any, Any] | None:
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        number = _number(actual)
+        return None if number is None else (number, expected)
+    if isinstance(expected, str) and isinstance(actual, str):
+        return actual, expected
+    return None
+
+
+def _literal(kind: str, text: str) -> Any:
+    if kind == "string":
+        return re.sub(r"\\(.)", r"\1", text[1:-1])
+    lowered = text.lower()
+    if lowered in _KEYWORDS:
+        return _KEYWORDS[lowered]
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _tokens(query: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = _TOKEN_RE.match(query, position)
+        if match is None:
+            raise QueryError(
+                f"Unexpected input at position {position}: {query[position:]!r}"
+            )
+        kind = match.lastgroup
+        assert kind is not None
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+def parse_query(query: str) -> list[Predicate]:
+    """Parse ``query`` into its clauses.
+
+    Raises:
+        QueryError: If the query is malformed or names an unknown field
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        raise QueryError("Query is empty")
+    predicates = []
+    position = 0
+
+    def take(description: str) -> tuple[str, str]:
+        nonlocal position
+        if position >= len(tokens):
+            raise QueryError(f"Expected {description} at end of query")
+        token = tokens[position]
+        position += 1
+        return token
+
+    while True:
+        kind, name = take("a field name")
+        if kind != "word":
+            raise QueryError(f"Expected a field name, got {name!r}")
+        if not (
+            name in INDEXED_FIELDS
+            or name in REGISTRY_FIELDS
+            or (name.startswith(ATTRIBUTE_PREFIX) and name != ATTRIBUTE_PREFIX)
+        ):
+            raise QueryError(f"Unknown field {name!r}")
+
+        kind, op = take("an operator")
+        if kind == "word" and op.lower() == "in":
+            if take("'('") != ("punct", "("):
+                raise QueryError(f"Expected '(' after 'in' for {name!r}")
+            values = []
+            while True:
+                kind, text = take("a value")
+                if kind not in ("string", "word"):
+                    raise QueryError(f"Expected a value in the list for {name!r}")
+                values.append(_literal(kind, text))
+                kind, text = take("',' or ')'")
+                if text == ")":
+                    break
+                if text != ",":
+                    raise QueryError(f"Expected ',' or ')' in the list for {name!r}")
+            predicates.append(Predicate(name, "in", tuple(values)))
+        elif kind == "op":
+            kind, text = take("a value")
+            if kind not in ("string", "word"):
+                raise QueryError(f"Expected a value after {op!r}")
+            value = _literal(kind, text)
+            if op == "~":
+                value = str(value).lower()
+            elif op in _RANGE_OPERATORS and value is None:
+                raise QueryError(f"Cannot compare {name!r} {op} null")
+            predicates.append(Predicate(name, "=" if op == "==" else op, value))
+        else:
+            raise QueryError(f"Expected an operator after {name!r}, got {op!r}")
+
+        if position == len(tokens):
+            return predicates
+        kind, text = take("'and'")
+        if kind != "word" or text.lower() != "and":
+            raise QueryError(f"Expected 'and', got {text!r}")
+
+
+class FieldIndex:
+    """Maps each distinct value of one field to the entities having it."""
+
+    __slots__ = ("_values", "_by_id")
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._values: dict[Any, set[str]] = {}
+        self._by_id: dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed entities."""
+        return len(self._by_id)
+
+    @property
+    def distinct(self) -> int:
+        """Return the number of distinct values."""
+        return len(self._values)
+
+    def ids(self) -> Iterable[str]:
+        """Return the indexed entity ids."""
+        return self._by_id.keys()
+
+    def get(self, doc_id: str) -> Any:
+        """Return the indexed value of ``doc_id``, or ``None``."""
+        return self._by_id.get(doc_id)
+
+    def set(self, doc_id: str, value: Any) -> None:
+        """Index ``doc_id`` under ``value``; ``None`` removes it.
+
+        String values are interned, so entities sharing a value, such as a
+        domain sliced from each entity id, share one copy of it.
+        """
+        if isinstance(value, str):
+            value = intern(value)
+        old = self._by_id.get(doc_id)
+        if old == value:
+            return
+        if old is not None:
+            members = self._values[old]
+            members.discard(doc_id)
+            if not members:
+                del self._values[old]
+        if value is None:
+            self._by_id.pop(doc_id, None)
+            return
+        self._by_id[doc_id] = value
+        self._values.setdefault(value, set()).add(doc_id)
+
+    def discard(self, doc_id: str) -> None:
+        """Remove ``doc_id`` from the index."""
+        self.set(doc_id, None)
+
+    def lookup(self, predicate: Predicate) -> set[str] | None:
+        """Answer ``=`` and ``in`` on string values with dictionary lookups.
+
+        Returns ``None`` when the predicate needs a scan of the values.
+        The returned set belongs to the index and must not be modified.
+        """
+        if predicate.op == "=" and isinstance(predicate.value, str):
+            return self._values.get(predicate.value, set())
+        if predicate.op == "in" and all(
+            isinstance(value, str) for value in predicate.value
+        ):
+            return set().union(
+                *(self._values.get(value, ()) for value in predicate.value)
+            )
+        return None
+
+    def scan(self, predicate: Predicate) -> set[str]:
+        """Return the entities whose value satisfies ``predicate``.
+
+        This tests every distinct value once, not every entity.
+        """
+        return set().union(
+            *(members for value, members in self._values.items() if predicate.test(value))
+        )
+
+
+def _indexable(predicate: Predicate) -> bool:
+    """Return whether an index can answer the predicate on its own.
+
+    Entities without a value are missing from an index. So ``!=`` and
+    ``= null`` must be checked on each entity.
+    """
+    if predicate.op == "!=":
+        return False
+    if predicate.op == "=":
+        return predicate.value is not None
+    if predicate.op == "in":
+        return None not in predicate.value
+    return True
+
+
+@dataclass(slots=True)
+class QueryPlan:
+    """How a query will be answered.
+
+    ``candidates`` is ``None`` when no index applied and every entity has to
+    be checked. ``residual`` holds the predicates still to test per entity.
+    """
+
+    candidates: set[str] | None
+    residual: list[Predicate]
+    indexed: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable summary."""
+        return {
+            "indexed": self.indexed,
+            "residual": [predicate.field for predicate in self.residual],
+            "candidates": None if self.candidates is None else len(self.candidates),
+        }
+
+
+def plan_query(
+    predicates: list[Predicate], indexes: Mapping[str, FieldIndex]
+) -> QueryPlan:
+    """Choose which predicates to answer from ``indexes``.
+
+    Exact-value lookups are applied first, smallest first. A predicate that
+    needs a scan of an index's distinct values is applied only if there are
+    fewer distinct values than candidates left. Otherwise testing the
+    candidates directly is cheaper.
+    """
+    lookups: list[tuple[int, Predicate, set[str]]] = []
+    scans: list[Predicate] = []
+    residual: list[Predicate] = []
+    for predicate in predicates:
+        index = indexes.get(predicate.field)
+        if index is None or not _indexable(predicate):
+            residual.append(predicate)
+        elif (ids := index.lookup(predicate)) is not None:
+            lookups.append((len(ids), predicate, ids))
+        else:
+            scans.append(predicate)
+
+    plan = QueryPlan(None, residual)
+    lookups.sort(key=lambda lookup: lookup[0])
+    for _, predicate, ids in lookups:
+        if plan.candidates is None:
+            plan.candidates = set(ids)
+        else:
+            plan.candidates &= ids
+        plan.indexed.append(predicate.field)
+
+    scans.sort(key=lambda predicate: indexes[predicate.field].distinct)
+    for predicate in scans:
+        index = indexes[predicate.field]
+        if plan.candidates is not None and index.distinct >= len(plan.candidates):
+            residual.append(predicate)
+            continue
+        ids = index.scan(predicate)
+        plan.candidates = ids if plan.candidates is None else plan.candidates & ids
+        plan.indexed.append(predicate.field)
+    return plan
@@ -0,0 +1,129 @@
+"""Version tokens for conditional reads and writes.
+
+A version token, or ETag, names one version of a service's result. A client
+asks for tokens with ``include_etag`` or ``if_none_match``; the result then
+comes back wrapped with its ``etag``. A client that sends back the token it
+last saw as ``if_none_match`` gets ``{"not_modified": true}`` instead of the
+result when nothing changed. ``if_match`` on a write only writes if the file
+is still at that version.
+
+Tokens are cheap to check where the result is expensive to build:
+- A config file's token is a hash of its bytes. ``FileVersions`` remembers
+  the hash of each file under its ``(mtime_ns, size)``, the signature the
+  config index uses as well. An unchanged file is answered from one
+  ``stat`` and is not read, parsed or serialized.
+- A registry listing's token is the ``ChangeLog`` revision of the last
+  change to a record of the kind it lists.
+- A listing with no revision to go by, such as users or config entries, is
+  hashed after it is built. That still saves serializing and sending it.
+
+A file modified within the same clock tick as the ``stat`` that saw it could
+keep its size and mtime while its content changes. Like git's racy-clean
+check, hashes of files modified less than ``RACY_WINDOW_NS`` ago are not
+remembered, so those files are hashed again on the next check.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+import hashlib
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+RACY_WINDOW_NS = 2_000_000_000
+DEFAULT_CAPACITY = 1024
+
+
+class PreconditionFailed(ValueError):
+    """Raised when a write's ``if_match`` is not the file's current version."""
+
+    def __init__(self, filename: str, expected: str, actual: str | None) -> None:
+        """Initialize with the version expected and the one found."""
+        self.filename = filename
+        self.expected = expected
+        self.actual = actual
+        found = "it does not exist" if actual is None else f"it is at {actual}"
+        super().__init__(
+            f"Refusing to write {filename}: expected version {expected}, but {found}"
+        )
+
+
+def content_etag(data: bytes) -> str:
+    """Return the version token of ``data``."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def value_etag(value: Any) -> str:
+    """Return the version token of a JSON-serializable value."""
+    return content_etag(
+        json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+    )
+
+
+def wants_etag(data: Mapping[str, Any]) -> bool:
+    """Return whether a service call asked for version tokens.
+
+    Results keep their plain shape unless the caller sends ``include_etag``
+    or ``if_none_match``, so existing clients see no change.
+    """
+    return bool(data.get("include_etag")) or "if_none_match" in data
+
+
+def not_modified(etag: str) -> dict[str, Any]:
+    """Return the response for a result still at version ``etag``."""
+    return {"not_modified": True, "etag": etag}
+
+
+class FileVersions:
+    """Content hashes of files, remembered while their size and mtime hold.
+
+    Methods block on file I/O and are safe to call from several threads.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Initialize an empty cache of at most ``capacity`` files."""
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._known: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, path: Path) -> str:
+        """Return the version token of the file at ``path``.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        stat = path.stat()
+        key = str(path)
+        known = self._known.get(key)
+        if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            self.hits += 1
+            return known[2]
+        self.misses += 1
+        etag = content_etag(path.read_bytes())
+        self._remember(key, stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+    def record(self, path: Path, data: bytes) -> str:
+        """Remember ``data`` as just written to ``path`` and return its token."""
+        stat = path.stat()
+        etag = content_etag(data)
+        self._remember(str(path), stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+    def _remember(self, key: str, mtime_ns: int, size: int, etag: str) -> None:
+        with self._lock:
+            if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+                self._known.pop(key, None)
+                return
+            self._known.pop(key, None)
+            self._known[key] = (mtime_ns, size, etag)
+            if len(self._known) > self.capacity:
+                del self._known[next(iter(self._known))]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return cache statistics."""
+        return {"files": len(self._known), "hits": self.hits, "misses": self.misses}
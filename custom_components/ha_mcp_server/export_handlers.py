@@ -0,0 +1,203 @@
+"""State export service handlers for the Home Assistant MCP Server."""
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+import itertools
+import logging
+from pathlib import Path
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall, State
+import homeassistant.helpers.area_registry as ar
+import homeassistant.helpers.device_registry as dr
+import homeassistant.helpers.entity_registry as er
+from homeassistant.helpers.json import json_encoder_default
+import homeassistant.util.dt as dt_util
+
+from .const import EXPORT_DIR
+from .state_export import EXPORT_VERSION, SnapshotWriter, export_filename
+
+_LOGGER = logging.getLogger(__name__)
+
+# Records gathered on the event loop per executor round trip.
+CHUNK_SIZE = 500
+
+# A chunk item: record kind, id, and the registry entry and state it is built
+# from. Entries and states are immutable, so building the records from them in
+# the executor is safe.
+Item = tuple[str, str, Any, State | None]
+
+
+def _record(item: Item) -> dict[str, Any]:
+    """Build the export record of one gathered item."""
+    kind, key, entry, state = item
+    if entry is None and state is None:
+        return {"type": "removed", "kind": kind, "id": key}
+    if kind == "area":
+        return {"type": "area", "id": key, "name": entry.name}
+    if kind == "device":
+        return {
+            "type": "device",
+            "id": key,
+            "name": entry.name or entry.name_by_user,
+            "manufacturer": entry.manufacturer,
+            "model": entry.model,
+            "sw_version": entry.sw_version,
+            "hw_version": entry.hw_version,
+            "identifiers": list(entry.identifiers),
+            "connections": list(entry.connections),
+            "config_entries": list(entry.config_entries),
+            "area_id": entry.area_id,
+            "disabled_by": entry.disabled_by,
+        }
+    record: dict[str, Any] = {"type": "entity", "entity_id": key}
+    if entry is not None:
+        record.update(
+            {
+                "name": entry.name or entry.original_name,
+                "platform": entry.platform,
+                "device_id": entry.device_id,
+                "area_id": entry.area_id,
+                "disabled_by": entry.disabled_by,
+                "unique_id": entry.unique_id,
+                "device_class": entry.device_class or entry.original_device_class,
+                "unit_of_measurement": entry.unit_of_measurement,
+            }
+        )
+    if state is not None:
+        record.update(
+            {
+                "state": state.state,
+                "attributes": dict(state.attributes),
+                "last_changed": state.last_changed.isoformat(),
+                "last_updated": state.last_updated.isoformat(),
+            }
+        )
+    return record
+
+
+def _write_chunk(writer: SnapshotWriter, chunk: list[Item]) -> None:
+    writer.write(map(_record, chunk))
+
+
+def _chunks(items: Iterable[Item], size: int = CHUNK_SIZE) -> Iterator[list[Item]]:
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _header_records(
+    hass: HomeAssistant, revision: str, since: str | None
+) -> list[dict[str, Any]]:
+    """Return the header, user and integration records.
+
+    Users and config entries are few and have no change events the index
+    follows, so they are part of every export, deltas included.
+    """
+    records: list[dict[str, Any]] = [
+        {
+            "type": "header",
+            "version": EXPORT_VERSION,
+            "revision": revision,
+            "since": since,
+            "created": dt_util.utcnow().isoformat(),
+        }
+    ]
+    records.extend(
+        {
+            "type": "user",
+            "id": user.id,
+            "name": user.name,
+            "is_owner": user.is_owner,
+            "is_active": user.is_active,
+            "system_generated": user.system_generated,
+            "local_only": user.local_only,
+        }
+        for user in hass.auth.async_get_users()
+    )
+    records.extend(
+        {
+            "type": "integration",
+            "entry_id": entry.entry_id,
+            "domain": entry.domain,
+            "title": entry.title,
+            "state": entry.state.name,
+            "source": entry.source,
+        }
+        for entry in hass.config_entries.async_entries()
+    )
+    return records
+
+
+def _items(
+    hass: HomeAssistant, keys: Iterable[tuple[str, str]]
+) -> Iterator[Item]:
+    """Look up the current entry and state behind each ``(kind, id)``.
+
+    Lookups happen lazily, one chunk at a time on the event loop, so every
+    record reflects the registries at the moment its chunk is gathered.
+    """
+    area_registry = ar.async_get(hass)
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+    for kind, key in keys:
+        if kind == "area":
+            yield kind, key, area_registry.async_get_area(key), None
+        elif kind == "device":
+            yield kind, key, device_registry.async_get(key), None
+        else:
+            yield kind, key, entity_registry.async_get(key), hass.states.get(key)
+
+
+async def handle_export_snapshot(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle export_snapshot service call.
+
+    Records are gathered on the event loop in chunks of ``CHUNK_SIZE`` and
+    encoded, compressed and written in the executor, one chunk at a time.
+    """
+    index = entry_data["index"]
+    await index.async_ensure_ready(entry_data["loop_budget"])
+    changes = index.changes
+
+    since_token = call.data.get("since_revision")
+    since = None if since_token is None else changes.since(since_token)
+    revision = changes.token()
+    if since is None:
+        keys: list[tuple[str, str]] = [
+            *(("area", area_id) for area_id in ar.async_get(hass).areas),
+            *(("device", device_id) for device_id in dr.async_get(hass).devices),
+            *(("entity", entity_id) for entity_id in index.entity_ids()),
+        ]
+    else:
+        keys = changes.removed_since(since) + changes.changed_since(since)
+
+    fmt = call.data["format"]
+    path = Path(hass.config.path(EXPORT_DIR, export_filename(fmt, since is not None)))
+    writer = await hass.async_add_executor_job(
+        SnapshotWriter, path, fmt, json_encoder_default
+    )
+    started = time.perf_counter()
+    try:
+        header = _header_records(hass, revision, None if since is None else since_token)
+        await hass.async_add_executor_job(writer.write, header)
+        for chunk in _chunks(_items(hass, keys)):
+            await hass.async_add_executor_job(_write_chunk, writer, chunk)
+        size = await hass.async_add_executor_job(writer.close)
+    except BaseException:
+        await hass.async_add_executor_job(writer.abort)
+        raise
+
+    _LOGGER.info(
+        f"Exported {writer.records} records to {path} in "
+        f"{time.perf_counter() - started:.1f} s"
+    )
+    return {
+        "path": path.relative_to(hass.config.path()).as_posix(),
+        "revision": revision,
+        "delta": since is not None,
+        "records": writer.records,
+        "bytes": size,
+    }
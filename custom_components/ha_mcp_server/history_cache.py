@@ -0,0 +1,268 @@
+"""Memory-bounded cache of recent entity history.
+
+Each cached entity keeps its state changes in columns rather than as
+``State`` objects. The columns are:
+- ``array('d')`` timestamps for last changed and last updated
+- ``array('I')`` indices into a per-entity table of interned state strings
+- ``array('I')`` indices into a per-entity table of attribute mappings
+
+Only the first use of a state string or attribute mapping is stored;
+repeated values are shared.
+
+An entity enters the cache the first time its history is asked for: the
+caller loads the window from the recorder with ``begin_fill`` /
+``complete_fill``. From then on, live state changes are appended as they
+happen. Any later window that starts inside the covered span is answered
+from memory. Rows older than the retention period are trimmed. When the
+cache holds more than ``max_rows`` rows in total, the least recently
+queried entities are evicted.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Mapping
+import time
+from typing import Any, NamedTuple
+
+DEFAULT_RETENTION = 25 * 3600  # seconds; covers rolling 24 hour windows
+DEFAULT_MAX_ROWS = 200_000
+# Bytes per row held in the columns: two doubles and two indices.
+ROW_BYTES = 8 + 8 + 4 + 4
+
+
+class HistoryRow(NamedTuple):
+    """One cached state change."""
+
+    state: str
+    attributes: Mapping[str, Any]
+    last_changed: float
+    last_updated: float
+
+    @classmethod
+    def from_state(cls, state: Any) -> HistoryRow:
+        """Return the row for a Home Assistant ``State``."""
+        return cls(
+            state.state,
+            state.attributes,
+            state.last_changed.timestamp(),
+            state.last_updated.timestamp(),
+        )
+
+
+class EntityHistory:
+    """Columnar state changes of one entity, oldest first."""
+
+    __slots__ = (
+        "covered_from",
+        "changed",
+        "updated",
+        "state_ids",
+        "attribute_ids",
+        "_states",
+        "_state_index",
+        "_attributes",
+    )
+
+    def __init__(self, covered_from: float) -> None:
+        """Initialize an empty history that is complete from ``covered_from``."""
+        self.covered_from = covered_from
+        self.changed = array("d")
+        self.updated = array("d")
+        self.state_ids = array("I")
+        self.attribute_ids = array("I")
+        self._states: list[str] = []
+        self._state_index: dict[str, int] = {}
+        self._attributes: list[Mapping[str, Any]] = []
+
+    def __len__(self) -> int:
+        """Return the number of rows."""
+        return len(self.changed)
+
+    def append(self, row: HistoryRow) -> None:
+        """Append a row; rows must arrive in timestamp order."""
+        if self.changed and row.last_updated <= self.updated[-1]:
+            return
+        state_id = self._state_index.get(row.state)
+        if state_id is None:
+            state_id = self._state_index[row.state] = len(self._states)
+            self._states.append(row.state)
+        # Home Assistant reuses the attribute mapping of the previous state
+        # when it did not change, so comparing with the last one dedups most.
+        attributes = self._attributes
+        if attributes and (
+            attributes[-1] is row.attributes or attributes[-1] == row.attributes
+        ):
+            attribute_id = len(attributes) - 1
+        else:
+            attribute_id = len(attributes)
+            attributes.append(row.attributes)
+        self.changed.append(row.last_changed)
+        self.updated.append(row.last_updated)
+        self.state_ids.append(state_id)
+        self.attribute_ids.append(attribute_id)
+
+    def row(self, index: int) -> HistoryRow:
+        """Return the row at ``index``."""
+        return HistoryRow(
+            self._states[self.state_ids[index]],
+            self._attributes[self.attribute_ids[index]],
+            self.changed[index],
+            self.updated[index],
+        )
+
+    def window(self, start: float, end: float) -> list[HistoryRow]:
+        """Return the state in effect at ``start`` and the changes up to ``end``."""
+        first = max(bisect_right(self.changed, start) - 1, 0)
+        last = bisect_right(self.changed, end)
+        return [self.row(index) for index in range(first, last)]
+
+    def trim(self, cutoff: float) -> int:
+        """Drop rows no longer needed to answer windows starting at ``cutoff``.
+
+        The row in effect at ``cutoff`` is kept. The interned tables are
+        rebuilt so dropped values are released. Returns the rows removed.
+        """
+        if cutoff <= self.covered_from:
+            return 0
+        self.covered_from = cutoff
+        keep_from = max(bisect_right(self.changed, cutoff) - 1, 0)
+        if keep_from == 0:
+            return 0
+        rows = [self.row(index) for index in range(keep_from, len(self))]
+        self.changed = array("d")
+        self.updated = array("d")
+        self.state_ids = array("I")
+        self.attribute_ids = array("I")
+        self._states = []
+        self._state_index = {}
+        self._attributes = []
+        for row in rows:
+            self.append(row)
+        return keep_from
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the state table."""
+        return len(self) * ROW_BYTES + sum(len(state) + 49 for state in self._states)
+
+
+class HistoryCache:
+    """Recent history of the entities that have been asked for."""
+
+    def __init__(
+        self,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        retention: float = DEFAULT_RETENTION,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_rows: Rows kept across all entities before evicting
+            retention: Seconds of history kept per entity
+            clock: Wall clock returning epoch seconds
+        """
+        self.max_rows = max_rows
+        self.retention = retention
+        self._clock = clock
+        self._entities: OrderedDict[str, EntityHistory] = OrderedDict()
+        self._filling: dict[str, list[HistoryRow]] = {}
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, entity_id: object) -> bool:
+        """Return whether ``entity_id`` is cached or being filled."""
+        return entity_id in self._entities or entity_id in self._filling
+
+    def cacheable(self, start: float) -> bool:
+        """Return whether a window starting at ``start`` is kept once loaded."""
+        return start >= self._clock() - self.retention
+
+    def lookup(
+        self, entity_id: str, start: float, end: float
+    ) -> list[HistoryRow] | None:
+        """Return the cached window, or ``None`` if it is not covered."""
+        history = self._entities.get(entity_id)
+        if history is None or start < history.covered_from:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entities.move_to_end(entity_id)
+        return history.window(start, end)
+
+    def begin_fill(self, entity_id: str) -> bool:
+        """Start buffering live changes while the recorder is queried.
+
+        Returns ``False`` if a fill for the entity is already running; the
+        caller should then query the recorder without filling.
+        """
+        if entity_id in self._filling:
+            return False
+        self._filling[entity_id] = []
+        return True
+
+    def abort_fill(self, entity_id: str) -> None:
+        """Drop a fill whose recorder query failed."""
+        self._filling.pop(entity_id, None)
+
+    def complete_fill(
+        self, entity_id: str, start: float, rows: Iterable[HistoryRow]
+    ) -> EntityHistory:
+        """Cache ``rows`` from the recorder as complete from ``start``.
+
+        Changes buffered since ``begin_fill`` are appended after them, so
+        nothing that happened during the query is lost.
+        """
+        buffered = self._filling.pop(entity_id, [])
+        old = self._entities.pop(entity_id, None)
+        if old is not None:
+            self._rows -= len(old)
+        history = EntityHistory(start)
+        for row in rows:
+            history.append(row)
+        for row in buffered:
+            history.append(row)
+        history.trim(self._clock() - self.retention)
+        self._entities[entity_id] = history
+        self._rows += len(history)
+        self._evict()
+        return history
+
+    def append(self, entity_id: str, row: HistoryRow) -> None:
+        """Record a live state change if the entity is cached."""
+        if (buffered := self._filling.get(entity_id)) is not None:
+            buffered.append(row)
+        history = self._entities.get(entity_id)
+        if history is None:
+            return
+        before = len(history)
+        history.append(row)
+        self._rows += len(history) - before
+        # Trimming copies the columns, so only do it once a quarter of the
+        # rows are stale; windows are still answered correctly meanwhile.
+        cutoff = self._clock() - self.retention
+        if len(history) > 4 and history.changed[len(history) // 4] < cutoff:
+            self._rows -= history.trim(cutoff)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._rows > self.max_rows and len(self._entities) > 1:
+            _, history = self._entities.popitem(last=False)
+            self._rows -= len(history)
+            self.evictions += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return size and hit statistics."""
+        return {
+            "entities": len(self._entities),
+            "rows": self._rows,
+            "max_rows": self.max_rows,
+            "bytes": sum(history.nbytes for history in self._entities.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,340 @@
+"""Registry-backed indexes for the MCP Server.
+
+``HomeIndex`` mirrors the entity, device and area registries and the state
+machine into structures that answer lookups without walking the registries:
+- ``SearchIndex``: fuzzy search over entity names, devices and areas
+- ``FieldIndex``: one per queryable field, mapping values to entity ids
+- ``TopologyGraph``: the tree of areas, devices and entities
+- ``ChangeLog``: a revision for every change, for delta exports
+
+It is built on first use, in slices that leave the event loop responsive, and
+from then on kept current by the registry update and state changed events, so
+a change costs a handful of dictionary updates instead of a rebuild.
+
+Every update re-reads the registries for the ids it was given. Updates are
+therefore idempotent and may arrive in any order, which is what lets the
+initial build and the event listeners run side by side.
+
+Tokenizing names for the search index is most of the cost of a build, so the
+weighted tokens of each entity are kept in the ``WarmCache`` together with
+the searchable text they were derived from. The next build compares that
+text with the live registries and reuses the saved tokens of every entity
+whose name, device and area did not change while Home Assistant was down.
+Saving does not walk every entity either: the snapshot handed to the cache is
+kept between saves, and only the entities changed since the last one are
+updated in it, in slices under the loop budget.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+import homeassistant.helpers.area_registry as ar
+import homeassistant.helpers.device_registry as dr
+import homeassistant.helpers.entity_registry as er
+
+from .cooperative import DEFAULT_LOOP_BUDGET, async_for_each
+from .entity_query import INDEXED_FIELDS, FieldIndex
+from .search_index import SearchIndex, TokenWeights
+from .state_export import ChangeLog
+from .topology import DeviceNode, TopologyGraph
+
+if TYPE_CHECKING:
+    from .warm_cache import WarmCache
+
+_LOGGER = logging.getLogger(__name__)
+
+WARM_SECTION = "home_index"
+INDEX_VERSION = 2
+
+# The searchable text of an entity: the values of ``_search_fields``. The
+# fields present differ in number, so the values alone tell them apart.
+SearchSource = tuple[str | None, ...]
+
+
+class HomeIndex:
+    """Incrementally maintained indexes over the Home Assistant registries."""
+
+    def __init__(self, hass: HomeAssistant, cache: WarmCache | None = None) -> None:
+        """Initialize an empty index; nothing is read until first use.
+
+        Args:
+            hass: Home Assistant instance
+            cache: Cache the search tokens are persisted in; not persisted
+                when ``None``
+        """
+        self.hass = hass
+        self.cache = cache
+        self.search = SearchIndex()
+        self.fields = {name: FieldIndex() for name in INDEXED_FIELDS}
+        self.graph = TopologyGraph()
+        self.changes = ChangeLog()
+        self._unsubscribe: list[CALLBACK_TYPE] = []
+        self._build: asyncio.Task[None] | None = None
+        self._ready = False
+        self._sources: dict[str, SearchSource] = {}
+        self._saved: dict[str, tuple[SearchSource, TokenWeights]] = {}
+        self._warm: dict[str, tuple[SearchSource, TokenWeights]] = {}
+        self._unsaved: set[str] = set()
+        self.restored = 0
+
+    @property
+    def ready(self) -> bool:
+        """Return whether the initial build has finished."""
+        return self._ready
+
+    async def async_ensure_ready(self, budget: float = DEFAULT_LOOP_BUDGET) -> None:
+        """Build the index if needed; concurrent callers share one build."""
+        if self._ready:
+            return
+        if self._build is None:
+            self._build = self.hass.async_create_task(
+                self._async_build(budget), "ha_mcp_server build index"
+            )
+        build = self._build
+        try:
+            await asyncio.shield(build)
+        except Exception:
+            # A failed build is dropped so the next caller starts a fresh one.
+            if self._build is build and build.done():
+                self._build = None
+            raise
+
+    async def _async_build(self, budget: float) -> None:
+        # Listen first: anything that changes while the build is suspended is
+        # then applied by the listeners, and applying it twice is harmless.
+        bus = self.hass.bus
+        self._unsubscribe = [
+            bus.async_listen(ar.EVENT_AREA_REGISTRY_UPDATED, self._async_area_updated),
+            bus.async_listen(
+                dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_updated
+            ),
+            bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_updated
+            ),
+            bus.async_listen(EVENT_STATE_CHANGED, self._async_state_changed),
+        ]
+        try:
+            await self._async_build_entries(budget)
+        except BaseException:
+            for unsubscribe in self._unsubscribe:
+                unsubscribe()
+            self._unsubscribe = []
+            self._saved = {}
+            raise
+
+    async def _async_build_entries(self, budget: float) -> None:
+        device_registry = dr.async_get(self.hass)
+        entity_registry = er.async_get(self.hass)
+        if self.cache is not None:
+            self._saved = (
+                await self.hass.async_add_executor_job(
+                    self.cache.get, WARM_SECTION, INDEX_VERSION
+                )
+                or {}
+            )
+        await async_for_each(ar.async_get(self.hass).areas, self._refresh_area, budget)
+        await async_for_each(device_registry.devices, self._refresh_device, budget)
+        await async_for_each(
+            {
+                **dict.fromkeys(entity_registry.entities),
+                **dict.fromkeys(self.hass.states.async_entity_ids()),
+            },
+            self.refresh_entity,
+            budget,
+        )
+        # Entities removed while Home Assistant was down.
+        self._unsaved.update(self._saved)
+        self._saved = {}
+        self._ready = True
+        _LOGGER.info(
+            f"Indexed {len(self.search)} entities from "
+            f"{len(device_registry.devices)} devices, "
+            f"{self.restored} restored from the warm cache"
+        )
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop following the registries."""
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+        if self._build is not None and not self._build.done():
+            self._build.cancel()
+
+    async def async_warm_state(
+        self, budget: float = DEFAULT_LOOP_BUDGET
+    ) -> dict[str, tuple[SearchSource, TokenWeights]] | None:
+        """Return the search tokens to persist, or ``None`` if unchanged.
+
+        Each entity maps to its searchable text and weighted tokens. Only
+        the entities changed since the last call are looked up. Call from the
+        event loop; encoding the result is safe in any thread.
+        """
+        if not self._ready or not self._unsaved:
+            return None
+        unsaved, self._unsaved = self._unsaved, set()
+        await async_for_each(unsaved, self._update_warm, budget)
+        # The worker encodes a copy, so later updates cannot race with it.
+        return dict(self._warm)
+
+    def _update_warm(self, entity_id: str) -> None:
+        source = self._sources.get(entity_id)
+        tokens = self.search.tokens(entity_id)
+        if source is None or tokens is None:
+            self._warm.pop(entity_id, None)
+        else:
+            self._warm[entity_id] = (source, tokens)
+
+    def put_warm_state(
+        self, state: dict[str, tuple[SearchSource, TokenWeights]]
+    ) -> None:
+        """Hand an ``async_warm_state`` result to the cache from a worker thread."""
+        if self.cache is not None:
+            self.cache.put(WARM_SECTION, INDEX_VERSION, state)
+
+    def entity_ids(self) -> Iterable[str]:
+        """Return every known entity id, from the registry or the state machine."""
+        return self.fields["domain"].ids()
+
+    def _refresh_area(self, area_id: str) -> None:
+        area = ar.async_get(self.hass).async_get_area(area_id)
+        self.graph.set_area(area_id, None if area is None else area.name)
+        if area is None:
+            self.changes.remove("area", area_id)
+        else:
+            self.changes.touch("area", area_id)
+
+    def _refresh_device(self, device_id: str) -> None:
+        device = dr.async_get(self.hass).async_get(device_id)
+        if device is None:
+            self.changes.remove("device", device_id)
+        else:
+            self.changes.touch("device", device_id)
+        self.graph.set_device(
+            device_id,
+            None
+            if device is None
+            else DeviceNode(
+                device.name_by_user or device.name,
+                device.manufacturer,
+                device.model,
+                device.area_id,
+            ),
+        )
+
+    def refresh_entity(self, entity_id: str) -> None:
+        """Re-read one entity from the registries and update every index."""
+        entry = er.async_get(self.hass).async_get(entity_id)
+        state = self.hass.states.get(entity_id)
+        if entry is None and state is None:
+            self.changes.remove("entity", entity_id)
+            if entity_id in self.graph.entity_names:
+                self.graph.remove_entity(entity_id)
+        elif entry is None:
+            self.changes.touch("entity", entity_id)
+            self.graph.set_entity(entity_id, None, None, None)
+        else:
+            self.changes.touch("entity", entity_id)
+            self.graph.set_entity(
+                entity_id,
+                entry.name or entry.original_name,
+                entry.device_id,
+                entry.area_id,
+            )
+        self._refresh_fields(entity_id, entry, state)
+        if entry is None:
+            if self._sources.pop(entity_id, None) is not None:
+                self._unsaved.add(entity_id)
+            self.search.remove(entity_id)
+            return
+        fields = self._search_fields(entry)
+        source = tuple(fields.values())
+        saved = self._saved.pop(entity_id, None)
+        if saved is not None and saved[0] == source:
+            self.search.restore(entity_id, saved[1])
+            self._warm[entity_id] = saved
+            self.restored += 1
+        elif self._sources.get(entity_id) != source:
+            self.search.upsert(entity_id, fields)
+            self._unsaved.add(entity_id)
+        self._sources[entity_id] = source
+
+    def _refresh_fields(
+        self, entity_id: str, entry: er.RegistryEntry | None, state: State | None
+    ) -> None:
+        """Update the field indexes of one entity."""
+        fields = self.fields
+        if entry is None and state is None:
+            for index in fields.values():
+                index.discard(entity_id)
+            return
+        device_class = None
+        if entry is not None:
+            device_class = entry.device_class or entry.original_device_class
+        if device_class is None and state is not None:
+            device_class = state.attributes.get("device_class")
+        fields["domain"].set(entity_id, entity_id.partition(".")[0])
+        fields["platform"].set(entity_id, None if entry is None else entry.platform)
+        fields["area_id"].set(entity_id, self.graph.entity_area(entity_id))
+        fields["device_class"].set(entity_id, device_class)
+        fields["state"].set(entity_id, None if state is None else state.state)
+
+    def _search_fields(self, entry: er.RegistryEntry) -> dict[str, str | None]:
+        """Return the searchable text of an entity."""
+        fields: dict[str, str | None] = {
+            "entity_id": entry.entity_id,
+            "name": entry.name,
+            "original_name": entry.original_name,
+        }
+        graph = self.graph
+        if entry.device_id is not None:
+            device = graph.devices.get(entry.device_id)
+            if device is not None:
+                fields["device"] = device.name
+                fields["manufacturer"] = device.manufacturer
+                fields["model"] = device.model
+        if (area_id := graph.entity_area(entry.entity_id)) is not None:
+            fields["area"] = graph.areas.get(area_id)
+        return fields
+
+    def _refresh_entities(self, entity_ids: Iterable[str]) -> None:
+        for entity_id in list(entity_ids):
+            self.refresh_entity(entity_id)
+
+    @callback
+    def _async_entity_updated(self, event: Event) -> None:
+        data: dict[str, Any] = event.data
+        self.refresh_entity(data["entity_id"])
+        if (old_entity_id := data.get("old_entity_id")) is not None:
+            self.refresh_entity(old_entity_id)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        if event.data["old_state"] is None or event.data["new_state"] is None:
+            # An entity appeared in or left the state machine.
+            self.refresh_entity(entity_id)
+            return
+        self.changes.touch("entity", entity_id)
+        self._refresh_fields(
+            entity_id,
+            er.async_get(self.hass).async_get(entity_id),
+            event.data["new_state"],
+        )
+
+    @callback
+    def _async_device_updated(self, event: Event) -> None:
+        device_id = event.data["device_id"]
+        self._refresh_device(device_id)
+        self._refresh_entities(self.graph.device_entities(device_id))
+
+    @callback
+    def _async_area_updated(self, event: Event) -> None:
+        area_id = event.data["area_id"]
+        self._refresh_area(area_id)
+        self._refresh_entities(self.graph.area_entities(area_id))
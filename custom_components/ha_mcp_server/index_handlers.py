@@ -0,0 +1,175 @@
+"""Index-backed lookup service handlers for the MCP Server."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall, State
+import homeassistant.helpers.entity_registry as er
+
+from .cooperative import async_build_list
+from .entity_query import ATTRIBUTE_PREFIX, parse_query, plan_query
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def handle_search(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle search service call."""
+    index = entry_data["index"]
+    await index.async_ensure_ready(entry_data["loop_budget"])
+
+    query = call.data["query"]
+    domain = call.data.get("domain")
+    prefix = f"{domain}."
+
+    def accept(entity_id: str) -> bool:
+        return entity_id.startswith(prefix)
+
+    graph = index.graph
+    results = []
+    for entity_id, score in index.search.search(
+        query, call.data["limit"], accept if domain is not None else None
+    ):
+        device = graph.devices.get(graph.entity_device(entity_id) or "")
+        area_id = graph.entity_area(entity_id)
+        results.append(
+            {
+                "entity_id": entity_id,
+                "name": graph.entity_names.get(entity_id),
+                "score": round(score, 3),
+                "device": None if device is None else device.name,
+                "area": None if area_id is None else graph.areas.get(area_id),
+            }
+        )
+    _LOGGER.info(f"Search for {query!r} returned {len(results)} entities")
+    return {"results": results}
+
+
+def _registry_value(
+    entity: er.RegistryEntry | None, state: State | None, name: str
+) -> Any:
+    """Return a non-indexed field of an entity for a query predicate."""
+    if name.startswith(ATTRIBUTE_PREFIX):
+        if state is None:
+            return None
+        return state.attributes.get(name[len(ATTRIBUTE_PREFIX) :])
+    if name == "name":
+        if entity is not None and (entity.name or entity.original_name):
+            return entity.name or entity.original_name
+        return None if state is None else state.attributes.get("friendly_name")
+    if name == "unit_of_measurement":
+        if entity is not None and entity.unit_of_measurement:
+            return entity.unit_of_measurement
+        return None if state is None else state.attributes.get("unit_of_measurement")
+    if entity is None:
+        return None
+    return getattr(entity, name)
+
+
+async def handle_query_entities(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle query_entities service call."""
+    index = entry_data["index"]
+    predicates = parse_query(call.data["where"])
+    await index.async_ensure_ready(entry_data["loop_budget"])
+
+    plan = plan_query(predicates, index.fields)
+    entity_registry = er.async_get(hass)
+    get_state = hass.states.get
+    fields = index.fields
+    residual = [
+        (predicate, fields.get(predicate.field)) for predicate in plan.residual
+    ]
+
+    def build(entity_id: str) -> str | None:
+        entity = state = None
+        loaded = False
+        for predicate, field_index in residual:
+            if field_index is not None:
+                value = field_index.get(entity_id)
+            elif predicate.field == "entity_id":
+                value = entity_id
+            else:
+                if not loaded:
+                    entity = entity_registry.async_get(entity_id)
+                    state = get_state(entity_id)
+                    loaded = True
+                value = _registry_value(entity, state, predicate.field)
+            if not predicate.test(value):
+                return None
+        return entity_id
+
+    candidates = index.entity_ids() if plan.candidates is None else plan.candidates
+    matched = await async_build_list(candidates, build, entry_data["loop_budget"])
+    matched.sort()
+
+    entities = []
+    for entity_id in matched[: call.data["limit"]]:
+        entity = entity_registry.async_get(entity_id)
+        entities.append(
+            {
+                "entity_id": entity_id,
+                "name": _registry_value(entity, get_state(entity_id), "name"),
+                "state": fields["state"].get(entity_id),
+                "device_class": fields["device_class"].get(entity_id),
+                "area_id": fields["area_id"].get(entity_id),
+                "platform": fields["platform"].get(entity_id),
+            }
+        )
+    _LOGGER.info(
+        f"Query matched {len(matched)} entities "
+        f"({len(plan.indexed)} indexed, {len(plan.residual)} residual predicates)"
+    )
+    return {"entities": entities, "total": len(matched), "plan": plan.as_dict()}
+
+
+async def handle_get_topology(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle get_topology service call."""
+    index = entry_data["index"]
+    budget = entry_data["loop_budget"]
+    await index.async_ensure_ready(budget)
+
+    graph = index.graph
+    include_states = call.data["include_states"]
+    get_state = hass.states.get
+
+    def describe(entity_id: str) -> dict[str, Any]:
+        node: dict[str, Any] = {
+            "entity_id": entity_id,
+            "name": graph.entity_names.get(entity_id),
+        }
+        if include_states or node["name"] is None:
+            state = get_state(entity_id)
+            if node["name"] is None and state is not None:
+                node["name"] = state.attributes.get("friendly_name")
+            if include_states:
+                node["state"] = None if state is None else state.state
+        return node
+
+    if (area_id := call.data.get("area_id")) is not None:
+        if area_id not in graph.areas:
+            raise ValueError(f"Area {area_id} not found")
+        _LOGGER.info(f"Got topology for area {area_id}")
+        return {"areas": [graph.area_tree(area_id, describe)]}
+
+    areas = await async_build_list(
+        graph.sorted_areas(), lambda area_id: graph.area_tree(area_id, describe), budget
+    )
+    devices = await async_build_list(
+        graph.unassigned_devices(),
+        lambda device_id: graph.device_tree(device_id, describe, None),
+        budget,
+    )
+    entities = await async_build_list(graph.unassigned_entities(), describe, budget)
+    _LOGGER.info(
+        f"Got topology of {len(areas)} areas and {len(graph.devices)} devices"
+    )
+    return {
+        "areas": areas,
+        "unassigned": {"devices": devices, "entities": entities},
+    }
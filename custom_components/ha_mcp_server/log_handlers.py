@@ -0,0 +1,66 @@
+"""Log service handlers for the Home Assistant MCP Server."""
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+from pathlib import Path
+import re
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.util import dt as dt_util
+
+from .log_reader import search, tail
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _local_naive(value: str | None, field: str) -> datetime | None:
+    """Parse a service time into the naive local time the log is written in."""
+    if value is None:
+        return None
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid {field}: {value}")
+    if parsed.tzinfo is not None:
+        parsed = dt_util.as_local(parsed).replace(tzinfo=None)
+    return parsed
+
+
+async def handle_tail_log(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle tail_log service call."""
+    entries = await hass.async_add_executor_job(
+        tail, Path(hass.config.config_dir), call.data["lines"], call.data.get("level")
+    )
+    _LOGGER.info(f"Tailed {len(entries)} log entries")
+    return {"entries": [entry.as_dict() for entry in entries]}
+
+
+async def handle_search_log(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle search_log service call."""
+    pattern = call.data.get("pattern")
+    if pattern:
+        try:
+            re.compile(pattern)
+        except re.error as err:
+            raise ValueError(f"Invalid pattern: {err}") from err
+    start = _local_naive(call.data.get("start_time"), "start_time")
+    end = _local_naive(call.data.get("end_time"), "end_time")
+    entries, truncated = await hass.async_add_executor_job(
+        search,
+        Path(hass.config.config_dir),
+        pattern,
+        start,
+        end,
+        call.data.get("level"),
+        call.data["limit"],
+    )
+    _LOGGER.info(f"Found {len(entries)} matching log entries")
+    return {
+        "entries": [entry.as_dict() for entry in entries],
+        "truncated": truncated,
+    }
@@ -0,0 +1,265 @@
+"""Tail and search Home Assistant's log without reading it whole.
+
+The log and its rotated copies are memory-mapped and read backwards from the
+end, one line at a time. Lines are grouped into entries: a header line such
+as ``2025-01-15 10:23:45.123 ERROR (MainThread) [homeassistant.core] ...``
+followed by any continuation lines, for example a traceback. Reading stops as
+soon as enough entries have been found. The cost of a call therefore follows
+the number of entries returned, not the size of the file.
+
+The log is written in time order, so a search window is found by binary
+search on the mapped file. Entries after the window's end are never read.
+The reverse scan stops at the first entry before its start.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+import mmap
+from pathlib import Path
+import re
+from typing import Any
+
+LOG_FILE = "home-assistant.log"
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+MAX_ENTRY_BYTES = 16 * 1024
+# Stop a search after reading this much without filling the limit.
+DEFAULT_MAX_SCAN_BYTES = 256 * 1024 * 1024
+
+# Suffixes of TimedRotatingFileHandler copies: a date, and a time of day for
+# rotation intervals shorter than a day. They sort in time order as text.
+ROTATED_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:_\d{2}(?:-\d{2}){0,2})?")
+
+HEADER_RE = re.compile(
+    rb"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?) +([A-Z]+) +"
+    rb"(?:\(([^)]*)\) +)?(?:\[([^\]]*)\] ?)?"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class LogEntry:
+    """One log record, including its continuation lines."""
+
+    timestamp: datetime
+    level: str
+    thread: str | None
+    logger: str | None
+    message: str
+    file: str
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the entry for a service response."""
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "level": self.level,
+            "thread": self.thread,
+            "logger": self.logger,
+            "message": self.message,
+            "file": self.file,
+        }
+
+
+def log_files(config_dir: Path, name: str = LOG_FILE) -> list[Path]:
+    """Return the log and its rotated copies, newest first.
+
+    With ``--log-rotate-days``, Home Assistant rotates the log at midnight
+    into ``home-assistant.log.YYYY-MM-DD``. Size-based handlers name their
+    copies ``.1``, ``.2``…, newest first. ``home-assistant.log.old`` is the
+    log of the previous run.
+    """
+    current = config_dir / name
+    numbered = []
+    dated = []
+    for path in config_dir.glob(f"{name}.*"):
+        suffix = path.name[len(name) + 1 :]
+        if suffix.isdigit():
+            numbered.append((int(suffix), path))
+        elif ROTATED_DATE_RE.fullmatch(suffix):
+            dated.append((suffix, path))
+    files = [current] if current.is_file() else []
+    files.extend(path for _, path in sorted(numbered))
+    files.extend(path for _, path in sorted(dated, reverse=True))
+    old = config_dir / f"{name}.old"
+    if old.is_file():
+        files.append(old)
+    return files
+
+
+def _parse_header(line: bytes) -> tuple[datetime, str, str | None, str | None, int] | None:
+    match = HEADER_RE.match(line)
+    if match is None or match.group(2).decode() not in LEVELS:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(match.group(1).decode())
+    except ValueError:
+        return None
+    thread, logger = match.group(3), match.group(4)
+    return (
+        timestamp,
+        match.group(2).decode(),
+        None if thread is None else thread.decode(errors="replace"),
+        None if logger is None else logger.decode(errors="replace"),
+        match.end(),
+    )
+
+
+class MappedLog:
+    """A memory-mapped log file read backwards by entry."""
+
+    def __init__(self, path: Path) -> None:
+        """Map ``path``; an empty file maps to nothing."""
+        self.path = path
+        self._file = path.open("rb")
+        size = path.stat().st_size
+        self.size = size
+        self._map = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+        self.bytes_read = 0
+
+    def close(self) -> None:
+        """Unmap and close the file."""
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> MappedLog:
+        """Return the mapped log."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Close the mapped log."""
+        self.close()
+
+    def _header_at_or_after(self, offset: int) -> tuple[int, datetime] | None:
+        """Return the first entry header starting at or after ``offset``."""
+        data = self._map
+        if offset > 0:
+            newline = data.find(b"\n", offset - 1)
+            if newline < 0:
+                return None
+            offset = newline + 1
+        while offset < self.size:
+            end = data.find(b"\n", offset)
+            end = self.size if end < 0 else end
+            header = _parse_header(data[offset : min(end, offset + 64)])
+            if header is not None:
+                return offset, header[0]
+            offset = end + 1
+        return None
+
+    def offset_after(self, moment: datetime) -> int:
+        """Return the offset of the first entry logged after ``moment``."""
+        if self._map is None:
+            return 0
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            found = self._header_at_or_after(middle)
+            if found is None or found[1] > moment:
+                high = middle
+            else:
+                low = found[0] + 1
+        found = self._header_at_or_after(low)
+        return self.size if found is None else found[0]
+
+    def entries(self, end: int | None = None) -> Iterator[LogEntry]:
+        """Yield the entries before offset ``end``, newest first."""
+        data = self._map
+        if data is None:
+            return
+        position = self.size if end is None else end
+        continuation: list[bytes] = []
+        pending = 0
+        while position > 0:
+            start = data.rfind(b"\n", 0, position - 1) + 1
+            line = data[start:position].rstrip(b"\r\n")
+            self.bytes_read += position - start
+            position = start
+            header = _parse_header(line)
+            if header is None:
+                # Continuation lines of a long traceback are capped.
+                if pending < MAX_ENTRY_BYTES:
+                    continuation.append(line)
+                    pending += len(line) + 1
+                continue
+            timestamp, level, thread, logger, body = header
+            parts = [line[body:]]
+            parts.extend(reversed(continuation))
+            continuation = []
+            pending = 0
+            yield LogEntry(
+                timestamp,
+                level,
+                thread,
+                logger,
+                b"\n".join(parts).decode(errors="replace"),
+                self.path.name,
+            )
+
+
+def _matches_level(entry: LogEntry, min_level: int) -> bool:
+    return LEVELS[entry.level] >= min_level
+
+
+def tail(
+    config_dir: Path,
+    count: int = 50,
+    level: str | None = None,
+    max_scan_bytes: int = DEFAULT_MAX_SCAN_BYTES,
+) -> list[LogEntry]:
+    """Return the last ``count`` entries at or above ``level``, oldest first.
+
+    Rotated logs are read after the current one until enough entries are
+    found, or until ``max_scan_bytes`` have been read looking for them.
+    """
+    found, _ = search(config_dir, level=level, limit=count, max_scan_bytes=max_scan_bytes)
+    return found
+
+
+def search(
+    config_dir: Path,
+    pattern: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    level: str | None = None,
+    limit: int = 100,
+    max_scan_bytes: int = DEFAULT_MAX_SCAN_BYTES,
+) -> tuple[list[LogEntry], bool]:
+    """Return the newest entries matching a regex, level and time window.
+
+    Timestamps are compared as written in the log, in local time.
+
+    Returns:
+        The matches, oldest first, and whether the search stopped at
+        ``limit`` or ``max_scan_bytes`` before covering the whole window
+
+    Raises:
+        re.error: If ``pattern`` is not a valid regular expression
+    """
+    regex = re.compile(pattern) if pattern else None
+    min_level = LEVELS[level] if level else 0
+    found: list[LogEntry] = []
+    scanned = 0
+    for path in log_files(config_dir):
+        with MappedLog(path) as log:
+            for entry in log.entries(None if end is None else log.offset_after(end)):
+                if start is not None and entry.timestamp < start:
+                    # Older files only hold older entries.
+                    return found[::-1], False
+                if (
+                    _matches_level(entry, min_level)
+                    and (
+                        regex is None
+                        or regex.search(entry.message)
+                        or (entry.logger and regex.search(entry.logger))
+                    )
+                ):
+                    found.append(entry)
+                    if len(found) >= limit:
+                        return found[::-1], True
+                if scanned + log.bytes_read > max_scan_bytes:
+                    return found[::-1], True
+            scanned += log.bytes_read
+    return found[::-1], False
@@ -1,28 +1,68 @@
 """MCP Server for Home Assistant Configuration Management."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import AsyncIterator, Callable
 import json
 import logging
 import os
 from pathlib import Path
-from typing import Any
+import stat
+import tempfile
+from typing import TYPE_CHECKING, Any
 
-import aiofiles
-import yaml
+from .etags import FileVersions, PreconditionFailed
+from .parse_backend import PARSE_INLINE, ParseBackend
+from .snapshots import SnapshotError, SnapshotStore
+from .tracing import Tracer
+
+if TYPE_CHECKING:
+    from .config_validation import ConfigValidator, ValidationIssue
+
+# aiofiles, yaml and the validator are imported inside the methods that need
+# them so that loading the integration does not pay for them until a file is
+# touched.
 
 _LOGGER = logging.getLogger(__name__)
 
+# Files read at once by read_config_files, and the most one call may name
+DEFAULT_READ_CONCURRENCY = 8
+MAX_BATCH_FILES = 200
+
 
 class MCPConfigServer:
     """MCP Server for managing Home Assistant configuration files."""
 
-    def __init__(self, config_path: str):
+    def __init__(
+        self,
+        config_path: str,
+        tracer: Tracer | None = None,
+        snapshots: SnapshotStore | None = None,
+        validator: ConfigValidator | None = None,
+        parser: ParseBackend | None = None,
+    ):
         """Initialize the MCP Config Server.
         
         Args:
             config_path: Path to Home Assistant configuration directory
+            tracer: Tracer recording per-phase spans; disabled by default
+            snapshots: Store recording every version written; none by default
+            validator: Validator used before writes; created on first use
+                when none is given
+            parser: Decides where files are parsed; by default large YAML
+                files go to a pool of worker processes
         """
         self.config_path = Path(config_path)
+        self.tracer = tracer or Tracer()
+        self.snapshots = snapshots
+        self.validator = validator
+        self.parser = parser or ParseBackend()
+        self.versions = FileVersions()
+        # Serializes writes, so an ``if_match`` check or the read of a
+        # read-modify-write is atomic with the write that follows it
+        self._write_lock = asyncio.Lock()
+        # Whether writes are validated when the caller does not say
+        self.validate_writes = False
         _LOGGER.info(f"Initialized MCP Server with config path: {self.config_path}")
 
     async def read_config_file(self, filename: str) -> dict[str, Any]:
@@ -34,61 +74,304 @@ class MCPConfigServer:
         Returns:
             Dictionary containing the file contents
         """
-        file_path = self.config_path / filename
+        tracer = self.tracer
+        with tracer.span("read_config_file", filename=filename) as span:
+            file_path = self.config_path / filename
+            
+            with tracer.span("resolve_path"):
+                # Security check: ensure file is within config directory
+                if not self._is_safe_path(file_path):
+                    raise ValueError(f"Access to {filename} is not allowed")
+                
+                try:
+                    size = file_path.stat().st_size
+                except FileNotFoundError as err:
+                    raise FileNotFoundError(f"File {filename} not found") from err
+            span.set_attribute("bytes", size)
+
+            mode = self.parser.mode(filename, size)
+            if mode != PARSE_INLINE:
+                # Large files are read and parsed together, off the loop.
+                with tracer.span("parse", mode=mode):
+                    return await self.parser.read_and_parse(file_path, filename, mode)
+
+            import aiofiles
+
+            with tracer.span("read"):
+                async with aiofiles.open(file_path, 'r') as f:
+                    content = await f.read()
+            
+            with tracer.span("parse"):
+                return self.parser.parse(filename, content)
+
+    async def file_etag(self, filename: str) -> str:
+        """Return the version token of a configuration file.
         
-        # Security check: ensure file is within config directory
+        The token is a hash of the file's content. It is remembered while the
+        file's size and modification time stay the same, so checking an
+        unchanged file costs one ``stat``.
+        
+        Args:
+            filename: Name of the configuration file
+            
+        Returns:
+            The token, which changes whenever the content does
+        """
+        file_path = self.config_path / filename
         if not self._is_safe_path(file_path):
             raise ValueError(f"Access to {filename} is not allowed")
-        
-        if not file_path.exists():
-            raise FileNotFoundError(f"File {filename} not found")
-        
-        async with aiofiles.open(file_path, 'r') as f:
-            content = await f.read()
-        
-        # Parse based on file extension
-        if filename.endswith('.yaml') or filename.endswith('.yml'):
-            return yaml.safe_load(content) or {}
-        elif filename.endswith('.json'):
-            return json.loads(content)
-        else:
-            return {"content": content}
+        with self.tracer.span("file_etag", filename=filename):
+            try:
+                return await asyncio.to_thread(self.versions.etag, file_path)
+            except FileNotFoundError as err:
+                raise FileNotFoundError(f"File {filename} not found") from err
 
-    async def write_config_file(self, filename: str, content: dict[str, Any] | str) -> bool:
+    async def write_config_file(
+        self,
+        filename: str,
+        content: dict[str, Any] | str,
+        validate: bool | None = None,
+        if_match: str | None = None,
+    ) -> bool:
         """Write to a configuration file.
         
         Args:
             filename: Name of the configuration file to write
             content: Content to write (dict for YAML/JSON, str for text)
+            validate: Validate the content, and its includes, before writing;
+                defaults to ``validate_writes``
+            if_match: Only write if the file is still at this version, as
+                returned by ``file_etag``
             
         Returns:
             True if successful
+            
+        Raises:
+            ConfigValidationError: If validation is on and finds problems;
+                the file is left untouched
+            PreconditionFailed: If the file is not at version ``if_match``;
+                the file is left untouched
         """
-        file_path = self.config_path / filename
-        
-        # Security check: ensure file is within config directory
-        if not self._is_safe_path(file_path):
-            raise ValueError(f"Access to {filename} is not allowed")
+        async with self._write_lock:
+            return await self._write_config_locked(filename, content, validate, if_match)
+
+    async def _write_config_locked(
+        self,
+        filename: str,
+        content: dict[str, Any] | str,
+        validate: bool | None,
+        if_match: str | None,
+    ) -> bool:
+        tracer = self.tracer
+        with tracer.span("write_config_file", filename=filename) as span:
+            file_path = self.config_path / filename
+            
+            with tracer.span("resolve_path"):
+                # Security check: ensure file is within config directory
+                if not self._is_safe_path(file_path):
+                    raise ValueError(f"Access to {filename} is not allowed")
+            
+            with tracer.span("serialize"):
+                formatted_content = self._format_content(filename, content)
+            span.set_attribute("bytes", len(formatted_content))
+
+            if self.validate_writes if validate is None else validate:
+                with tracer.span("validate"):
+                    issues = await self._validate_text(filename, formatted_content)
+                if issues:
+                    from .config_validation import ConfigValidationError
+
+                    raise ConfigValidationError(filename, issues)
+
+            await self._write_text_locked(
+                file_path, formatted_content, "write", if_match
+            )
         
-        # Format content based on file extension
+        _LOGGER.info(f"Successfully wrote to {filename}")
+        return True
+
+    @staticmethod
+    def _format_content(filename: str, content: dict[str, Any] | str) -> str:
+        """Format content based on file extension."""
         if filename.endswith('.yaml') or filename.endswith('.yml'):
             if isinstance(content, str):
-                formatted_content = content
-            else:
-                formatted_content = yaml.dump(content, default_flow_style=False)
-        elif filename.endswith('.json'):
+                return content
+            import yaml
+
+            return yaml.dump(content, default_flow_style=False)
+        if filename.endswith('.json'):
             if isinstance(content, str):
-                formatted_content = content
+                return content
+            return json.dumps(content, indent=2)
+        return content if isinstance(content, str) else str(content)
+
+    async def _validate_text(self, filename: str, text: str) -> list[ValidationIssue]:
+        if self.validator is None:
+            from .config_validation import ConfigValidator
+
+            self.validator = ConfigValidator(self.parser.process_executor())
+        return await self.validator.validate(self.config_path, filename, text)
+
+    async def validate_config_file(
+        self, filename: str, content: dict[str, Any] | str | None = None
+    ) -> list[ValidationIssue]:
+        """Validate a configuration file without writing it.
+        
+        Args:
+            filename: Name of the configuration file
+            content: Proposed content; the file on disk by default
+            
+        Returns:
+            The problems found, empty if the content is valid
+        """
+        with self.tracer.span("validate_config_file", filename=filename):
+            file_path = self.config_path / filename
+            if not self._is_safe_path(file_path):
+                raise ValueError(f"Access to {filename} is not allowed")
+            if content is None:
+                import aiofiles
+
+                try:
+                    async with aiofiles.open(file_path, 'r', encoding="utf-8") as f:
+                        text = await f.read()
+                except FileNotFoundError as err:
+                    raise FileNotFoundError(f"File {filename} not found") from err
             else:
-                formatted_content = json.dumps(content, indent=2)
-        else:
-            formatted_content = content if isinstance(content, str) else str(content)
+                text = self._format_content(filename, content)
+            return await self._validate_text(filename, text)
+
+    def close(self) -> None:
+        """Stop the worker processes, if any were started."""
+        if self.validator is not None:
+            self.validator.shutdown()
+        self.parser.shutdown()
+
+    async def _write_text(
+        self, file_path: Path, text: str, source: str, if_match: str | None = None
+    ) -> None:
+        """Write ``text`` to ``file_path``, snapshotting before and after.
+
+        The content on disk is recorded first, so edits made outside the
+        server are kept as their own version and can be rolled back to.
+        """
+        async with self._write_lock:
+            await self._write_text_locked(file_path, text, source, if_match)
+
+    async def _write_text_locked(
+        self, file_path: Path, text: str, source: str, if_match: str | None
+    ) -> None:
+        tracer = self.tracer
+        if if_match is not None:
+            with tracer.span("check_version"):
+                try:
+                    current = await asyncio.to_thread(self.versions.etag, file_path)
+                except FileNotFoundError:
+                    current = None
+            if current != if_match:
+                raise PreconditionFailed(
+                    self._snapshot_key(file_path), if_match, current
+                )
+
+        snapshots = self.snapshots
+        if snapshots is not None:
+            key = self._snapshot_key(file_path)
+            with tracer.span("snapshot_before"):
+                await asyncio.to_thread(
+                    _record_safely, key, _record_existing, snapshots, key, file_path
+                )
+
+        data = text.encode("utf-8")
+        with tracer.span("write"):
+            await asyncio.to_thread(_replace_file, file_path, data)
+        await asyncio.to_thread(self.versions.record, file_path, data)
+
+        if snapshots is not None:
+            with tracer.span("snapshot_after"):
+                await asyncio.to_thread(
+                    _record_safely, key, snapshots.record, key, data, source
+                )
+
+    def _snapshot_key(self, file_path: Path) -> str:
+        """Return the name a file is versioned under."""
+        return file_path.resolve().relative_to(self.config_path.resolve()).as_posix()
+
+    def _require_snapshots(self, filename: str) -> tuple[SnapshotStore, Path]:
+        if self.snapshots is None:
+            raise ValueError("Config snapshots are not enabled")
+        file_path = self.config_path / filename
+        if not self._is_safe_path(file_path):
+            raise ValueError(f"Access to {filename} is not allowed")
+        return self.snapshots, file_path
+
+    async def list_config_versions(self, filename: str) -> list[dict[str, Any]]:
+        """List the recorded versions of a configuration file.
         
-        async with aiofiles.open(file_path, 'w') as f:
-            await f.write(formatted_content)
+        Args:
+            filename: Name of the configuration file
+            
+        Returns:
+            Versions, oldest first, with their hash, size, time and source
+        """
+        snapshots, file_path = self._require_snapshots(filename)
+        with self.tracer.span("list_config_versions", filename=filename):
+            versions = await asyncio.to_thread(
+                snapshots.versions, self._snapshot_key(file_path)
+            )
+        return [
+            {
+                "version": version.version,
+                "hash": version.hash,
+                "size": version.size,
+                "created": version.created,
+                "source": version.source,
+            }
+            for version in versions
+        ]
+
+    async def diff_config_versions(
+        self, filename: str, old: int, new: int | None = None
+    ) -> str:
+        """Return a unified diff between two versions of a configuration file.
         
-        _LOGGER.info(f"Successfully wrote to {filename}")
-        return True
+        Args:
+            filename: Name of the configuration file
+            old: Version to diff from
+            new: Version to diff to; the latest version by default
+            
+        Returns:
+            The diff, empty if the versions are identical
+        """
+        snapshots, file_path = self._require_snapshots(filename)
+        key = self._snapshot_key(file_path)
+        with self.tracer.span("diff_config_versions", filename=filename):
+            if new is None:
+                latest = await asyncio.to_thread(snapshots.latest, key)
+                if latest is None:
+                    raise ValueError(f"No versions of {filename} recorded")
+                new = latest.version
+            return await asyncio.to_thread(snapshots.diff, key, old, new)
+
+    async def rollback_config_file(self, filename: str, version: int) -> int:
+        """Restore a configuration file to a recorded version.
+        
+        The restored content is recorded as a new version, so a rollback
+        can itself be rolled back.
+        
+        Args:
+            filename: Name of the configuration file
+            version: Version to restore
+            
+        Returns:
+            The number of the version written
+        """
+        snapshots, file_path = self._require_snapshots(filename)
+        key = self._snapshot_key(file_path)
+        with self.tracer.span("rollback_config_file", filename=filename):
+            content = await asyncio.to_thread(snapshots.read, key, version)
+            await self._write_text(file_path, content.decode("utf-8"), "rollback")
+            latest = await asyncio.to_thread(snapshots.latest, key)
+        _LOGGER.info(f"Rolled {filename} back to version {version}")
+        return latest.version
 
     async def list_config_files(self) -> list[str]:
         """List all configuration files in the config directory.
@@ -98,14 +381,117 @@ class MCPConfigServer:
         """
         config_files = []
         
-        for file_path in self.config_path.iterdir():
-            if file_path.is_file():
-                # Filter for common config file extensions
-                if file_path.suffix in ['.yaml', '.yml', '.json', '.conf', '.txt']:
-                    config_files.append(file_path.name)
+        with self.tracer.span("list_config_files") as span:
+            with self.tracer.span("scan"):
+                for file_path in self.config_path.iterdir():
+                    if file_path.is_file():
+                        # Filter for common config file extensions
+                        if file_path.suffix in ['.yaml', '.yml', '.json', '.conf', '.txt']:
+                            config_files.append(file_path.name)
+            span.set_attribute("files", len(config_files))
         
         return sorted(config_files)
 
+    async def resolve_config_files(
+        self, filenames: list[str] | None = None, pattern: str | None = None
+    ) -> list[str]:
+        """Return the files named by a list and/or a glob, without duplicates.
+        
+        Glob matches are limited to files inside the config directory and
+        skip hidden files and directories such as ``.storage``.
+        """
+        names = list(dict.fromkeys(filenames or ()))
+        if pattern:
+            matches = await asyncio.to_thread(self._glob, pattern)
+            names.extend(name for name in matches if name not in names)
+        if len(names) > MAX_BATCH_FILES:
+            raise ValueError(
+                f"{len(names)} files requested; at most {MAX_BATCH_FILES} per call"
+            )
+        return names
+
+    def _glob(self, pattern: str) -> list[str]:
+        root = self.config_path.resolve()
+        names = []
+        for path in self.config_path.glob(pattern):
+            if not path.is_file() or not self._is_safe_path(path):
+                continue
+            relative = path.resolve().relative_to(root)
+            if not any(part.startswith(".") for part in relative.parts):
+                names.append(relative.as_posix())
+        return sorted(names)
+
+    async def iter_config_files(
+        self,
+        filenames: list[str],
+        concurrency: int = DEFAULT_READ_CONCURRENCY,
+    ) -> AsyncIterator[tuple[str, Any, Exception | None]]:
+        """Read and parse files concurrently, yielding each as it completes.
+
+        At most ``concurrency`` files are read at a time. Each file is parsed
+        where ``parser`` places a file of its size: large YAML files in a
+        worker process, the rest in a thread or, if tiny, on the loop. A file
+        that cannot be read or parsed yields its exception instead of ending
+        the iteration.
+
+        Args:
+            filenames: Names of the configuration files to read
+            concurrency: Files read at the same time
+
+        Yields:
+            ``(filename, content, None)`` or ``(filename, None, error)``
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _read(filename: str) -> tuple[str, Any, Exception | None]:
+            async with semaphore:
+                try:
+                    file_path = self.config_path / filename
+                    if not self._is_safe_path(file_path):
+                        raise ValueError(f"Access to {filename} is not allowed")
+                    content = await self.parser.read_and_parse(file_path, filename)
+                except Exception as err:  # noqa: BLE001 - reported per file
+                    return filename, None, err
+                return filename, content, None
+
+        tasks = [asyncio.ensure_future(_read(filename)) for filename in filenames]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def read_config_files(
+        self,
+        filenames: list[str] | None = None,
+        pattern: str | None = None,
+        concurrency: int = DEFAULT_READ_CONCURRENCY,
+    ) -> dict[str, dict[str, Any]]:
+        """Read several configuration files at once.
+        
+        Args:
+            filenames: Names of the configuration files to read
+            pattern: Glob, relative to the config directory, naming more files
+            concurrency: Files read at the same time
+            
+        Returns:
+            ``{"content": ...}`` or ``{"error": ...}`` for each file, in the
+            order the files were named
+        """
+        with self.tracer.span("read_config_files") as span:
+            names = await self.resolve_config_files(filenames, pattern)
+            span.set_attribute("files", len(names))
+            results: dict[str, dict[str, Any]] = {}
+            async for filename, content, error in self.iter_config_files(
+                names, concurrency
+            ):
+                if error is None:
+                    results[filename] = {"content": content}
+                else:
+                    results[filename] = {"error": str(error) or type(error).__name__}
+        return {name: results[name] for name in names}
+
     async def get_config_value(self, filename: str, key_path: str) -> Any:
         """Get a specific value from a configuration file.
         
@@ -116,45 +502,80 @@ class MCPConfigServer:
         Returns:
             The value at the specified key path
         """
-        config = await self.read_config_file(filename)
-        
-        keys = key_path.split('.')
-        value = config
-        
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                raise KeyError(f"Key path {key_path} not found in {filename}")
-        
-        return value
+        with self.tracer.span("get_config_value", filename=filename, key_path=key_path):
+            config = await self.read_config_file(filename)
+            
+            with self.tracer.span("lookup"):
+                keys = key_path.split('.')
+                value = config
+                
+                for key in keys:
+                    if isinstance(value, dict) and key in value:
+                        value = value[key]
+                    else:
+                        raise KeyError(f"Key path {key_path} not found in {filename}")
+            
+            return value
 
-    async def set_config_value(self, filename: str, key_path: str, value: Any) -> bool:
+    async def set_config_value(
+        self,
+        filename: str,
+        key_path: str,
+        value: Any,
+        validate: bool | None = None,
+        if_match: str | None = None,
+    ) -> bool:
         """Set a specific value in a configuration file.
         
+        The read, update and write happen under the write lock, so concurrent
+        calls never lose each other's updates.
+        
         Args:
             filename: Name of the configuration file
             key_path: Dot-separated path to the configuration key
             value: Value to set
+            validate: Validate the updated file before writing; defaults to
+                ``validate_writes``
+            if_match: Only write if the file is still at this version, as
+                returned by ``file_etag``
             
         Returns:
             True if successful
+            
+        Raises:
+            PreconditionFailed: If the file is not at version ``if_match``;
+                the file is left untouched
         """
-        config = await self.read_config_file(filename)
-        
-        keys = key_path.split('.')
-        current = config
-        
-        # Navigate to the parent of the target key
-        for key in keys[:-1]:
-            if key not in current:
-                current[key] = {}
-            current = current[key]
-        
-        # Set the value
-        current[keys[-1]] = value
-        
-        return await self.write_config_file(filename, config)
+        async with self._write_lock:
+            return await self._set_config_value_locked(
+                filename, key_path, value, validate, if_match
+            )
+
+    async def _set_config_value_locked(
+        self,
+        filename: str,
+        key_path: str,
+        value: Any,
+        validate: bool | None,
+        if_match: str | None,
+    ) -> bool:
+        with self.tracer.span("set_config_value", filename=filename, key_path=key_path):
+            config = await self.read_config_file(filename)
+            
+            with self.tracer.span("update"):
+                keys = key_path.split('.')
+                current = config
+                
+                # Navigate to the parent of the target key
+                for key in keys[:-1]:
+                    if key not in current:
+                        current[key] = {}
+                    current = current[key]
+                
+                # Set the value
+                current[keys[-1]] = value
+            
+            return await self._write_config_locked(filename, config, validate, if_match)
 
     def _is_safe_path(self, path: Path) -> bool:
         """Check if the path is safe (within config directory).
@@ -170,3 +591,48 @@ class MCPConfigServer:
             return True
         except ValueError:
             return False
+
+
+def _record_safely(key: str, record: Callable[..., Any], *args: Any) -> None:
+    """Run a snapshot ``record`` call, logging rather than raising failures.
+
+    Snapshots are a safety net. A damaged store or a full disk must not
+    block a write, or report a write that succeeded as failed.
+    """
+    try:
+        record(*args)
+    except (SnapshotError, OSError) as err:
+        _LOGGER.warning(f"Could not snapshot {key}: {err}")
+
+
+def _replace_file(file_path: Path, data: bytes) -> None:
+    """Replace the content of ``file_path`` atomically.
+
+    Readers see either the old or the new content, never a partial write. A
+    symlinked file is replaced at its target, so the link is kept, and the
+    file keeps its permissions.
+    """
+    target = file_path.resolve()
+    try:
+        mode = stat.S_IMODE(target.stat().st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+    fd, temp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.chmod(temp, mode)
+        os.replace(temp, target)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _record_existing(snapshots: SnapshotStore, key: str, file_path: Path) -> None:
+    """Record the current content of ``file_path``, if it exists."""
+    try:
+        content = file_path.read_bytes()
+    except FileNotFoundError:
+        return
+    snapshots.record(key, content, "external")
+
@@ -0,0 +1,209 @@
+"""Fixed-memory call metrics for the Home Assistant MCP Server.
+
+Latency and response size are recorded into bucketed histograms whose size is
+fixed at construction, so memory does not grow with traffic. Latency
+percentiles are computed over a rolling window made of two histograms: the
+current one and the previous one, rotated every ``window`` seconds.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable
+import math
+import time
+from typing import Any
+
+# Latency buckets grow by 2**(1/4) (~19%) from 10 microseconds to ~168 seconds.
+_LATENCY_MIN = 1e-5
+_LATENCY_GROWTH = 2 ** 0.25
+LATENCY_BOUNDS: tuple[float, ...] = tuple(
+    _LATENCY_MIN * _LATENCY_GROWTH**index for index in range(97)
+)
+
+# Response size buckets are powers of two from 64 bytes to 1 GiB.
+BYTE_BOUNDS: tuple[int, ...] = tuple(1 << shift for shift in range(6, 31))
+
+
+class Histogram:
+    """Counts of observations per bucket, with an overflow bucket at the end."""
+
+    __slots__ = ("bounds", "counts", "total", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        """Initialize an empty histogram over ``bounds`` (bucket upper edges)."""
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def add(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def merge(self, other: Histogram) -> Histogram:
+        """Return a new histogram holding both sets of observations."""
+        merged = Histogram(self.bounds)
+        merged.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        merged.total = self.total + other.total
+        merged.sum = self.sum + other.sum
+        return merged
+
+    @property
+    def overflow(self) -> int:
+        """Number of observations above the last bound."""
+        return self.counts[-1]
+
+    def percentile(self, quantile: float) -> float | None:
+        """Return the upper edge of the bucket holding ``quantile``.
+
+        A quantile in the overflow bucket is reported as the last bound, which
+        is then only a lower limit; ``overflow`` tells when that happened.
+        """
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(quantile * self.total))
+        seen = 0
+        for index, count in enumerate(self.counts[:-1]):
+            seen += count
+            if seen >= rank:
+                return self.bounds[index]
+        return self.bounds[-1]
+
+    def buckets(self) -> dict[str, int]:
+        """Return the non-empty buckets keyed by their upper edge."""
+        result = {}
+        for index, count in enumerate(self.counts):
+            if count:
+                edge = self.bounds[index] if index < len(self.bounds) else "+Inf"
+                result[str(edge)] = count
+        return result
+
+
+class ServiceMetrics:
+    """Counters and histograms for a single service."""
+
+    __slots__ = (
+        "calls",
+        "errors",
+        "last_duration",
+        "_latency",
+        "_previous_latency",
+        "_window_start",
+        "response_bytes",
+    )
+
+    def __init__(self, now: float) -> None:
+        """Initialize empty metrics starting a window at ``now``."""
+        self.calls = 0
+        self.errors = 0
+        self.last_duration: float | None = None
+        self._latency = Histogram(LATENCY_BOUNDS)
+        self._previous_latency = Histogram(LATENCY_BOUNDS)
+        self._window_start = now
+        self.response_bytes = Histogram(BYTE_BOUNDS)
+
+    def rotate(self, now: float, window: float) -> None:
+        """Start a new latency window if the current one has expired."""
+        elapsed = now - self._window_start
+        if elapsed < window:
+            return
+        if elapsed < 2 * window:
+            self._previous_latency = self._latency
+        else:
+            # Idle for more than a full window: nothing recent is left.
+            self._previous_latency = Histogram(LATENCY_BOUNDS)
+        self._latency = Histogram(LATENCY_BOUNDS)
+        self._window_start = now
+
+    def record(
+        self, duration: float, error: bool = False, response_bytes: int | None = None
+    ) -> None:
+        """Record one call."""
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.last_duration = duration
+        self._latency.add(duration)
+        if response_bytes is not None:
+            self.response_bytes.add(response_bytes)
+
+    @property
+    def latency(self) -> Histogram:
+        """Latency over the rolling window."""
+        return self._latency.merge(self._previous_latency)
+
+    def latency_ms(self, quantile: float) -> float | None:
+        """Return a rolling latency percentile in milliseconds."""
+        value = self.latency.percentile(quantile)
+        return None if value is None else round(value * 1000, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable summary."""
+        latency = self.latency
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "last_ms": (
+                None if self.last_duration is None else round(self.last_duration * 1000, 3)
+            ),
+            "window_calls": latency.total,
+            "window_overflow": latency.overflow,
+            "p50_ms": self.latency_ms(0.50),
+            "p95_ms": self.latency_ms(0.95),
+            "p99_ms": self.latency_ms(0.99),
+            "response_bytes": {
+                "count": self.response_bytes.total,
+                "p50": self.response_bytes.percentile(0.50),
+                "p95": self.response_bytes.percentile(0.95),
+                "overflow": self.response_bytes.overflow,
+                "buckets": self.response_bytes.buckets(),
+            },
+        }
+
+
+class MetricsRegistry:
+    """Metrics for every service, keyed by service name."""
+
+    def __init__(
+        self, window: float = 300.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Initialize the registry.
+
+        Args:
+            window: Length in seconds of one latency window; percentiles cover
+                between one and two windows of recent calls
+            clock: Monotonic clock, replaceable in tests
+        """
+        self.window = window
+        self._clock = clock
+        self._services: dict[str, ServiceMetrics] = {}
+
+    def get(self, name: str) -> ServiceMetrics:
+        """Return (creating if needed) the metrics for ``name``."""
+        now = self._clock()
+        metrics = self._services.get(name)
+        if metrics is None:
+            metrics = self._services[name] = ServiceMetrics(now)
+        else:
+            metrics.rotate(now, self.window)
+        return metrics
+
+    def record(
+        self,
+        name: str,
+        duration: float,
+        error: bool = False,
+        response_bytes: int | None = None,
+    ) -> None:
+        """Record one call of service ``name``."""
+        self.get(name).record(duration, error, response_bytes)
+
+    def names(self) -> list[str]:
+        """Return the names of all services seen so far."""
+        return sorted(self._services)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable summary of all services."""
+        return {name: self.get(name).as_dict() for name in self.names()}
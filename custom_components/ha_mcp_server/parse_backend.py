@@ -0,0 +1,185 @@
+"""Choose where configuration files are parsed: in the loop, a thread or a process.
+
+PyYAML's safe loader is pure Python and parses about 150 KB a second. It
+holds the GIL all the while, so moving a large parse to a thread keeps the
+event loop from stalling outright, but the loop still competes with the
+parser for every switch interval. Only another process takes the work off
+the GIL. ``ParseBackend`` picks per file, by format and size:
+- inline, on the event loop, for files too small to be worth a thread hop
+- a worker thread for mid-sized files and for JSON, whose C parser is fast
+- a small process pool for large YAML files
+
+A process worker is only sent the path. It reads the file itself, and the
+parsed content comes back encoded with ``marshal``, which is cheaper to load
+than pickle. Content marshal cannot encode, such as YAML timestamps, falls
+back to pickle. Workers are spawned on first use. The same pool can be lent
+to the config validator, so the integration runs one set of worker processes.
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor
+import json
+import marshal
+from pathlib import Path
+import pickle
+from typing import Any
+
+PARSE_INLINE = "inline"
+PARSE_THREAD = "thread"
+PARSE_PROCESS = "process"
+
+# YAML files up to this size are parsed on the event loop: a few ms at most.
+INLINE_MAX_YAML_BYTES = 1024
+# Other formats parse in C, or not at all, and stay inline for longer.
+INLINE_MAX_OTHER_BYTES = 64 * 1024
+# YAML files from this size on are parsed in a worker process.
+PROCESS_MIN_YAML_BYTES = 64 * 1024
+DEFAULT_PROCESS_WORKERS = 2
+
+_MARSHAL = b"m"
+_PICKLE = b"p"
+
+
+def is_yaml(filename: str) -> bool:
+    """Return whether ``filename`` is parsed as YAML."""
+    return filename.endswith((".yaml", ".yml"))
+
+
+def parse_content(filename: str, content: str) -> Any:
+    """Parse file content based on the file extension."""
+    if is_yaml(filename):
+        import yaml
+
+        return yaml.safe_load(content) or {}
+    elif filename.endswith('.json'):
+        return json.loads(content)
+    else:
+        return {"content": content}
+
+
+def read_and_parse(file_path: Path, filename: str) -> Any:
+    """Read and parse one file; runs in a worker thread."""
+    try:
+        content = file_path.read_text()
+    except FileNotFoundError as err:
+        raise FileNotFoundError(f"File {filename} not found") from err
+    return parse_content(filename, content)
+
+
+def _read_and_parse_encoded(file_path: str, filename: str) -> bytes:
+    """Read, parse and encode one file; runs in a worker process."""
+    content = read_and_parse(Path(file_path), filename)
+    try:
+        return _MARSHAL + marshal.dumps(content)
+    except ValueError:
+        return _PICKLE + pickle.dumps(content, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(data: bytes) -> Any:
+    if data[:1] == _MARSHAL:
+        return marshal.loads(memoryview(data)[1:])
+    return pickle.loads(memoryview(data)[1:])
+
+
+class ParseBackend:
+    """Parse configuration files where they disturb the event loop least."""
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        max_workers: int = DEFAULT_PROCESS_WORKERS,
+        process_min_bytes: int = PROCESS_MIN_YAML_BYTES,
+    ) -> None:
+        """Initialize the backend.
+
+        Args:
+            executor: Executor for large files; a process pool of
+                ``max_workers`` is created on first use when none is given
+            max_workers: Worker processes of the pool created on first use
+            process_min_bytes: Size from which YAML is parsed in a process
+        """
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.max_workers = max_workers
+        self.process_min_bytes = process_min_bytes
+        self.counts = {PARSE_INLINE: 0, PARSE_THREAD: 0, PARSE_PROCESS: 0}
+
+    def process_executor(self) -> Executor:
+        """Return the process pool, starting it if needed."""
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+
+            # Spawned workers do not inherit the event loop's threads or locks.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def parse(self, filename: str, content: str) -> Any:
+        """Parse ``content`` on the calling thread."""
+        self.counts[PARSE_INLINE] += 1
+        return parse_content(filename, content)
+
+    def mode(self, filename: str, size: int) -> str:
+        """Return where a file of ``size`` bytes is parsed."""
+        if is_yaml(filename):
+            if size <= INLINE_MAX_YAML_BYTES:
+                return PARSE_INLINE
+            if size >= self.process_min_bytes:
+                return PARSE_PROCESS
+            return PARSE_THREAD
+        return PARSE_INLINE if size <= INLINE_MAX_OTHER_BYTES else PARSE_THREAD
+
+    async def read_and_parse(
+        self, file_path: Path, filename: str, mode: str | None = None
+    ) -> Any:
+        """Read and parse a file in the place ``mode`` names.
+
+        Args:
+            file_path: File to read
+            filename: Name the file was requested by, which picks the parser
+            mode: Where to parse; chosen from the file's size when ``None``
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        if mode is None:
+            try:
+                size = (await asyncio.to_thread(file_path.stat)).st_size
+            except FileNotFoundError as err:
+                raise FileNotFoundError(f"File {filename} not found") from err
+            mode = self.mode(filename, size)
+        if mode == PARSE_PROCESS:
+            self.counts[mode] += 1
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(
+                self.process_executor(), _read_and_parse_encoded, str(file_path), filename
+            )
+            return _decode(data)
+        if mode == PARSE_THREAD:
+            self.counts[mode] += 1
+            return await asyncio.to_thread(read_and_parse, file_path, filename)
+        import aiofiles
+
+        try:
+            async with aiofiles.open(file_path, 'r') as f:
+                content = await f.read()
+        except FileNotFoundError as err:
+            raise FileNotFoundError(f"File {filename} not found") from err
+        return self.parse(filename, content)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, if this backend started them."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return how many files were parsed in each place."""
+        return {
+            "parsed": dict(self.counts),
+            "process_pool": self._executor is not None,
+        }
@@ -0,0 +1,275 @@
+"""Sampling profiler and slow-call capture for the MCP Server handlers.
+
+A background thread periodically samples the stack of the thread running the
+event loop. While a handler call is being watched, every sample is attributed
+to it: if the handler's frame is on the stack the full stack is kept,
+otherwise the sample is recorded as ``[awaiting]`` (the handler was waiting
+on I/O, an executor job or another task). Calls that end up slower than the
+threshold are written out as collapsed stacks, the text format consumed by
+``flamegraph.pl`` and speedscope, with a JSON sidecar holding the redacted
+call arguments.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+REDACTED = "**REDACTED**"
+# Numbers the captures of this process, so that captures written within the
+# same second get distinct file names.
+_CAPTURE_NUMBERS = itertools.count(1)
+
+# Call arguments that identify what was asked for without carrying content.
+SAFE_ARGUMENTS = frozenset(
+    {
+        "device_id",
+        "domain",
+        "end_time",
+        "entity_id",
+        "entry_id",
+        "filename",
+        "key_path",
+        "start_time",
+        "user_id",
+    }
+)
+
+AWAITING = "[awaiting]"
+MAX_SAMPLES_PER_CALL = 20_000
+MAX_STACK_DEPTH = 128
+
+
+def redact_arguments(data: Mapping[str, Any]) -> dict[str, Any]:
+    """Return ``data`` with every value outside ``SAFE_ARGUMENTS`` redacted."""
+    return {
+        key: value if key in SAFE_ARGUMENTS else REDACTED for key, value in data.items()
+    }
+
+
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame: Any, marker: str | None = None) -> str | None:
+    """Return the stack of ``frame`` in collapsed form, root first.
+
+    With ``marker``, only the part of the stack from the frame whose function
+    is named ``marker`` upwards is kept, and ``None`` is returned if no such
+    frame exists.
+    """
+    labels = []
+    found = marker is None
+    depth = 0
+    while frame is not None and depth < MAX_STACK_DEPTH:
+        code = frame.f_code
+        labels.append(_frame_label(code))
+        if marker is not None and code.co_name == marker:
+            found = True
+            break
+        frame = frame.f_back
+        depth += 1
+    if not found:
+        return None
+    labels.reverse()
+    return ";".join(labels)
+
+
+@dataclass
+class WatchedCall:
+    """A handler call being sampled."""
+
+    service: str
+    marker: str
+    arguments: dict[str, Any]
+    thread_id: int
+    started: float = field(default_factory=time.monotonic)
+    samples: Counter = field(default_factory=Counter)
+    sample_count: int = 0
+
+
+@dataclass
+class ProfileCapture:
+    """Samples collected for a slow call or a sampling window."""
+
+    name: str
+    duration: float
+    interval: float
+    samples: Counter
+    metadata: dict[str, Any]
+
+    def write(self, directory: Path) -> Path:
+        """Write the collapsed stacks and JSON sidecar; return the stack file."""
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        number = next(_CAPTURE_NUMBERS)
+        base = directory / (
+            f"{self.name}_{stamp}-{number}_{int(self.duration * 1000)}ms"
+        )
+        stacks = base.with_suffix(".collapsed")
+        with open(stacks, "w", encoding="utf-8") as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{stack} {count}\n")
+        base.with_suffix(".json").write_text(
+            json.dumps(
+                {
+                    "name": self.name,
+                    "duration_ms": round(self.duration * 1000, 3),
+                    "interval_ms": round(self.interval * 1000, 3),
+                    "samples": sum(self.samples.values()),
+                    **self.metadata,
+                },
+                indent=2,
+                default=str,
+            ),
+            encoding="utf-8",
+        )
+        return stacks
+
+
+class SamplingProfiler:
+    """Samples the event loop thread for watched calls and sampling windows."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        """Initialize the profiler.
+
+        Args:
+            interval: Seconds between two samples
+        """
+        self.interval = interval
+        self.enabled = False
+        self.threshold = 1.0
+        self._lock = threading.Lock()
+        self._calls: dict[int, WatchedCall] = {}
+        self._windows: dict[int, tuple[int, Counter]] = {}
+        self._next_id = 0
+        self._thread: threading.Thread | None = None
+        self._wakeup = threading.Event()
+        self._stopping = False
+
+    def configure(self, enabled: bool, threshold: float) -> None:
+        """Turn slow-call capture on or off and set its threshold in seconds."""
+        self.enabled = enabled
+        self.threshold = threshold
+
+    def begin_call(
+        self, service: str, marker: str, arguments: Mapping[str, Any]
+    ) -> int | None:
+        """Start watching a call made from the current thread.
+
+        Returns a token for ``end_call``, or ``None`` when capture is disabled.
+        """
+        if not self.enabled:
+            return None
+        call = WatchedCall(
+            service, marker, redact_arguments(arguments), threading.get_ident()
+        )
+        with self._lock:
+            token = self._next_id
+            self._next_id += 1
+            self._calls[token] = call
+        self._ensure_thread()
+        return token
+
+    def end_call(self, token: int | None, error: bool = False) -> ProfileCapture | None:
+        """Stop watching a call; return a capture if it was slow."""
+        if token is None:
+            return None
+        with self._lock:
+            call = self._calls.pop(token, None)
+        if call is None:
+            return None
+        duration = time.monotonic() - call.started
+        if duration < self.threshold or not call.samples:
+            return None
+        return ProfileCapture(
+            name=call.service,
+            duration=duration,
+            interval=self.interval,
+            samples=call.samples,
+            metadata={
+                "kind": "slow_call",
+                "service": call.service,
+                "arguments": call.arguments,
+                "error": error,
+                "threshold_ms": round(self.threshold * 1000, 3),
+            },
+        )
+
+    def begin_window(self) -> int:
+        """Start sampling everything the current thread runs."""
+        with self._lock:
+            token = self._next_id
+            self._next_id += 1
+            self._windows[token] = (threading.get_ident(), Counter())
+        self._ensure_thread()
+        return token
+
+    def end_window(self, token: int, duration: float) -> ProfileCapture:
+        """Stop a sampling window and return what it collected."""
+        with self._lock:
+            _, samples = self._windows.pop(token)
+        return ProfileCapture(
+            name="window",
+            duration=duration,
+            interval=self.interval,
+            samples=samples,
+            metadata={"kind": "window"},
+        )
+
+    def shutdown(self) -> None:
+        """Stop the sampling thread."""
+        self._stopping = True
+        self._wakeup.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=1)
+
+    def _ensure_thread(self) -> None:
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="ha_mcp_server_profiler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            with self._lock:
+                idle = not self._calls and not self._windows
+            if idle:
+                # Nothing to sample: sleep until someone starts watching.
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+            self._sample()
+            time.sleep(self.interval)
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        with self._lock:
+            for call in self._calls.values():
+                if call.sample_count >= MAX_SAMPLES_PER_CALL:
+                    continue
+                frame = frames.get(call.thread_id)
+                stack = None if frame is None else collapse_stack(frame, call.marker)
+                call.samples[stack or f"{call.service};{AWAITING}"] += 1
+                call.sample_count += 1
+            for thread_id, samples in self._windows.values():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[collapse_stack(frame)] += 1
+        del frames
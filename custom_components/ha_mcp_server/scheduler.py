@@ -0,0 +1,169 @@
+"""Admission control and priority scheduling for MCP Server operations.
+
+Operations are classified by cost. Each class has its own concurrency limit
+and a bounded wait queue; a call that finds its queue full is rejected
+immediately instead of piling up. All classes also share a global limit, and
+when a slot frees up waiters are admitted in class priority order, so cheap
+lookups never sit behind history queries or full listings.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import time
+from typing import Any
+
+from .const import CostClass
+from .metrics import Histogram, LATENCY_BOUNDS
+
+
+@dataclass(frozen=True, slots=True)
+class ClassLimits:
+    """Concurrency and queue limits for one cost class."""
+
+    concurrency: int
+    queue_size: int
+
+
+DEFAULT_LIMITS: dict[CostClass, ClassLimits] = {
+    CostClass.CHEAP: ClassLimits(concurrency=32, queue_size=256),
+    CostClass.LISTING: ClassLimits(concurrency=2, queue_size=16),
+    CostClass.HEAVY: ClassLimits(concurrency=2, queue_size=8),
+}
+DEFAULT_TOTAL_CONCURRENCY = 34
+
+
+class AdmissionRejected(Exception):
+    """Raised when an operation's queue is full."""
+
+    def __init__(self, cost: CostClass, queued: int) -> None:
+        """Initialize the error."""
+        super().__init__(
+            f"Too many {cost.name.lower()} operations queued ({queued}); try again later"
+        )
+        self.cost = cost
+
+
+class _ClassState:
+    """Runtime state and metrics for one cost class."""
+
+    __slots__ = ("limits", "running", "waiters", "admitted", "rejected", "wait_time")
+
+    def __init__(self, limits: ClassLimits) -> None:
+        self.limits = limits
+        self.running = 0
+        self.waiters: deque[asyncio.Future[None]] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_time = Histogram(LATENCY_BOUNDS)
+
+    def as_dict(self) -> dict[str, Any]:
+        p50 = self.wait_time.percentile(0.50)
+        p99 = self.wait_time.percentile(0.99)
+        return {
+            "concurrency": self.limits.concurrency,
+            "queue_size": self.limits.queue_size,
+            "running": self.running,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_p50_ms": None if p50 is None else round(p50 * 1000, 3),
+            "wait_p99_ms": None if p99 is None else round(p99 * 1000, 3),
+            "wait_overflow": self.wait_time.overflow,
+        }
+
+
+class OperationScheduler:
+    """Admits operations according to their cost class."""
+
+    def __init__(
+        self,
+        limits: dict[CostClass, ClassLimits] | None = None,
+        total_concurrency: int = DEFAULT_TOTAL_CONCURRENCY,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            limits: Per-class limits; missing classes use ``DEFAULT_LIMITS``
+            total_concurrency: Operations allowed to run at once across classes
+        """
+        merged = {**DEFAULT_LIMITS, **(limits or {})}
+        self._classes = {cost: _ClassState(merged[cost]) for cost in CostClass}
+        self.total_concurrency = total_concurrency
+        self._running = 0
+
+    def _can_start(self, state: _ClassState) -> bool:
+        return (
+            state.running < state.limits.concurrency
+            and self._running < self.total_concurrency
+        )
+
+    def _start(self, state: _ClassState) -> None:
+        state.running += 1
+        state.admitted += 1
+        self._running += 1
+
+    def _release(self, state: _ClassState) -> None:
+        state.running -= 1
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, cheapest class first."""
+        for cost in CostClass:
+            state = self._classes[cost]
+            while state.waiters and self._can_start(state):
+                waiter = state.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._start(state)
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, cost: CostClass) -> AsyncIterator[None]:
+        """Run the body once an operation of ``cost`` may start.
+
+        Raises ``AdmissionRejected`` straight away if the class queue is full.
+        """
+        state = self._classes[cost]
+        start = time.perf_counter()
+        # Jump the queue only if nobody of this class is already waiting.
+        if not state.waiters and self._can_start(state):
+            self._start(state)
+        else:
+            if len(state.waiters) >= state.limits.queue_size:
+                state.rejected += 1
+                raise AdmissionRejected(cost, len(state.waiters))
+            waiter = asyncio.get_running_loop().create_future()
+            state.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Admitted just as we were cancelled: give the slot back.
+                    self._release(state)
+                else:
+                    try:
+                        state.waiters.remove(waiter)
+                    except ValueError:
+                        pass
+                raise
+        state.wait_time.add(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._release(state)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return queue depth, wait time and admission counts per class."""
+        return {
+            "running": self._running,
+            "total_concurrency": self.total_concurrency,
+            "classes": {
+                cost.name.lower(): state.as_dict()
+                for cost, state in self._classes.items()
+            },
+        }
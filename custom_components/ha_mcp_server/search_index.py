@@ -0,0 +1,347 @@
+"""Inverted token/trigram index for fuzzy entity search.
+
+Documents are small sets of named text fields. Each field is split into
+lowercase word tokens, and a posting list maps every token to the documents
+containing it, weighted by the most important field it appeared in.
+
+Fuzzy matching works on the vocabulary rather than on the documents: every
+distinct token is also indexed by its character trigrams, so a query token
+is expanded to the vocabulary tokens sharing enough trigrams with it (or
+starting with it) before any posting list is read. The vocabulary is far
+smaller than the document set, which keeps queries in the sub-millisecond
+range. Candidate documents are narrowed by intersecting the query terms from
+the rarest up, so only documents matching (nearly) every term are scored and
+common words such as "light" never cost a full posting-list walk.
+
+Postings are kept compact, since most tokens, such as the number in an
+entity id, belong to a single document. Each token has flat ``(weight,
+docs, ...)`` pairs, where ``docs`` is a bare document id while there is
+only one and a set from the second on. Sets for single documents are only
+built while a query reads them. The tokens of each document are a flat
+tuple of ``(token, weight, ...)`` pairs rather than a dict. Tokens are
+interned, so every document shares one copy of each word.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable, Iterator, Mapping
+import heapq
+from itertools import chain
+import math
+import re
+from sys import intern
+from typing import Any
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset({"a", "an", "and", "in", "of", "on", "the", "to", "my"})
+
+# Field weights; fields not listed weigh 1.0.
+FIELD_WEIGHTS: dict[str, float] = {
+    "name": 1.5,
+    "original_name": 1.2,
+    "area": 1.2,
+    "entity_id": 1.0,
+    "device": 1.0,
+    "manufacturer": 0.6,
+    "model": 0.6,
+}
+
+MIN_SIMILARITY = 0.5
+PREFIX_SIMILARITY = 0.9
+MAX_EXPANSIONS = 8
+
+# A document's tokens as flat ``(token, weight, token, weight, ...)`` pairs.
+TokenWeights = tuple[str | float, ...]
+# The documents with a token at one weight: a bare id while there is one.
+Docs = str | set[str]
+# A token's documents as flat ``(weight, docs, weight, docs, ...)`` pairs.
+Groups = tuple[float | Docs, ...]
+
+
+def _pairs(flat: tuple[Any, ...]) -> Iterator[tuple[Any, Any]]:
+    values = iter(flat)
+    return zip(values, values)
+
+
+def _add_doc(groups: Groups, weight: float, doc_id: str) -> Groups:
+    """Return ``groups`` with ``doc_id`` added at ``weight``."""
+    for index in range(0, len(groups), 2):
+        if groups[index] == weight:
+            docs = groups[index + 1]
+            if isinstance(docs, set):
+                docs.add(doc_id)
+                return groups
+            return (*groups[: index + 1], {docs, doc_id}, *groups[index + 2 :])
+    return (*groups, weight, doc_id)
+
+
+def _remove_doc(groups: Groups, weight: float, doc_id: str) -> Groups:
+    """Return ``groups`` without ``doc_id`` at ``weight``."""
+    for index in range(0, len(groups), 2):
+        if groups[index] == weight:
+            docs = groups[index + 1]
+            if isinstance(docs, str):
+                return groups[:index] + groups[index + 2 :]
+            docs.discard(doc_id)
+            if len(docs) == 1:
+                return (*groups[: index + 1], docs.pop(), *groups[index + 2 :])
+            return groups
+    return groups
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Split ``text`` into lowercase word tokens."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token: str) -> set[str]:
+    """Return the padded character trigrams of ``token``."""
+    padded = f" {token} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Incrementally maintained fuzzy search index."""
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        # token -> weight -> docs; lets single-term queries stop after top-k.
+        self._weight_docs: dict[str, Groups] = {}
+        self._doc_tokens: dict[str, TokenWeights] = {}
+        self._gram_vocab: dict[str, set[str]] = {}
+        self._expansions: dict[str, list[tuple[str, float]]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        return len(self._doc_tokens)
+
+    def __contains__(self, doc_id: object) -> bool:
+        """Return whether ``doc_id`` is indexed."""
+        return doc_id in self._doc_tokens
+
+    def upsert(self, doc_id: str, fields: Mapping[str, str | None]) -> None:
+        """Index ``doc_id`` with ``fields``, replacing any previous version."""
+        tokens: dict[str, float] = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(text):
+                if tokens.get(token, 0.0) < weight:
+                    tokens[intern(token)] = weight
+        self._set(doc_id, tuple(chain.from_iterable(tokens.items())))
+
+    def restore(self, doc_id: str, tokens: TokenWeights) -> None:
+        """Index ``doc_id`` with weighted tokens saved from ``doc_tokens``.
+
+        This skips tokenizing, for warm starts from a saved index.
+        """
+        self._set(
+            doc_id,
+            tuple(
+                chain.from_iterable(
+                    (intern(token), weight) for token, weight in _pairs(tokens)
+                )
+            ),
+        )
+
+    def _set(self, doc_id: str, tokens: TokenWeights) -> None:
+        if self._doc_tokens.get(doc_id) == tokens:
+            return
+        self.remove(doc_id)
+        self._doc_tokens[doc_id] = tokens
+        weight_docs = self._weight_docs
+        for token, weight in _pairs(tokens):
+            groups = weight_docs.get(token)
+            if groups is None:
+                weight_docs[token] = (weight, doc_id)
+                self._add_vocabulary(token)
+            else:
+                weight_docs[token] = _add_doc(groups, weight, doc_id)
+
+    def doc_tokens(self) -> dict[str, TokenWeights]:
+        """Return the weighted tokens of every document.
+
+        Each document maps to flat ``(token, weight, ...)`` pairs; use
+        ``dict(zip(tokens[::2], tokens[1::2]))`` for a mapping.
+        """
+        return dict(self._doc_tokens)
+
+    def tokens(self, doc_id: str) -> TokenWeights | None:
+        """Return the weighted tokens of one document, as in ``doc_tokens``."""
+        return self._doc_tokens.get(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        """Remove ``doc_id`` from the index if present."""
+        tokens = self._doc_tokens.pop(doc_id, None)
+        if not tokens:
+            return
+        weight_docs = self._weight_docs
+        for token, weight in _pairs(tokens):
+            if groups := _remove_doc(weight_docs[token], weight, doc_id):
+                weight_docs[token] = groups
+            else:
+                del weight_docs[token]
+                self._remove_vocabulary(token)
+
+    def _groups(self, token: str) -> list[tuple[float, set[str]]]:
+        """Return the documents having ``token``, as sets by weight.
+
+        The sets of several documents belong to the index and must not be
+        modified.
+        """
+        return [
+            (weight, {docs} if isinstance(docs, str) else docs)
+            for weight, docs in _pairs(self._weight_docs[token])
+        ]
+
+    def _add_vocabulary(self, token: str) -> None:
+        for gram in trigrams(token):
+            self._gram_vocab.setdefault(gram, set()).add(token)
+        self._expansions.clear()
+
+    def _remove_vocabulary(self, token: str) -> None:
+        for gram in trigrams(token):
+            vocab = self._gram_vocab.get(gram)
+            if vocab is not None:
+                vocab.discard(token)
+                if not vocab:
+                    del self._gram_vocab[gram]
+        self._expansions.clear()
+
+    def expand(self, token: str) -> list[tuple[str, float]]:
+        """Return vocabulary tokens similar to ``token`` with their similarity.
+
+        A token that is itself in the vocabulary is taken as spelled right and
+        only expands to words it is a prefix of.
+        """
+        cached = self._expansions.get(token)
+        if cached is not None:
+            return cached
+        if token in self._weight_docs and len(token) <= 2:
+            expansions = [(token, 1.0)]
+        else:
+            grams = trigrams(token)
+            shared: Counter[str] = Counter()
+            for gram in grams:
+                vocab = self._gram_vocab.get(gram)
+                if vocab:
+                    shared.update(vocab)
+            threshold = PREFIX_SIMILARITY if token in self._weight_docs else MIN_SIMILARITY
+            scored = []
+            for candidate, count in shared.items():
+                if candidate == token:
+                    similarity = 1.0
+                else:
+                    similarity = 2 * count / (len(grams) + len(candidate))
+                    if candidate.startswith(token):
+                        similarity = max(similarity, PREFIX_SIMILARITY)
+                if similarity >= threshold:
+                    scored.append((candidate, similarity))
+            expansions = heapq.nlargest(MAX_EXPANSIONS, scored, key=lambda item: item[1])
+        self._expansions[token] = expansions
+        return expansions
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        accept: Callable[[str], bool] | None = None,
+    ) -> list[tuple[str, float]]:
+        """Return up to ``limit`` ``(doc_id, score)`` pairs, best first.
+
+        With ``accept``, only documents it returns true for are considered.
+        """
+        total = len(self._doc_tokens)
+        if not total:
+            return []
+        query_tokens = [
+            token for token in dict.fromkeys(tokenize(query)) if token not in STOPWORDS
+        ]
+        # Each query term becomes its (score, documents) groups, best first.
+        # Field weights take only a handful of values, so a term's documents
+        # fall into a few groups per expansion, and a document's first group
+        # is its best score for the term.
+        terms: list[tuple[int, list[tuple[float, set[str]]]]] = []
+        for token in query_tokens:
+            groups = []
+            size = 0
+            for candidate, similarity in self.expand(token):
+                by_weight = self._groups(candidate)
+                count = sum(len(docs) for _, docs in by_weight)
+                idf = math.log(1 + total / count)
+                for weight, docs in by_weight:
+                    groups.append((weight * similarity * idf, docs))
+                size += count
+            if groups:
+                groups.sort(key=lambda group: group[0], reverse=True)
+                terms.append((size, groups))
+        if not terms:
+            return []
+        if len(terms) == 1:
+            return self._search_single(terms[0][1], limit, accept)
+
+        # Narrow the candidates by intersecting terms from the rarest up; a
+        # term that would leave nothing only contributes to the score.
+        terms.sort(key=lambda term: term[0])
+        candidates: set[str] | None = None
+        for _, groups in terms:
+            if candidates is None:
+                narrowed = set().union(*(docs for _, docs in groups))
+                if accept is not None:
+                    narrowed = {doc_id for doc_id in narrowed if accept(doc_id)}
+            else:
+                narrowed = set().union(*(candidates & docs for _, docs in groups))
+            if narrowed:
+                candidates = narrowed
+        if candidates is None:
+            return []
+
+        # Score by partitioning rather than document by document: each term
+        # splits every partition by the group its documents fall into, so the
+        # work is set operations whose count depends on the number of
+        # distinct scores, not on the number of candidates.
+        partitions: list[tuple[float, set[str]]] = [(0.0, candidates)]
+        for _, groups in terms:
+            hits = [
+                (score, matched)
+                for score, docs in groups
+                if (matched := candidates & docs)
+            ]
+            split: list[tuple[float, set[str]]] = []
+            for base, members in partitions:
+                for score, matched in hits:
+                    if found := members & matched:
+                        split.append((base + score, found))
+                        members = members - found
+                        if not members:
+                            break
+                if members:
+                    split.append((base, members))
+            partitions = split
+
+        partitions.sort(key=lambda partition: partition[0], reverse=True)
+        results: list[tuple[str, float]] = []
+        for score, members in partitions:
+            for doc_id in members:
+                results.append((doc_id, score))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _search_single(
+        self,
+        groups: list[tuple[float, set[str]]],
+        limit: int,
+        accept: Callable[[str], bool] | None,
+    ) -> list[tuple[str, float]]:
+        """Top-k for one term, stopping as soon as ``limit`` documents are found."""
+        results: dict[str, float] = {}
+        for score, docs in groups:
+            for doc_id in docs:
+                if doc_id not in results and (accept is None or accept(doc_id)):
+                    results[doc_id] = score
+                    if len(results) >= limit:
+                        return list(results.items())
+        return list(results.items())
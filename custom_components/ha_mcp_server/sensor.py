@@ -0,0 +1,149 @@
+"""Sensor platform exposing per-service metrics of the MCP Server."""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .metrics import MetricsRegistry
+from .scheduler import CostClass, OperationScheduler
+from .services import SERVICES
+from .watchdog import LoopWatchdog
+
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the per-service, per-cost-class and event loop lag sensors."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    metrics: MetricsRegistry = entry_data["metrics"]
+    scheduler: OperationScheduler = entry_data["scheduler"]
+    entities: list[SensorEntity] = [
+        MCPServiceLatencySensor(entry, metrics, service.name) for service in SERVICES
+    ]
+    entities.extend(MCPQueueDepthSensor(entry, scheduler, cost) for cost in CostClass)
+    entities.append(MCPLoopLagSensor(entry, entry_data["watchdog"]))
+    async_add_entities(entities)
+
+
+def _device_info(entry: ConfigEntry) -> DeviceInfo:
+    """Return the service device all sensors belong to."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name=entry.title,
+        entry_type=DeviceEntryType.SERVICE,
+    )
+
+
+class MCPServiceLatencySensor(SensorEntity):
+    """Rolling p95 latency of one service, with the other metrics as attributes."""
+
+    _attr_has_entity_name = True
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, entry: ConfigEntry, metrics: MetricsRegistry, service: str) -> None:
+        """Initialize the sensor."""
+        self._metrics = metrics
+        self._service = service
+        self._attr_name = f"{service} latency"
+        self._attr_unique_id = f"{entry.entry_id}_{service}_latency"
+        self._attr_device_info = _device_info(entry)
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the rolling p95 latency in milliseconds."""
+        return self._metrics.get(self._service).latency_ms(0.95)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return call counts, percentiles and response sizes."""
+        summary = self._metrics.get(self._service).as_dict()
+        response_bytes = summary.pop("response_bytes")
+        summary["response_bytes_p50"] = response_bytes["p50"]
+        summary["response_bytes_p95"] = response_bytes["p95"]
+        summary["response_bytes_overflow"] = response_bytes["overflow"]
+        return summary
+
+
+class MCPQueueDepthSensor(SensorEntity):
+    """Queue depth of one scheduler cost class, with wait times as attributes."""
+
+    _attr_has_entity_name = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self, entry: ConfigEntry, scheduler: OperationScheduler, cost: CostClass
+    ) -> None:
+        """Initialize the sensor."""
+        self._scheduler = scheduler
+        self._cost = cost.name.lower()
+        self._attr_name = f"{self._cost} queue depth"
+        self._attr_unique_id = f"{entry.entry_id}_{self._cost}_queue_depth"
+        self._attr_device_info = _device_info(entry)
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of operations waiting in this class."""
+        return self._scheduler.as_dict()["classes"][self._cost]["queued"]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return running, admitted and rejected counts and wait times."""
+        return self._scheduler.as_dict()["classes"][self._cost]
+
+
+class MCPLoopLagSensor(SensorEntity):
+    """Worst recent event loop lag, with the stalls behind it as attributes."""
+
+    _attr_has_entity_name = True
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_name = "Event loop lag"
+
+    def __init__(self, entry: ConfigEntry, watchdog: LoopWatchdog) -> None:
+        """Initialize the sensor."""
+        self._watchdog = watchdog
+        self._attr_unique_id = f"{entry.entry_id}_event_loop_lag"
+        self._attr_device_info = _device_info(entry)
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the largest heartbeat lag of the last minute in milliseconds."""
+        return self._watchdog.lag_ms()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return lag percentiles, stall counts and the worst offenders."""
+        watchdog = self._watchdog
+        return {
+            "lag_p50_ms": watchdog.lag_ms(0.5),
+            "lag_p99_ms": watchdog.lag_ms(0.99),
+            "stalls": watchdog.stalls,
+            "stalls_by_service": {
+                name: totals["stalls"] for name, totals in watchdog.by_service().items()
+            },
+            "worst_stalls": [
+                f"{stall.service or stall.task or 'unknown'} "
+                f"({stall.phase or 'unknown phase'}): {stall.duration * 1000:.0f} ms"
+                for stall in watchdog.worst()[:5]
+            ],
+        }
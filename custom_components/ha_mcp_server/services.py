@@ -0,0 +1,547 @@
+"""Service table for the Home Assistant MCP Server integration.
+
+Every service the integration exposes is described by one ``MCPService``
+row. Registration and teardown are both driven by ``SERVICES`` so the two can
+never drift apart, and handler modules are only imported the first time one
+of their services is called.
+"""
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import importlib
+import logging
+from pathlib import Path
+import sys
+import time
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.json import json_bytes
+
+try:
+    from homeassistant.helpers.importlib import async_import_module
+except ImportError:  # Older Home Assistant; see _async_resolve_handler
+    async_import_module = None
+
+from .const import DOMAIN, FORMAT_JSONL, FORMATS, PROFILE_DIR, CostClass
+
+if TYPE_CHECKING:
+    from .profiler import ProfileCapture
+
+_LOGGER = logging.getLogger(__name__)
+
+ServiceHandler = Callable[[HomeAssistant, dict[str, Any], ServiceCall], Awaitable[Any]]
+
+# Service schemas
+SERVICE_READ_CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+        vol.Optional("if_none_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_READ_CONFIG_FILES_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional("filenames"): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional("pattern"): cv.string,
+        }
+    ),
+    cv.has_at_least_one_key("filenames", "pattern"),
+)
+
+SERVICE_WRITE_CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+        vol.Required("content"): vol.Any(dict, str),
+        vol.Optional("validate"): cv.boolean,
+        vol.Optional("if_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_LIST_CONFIGS_SCHEMA = vol.Schema(
+    {
+        vol.Optional("if_none_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_GET_CONFIG_VALUE_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+        vol.Required("key_path"): cv.string,
+        vol.Optional("if_none_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_SET_CONFIG_VALUE_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+        vol.Required("key_path"): cv.string,
+        vol.Required("value"): vol.Any(str, int, float, bool, dict, list),
+        vol.Optional("validate"): cv.boolean,
+        vol.Optional("if_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_VALIDATE_CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+        vol.Optional("content"): vol.Any(dict, str),
+    }
+)
+
+SERVICE_FIND_CONFIG_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional("key"): cv.string,
+            vol.Optional("entity_id"): cv.string,
+            vol.Optional("limit", default=100): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=1000)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key("key", "entity_id"),
+)
+
+SERVICE_LIST_CONFIG_VERSIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+    }
+)
+
+SERVICE_DIFF_CONFIG_VERSIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+        vol.Required("from_version"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional("to_version"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+SERVICE_ROLLBACK_CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Required("filename"): cv.string,
+        vol.Required("version"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+# Service schemas for HA data access
+SERVICE_LIST_USERS_SCHEMA = vol.Schema(
+    {
+        vol.Optional("if_none_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_GET_USER_SCHEMA = vol.Schema(
+    {
+        vol.Required("user_id"): cv.string,
+    }
+)
+
+SERVICE_LIST_INTEGRATIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional("if_none_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_GET_INTEGRATION_SCHEMA = vol.Schema(
+    {
+        vol.Required("entry_id"): cv.string,
+    }
+)
+
+SERVICE_LIST_DEVICES_SCHEMA = vol.Schema(
+    {
+        vol.Optional("domain"): cv.string,
+        vol.Optional("if_none_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_GET_DEVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required("device_id"): cv.string,
+        vol.Optional("include_entities", default=False): cv.boolean,
+    }
+)
+
+SERVICE_LIST_ENTITIES_SCHEMA = vol.Schema(
+    {
+        vol.Optional("domain"): cv.string,
+        vol.Optional("if_none_match"): cv.string,
+        vol.Optional("include_etag", default=False): cv.boolean,
+    }
+)
+
+SERVICE_GET_ENTITY_SCHEMA = vol.Schema(
+    {
+        vol.Required("entity_id"): cv.entity_id,
+    }
+)
+
+SERVICE_UPDATE_ENTITY_STATE_SCHEMA = vol.Schema(
+    {
+        vol.Required("entity_id"): cv.entity_id,
+        vol.Required("state"): cv.string,
+        vol.Optional("attributes"): dict,
+    }
+)
+
+SERVICE_GET_ENTITY_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required("entity_id"): cv.entity_id,
+        vol.Optional("start_time"): cv.string,
+        vol.Optional("end_time"): cv.string,
+    }
+)
+
+SERVICE_RENDER_TEMPLATES_SCHEMA = vol.Schema(
+    {
+        vol.Required("templates"): vol.All(
+            cv.ensure_list, [cv.string], vol.Length(min=1, max=100)
+        ),
+        vol.Optional("variables"): dict,
+        vol.Optional("parse_result", default=True): cv.boolean,
+    }
+)
+
+SERVICE_EXPORT_SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        vol.Optional("format", default=FORMAT_JSONL): vol.In(FORMATS),
+        vol.Optional("since_revision"): cv.string,
+    }
+)
+
+# Log service schemas
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+SERVICE_TAIL_LOG_SCHEMA = vol.Schema(
+    {
+        vol.Optional("lines", default=50): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+        vol.Optional("level"): vol.All(vol.Upper, vol.In(LOG_LEVELS)),
+    }
+)
+
+SERVICE_SEARCH_LOG_SCHEMA = vol.Schema(
+    {
+        vol.Optional("pattern"): cv.string,
+        vol.Optional("start_time"): cv.string,
+        vol.Optional("end_time"): cv.string,
+        vol.Optional("level"): vol.All(vol.Upper, vol.In(LOG_LEVELS)),
+        vol.Optional("limit", default=100): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+# Index-backed lookup service schemas
+SERVICE_SEARCH_SCHEMA = vol.Schema(
+    {
+        vol.Required("query"): cv.string,
+        vol.Optional("limit", default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional("domain"): cv.string,
+    }
+)
+
+SERVICE_QUERY_ENTITIES_SCHEMA = vol.Schema(
+    {
+        vol.Required("where"): cv.string,
+        vol.Optional("limit", default=100): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+SERVICE_GET_TOPOLOGY_SCHEMA = vol.Schema(
+    {
+        vol.Optional("include_states", default=False): cv.boolean,
+        vol.Optional("area_id"): cv.string,
+    }
+)
+
+# Debugging service schemas
+SERVICE_PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("duration", default=10): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=300)
+        ),
+    }
+)
+
+
+@dataclass(frozen=True, slots=True)
+class MCPService:
+    """Declarative description of one integration service."""
+
+    name: str
+    module: str
+    handler: str
+    schema: vol.Schema
+    cost: CostClass | None = CostClass.CHEAP
+    capture_slow_calls: bool = True
+
+
+SERVICES: tuple[MCPService, ...] = (
+    # Config file services
+    MCPService(
+        "read_config", "config_handlers", "handle_read_config",
+        SERVICE_READ_CONFIG_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "read_config_files", "config_handlers", "handle_read_config_files",
+        SERVICE_READ_CONFIG_FILES_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "write_config", "config_handlers", "handle_write_config",
+        SERVICE_WRITE_CONFIG_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "list_configs", "config_handlers", "handle_list_configs",
+        SERVICE_LIST_CONFIGS_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "get_config_value", "config_handlers", "handle_get_config_value",
+        SERVICE_GET_CONFIG_VALUE_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "set_config_value", "config_handlers", "handle_set_config_value",
+        SERVICE_SET_CONFIG_VALUE_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "validate_config", "config_handlers", "handle_validate_config",
+        SERVICE_VALIDATE_CONFIG_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "find_config", "config_handlers", "handle_find_config",
+        SERVICE_FIND_CONFIG_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "list_config_versions", "config_handlers", "handle_list_config_versions",
+        SERVICE_LIST_CONFIG_VERSIONS_SCHEMA,
+    ),
+    MCPService(
+        "diff_config_versions", "config_handlers", "handle_diff_config_versions",
+        SERVICE_DIFF_CONFIG_VERSIONS_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "rollback_config", "config_handlers", "handle_rollback_config",
+        SERVICE_ROLLBACK_CONFIG_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    # HA data access services
+    MCPService(
+        "list_users", "data_handlers", "handle_list_users",
+        SERVICE_LIST_USERS_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "get_user", "data_handlers", "handle_get_user",
+        SERVICE_GET_USER_SCHEMA,
+    ),
+    MCPService(
+        "list_integrations", "data_handlers", "handle_list_integrations",
+        SERVICE_LIST_INTEGRATIONS_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "get_integration", "data_handlers", "handle_get_integration",
+        SERVICE_GET_INTEGRATION_SCHEMA,
+    ),
+    MCPService(
+        "list_devices", "data_handlers", "handle_list_devices",
+        SERVICE_LIST_DEVICES_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "get_device", "data_handlers", "handle_get_device",
+        SERVICE_GET_DEVICE_SCHEMA,
+    ),
+    MCPService(
+        "list_entities", "data_handlers", "handle_list_entities",
+        SERVICE_LIST_ENTITIES_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "get_entity", "data_handlers", "handle_get_entity",
+        SERVICE_GET_ENTITY_SCHEMA,
+    ),
+    MCPService(
+        "update_entity_state", "data_handlers", "handle_update_entity_state",
+        SERVICE_UPDATE_ENTITY_STATE_SCHEMA,
+    ),
+    MCPService(
+        "get_entity_history", "data_handlers", "handle_get_entity_history",
+        SERVICE_GET_ENTITY_HISTORY_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "render_templates", "template_handlers", "handle_render_templates",
+        SERVICE_RENDER_TEMPLATES_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "export_snapshot", "export_handlers", "handle_export_snapshot",
+        SERVICE_EXPORT_SNAPSHOT_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    # Log services
+    MCPService(
+        "tail_log", "log_handlers", "handle_tail_log",
+        SERVICE_TAIL_LOG_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    MCPService(
+        "search_log", "log_handlers", "handle_search_log",
+        SERVICE_SEARCH_LOG_SCHEMA, cost=CostClass.HEAVY,
+    ),
+    # Index-backed lookup services
+    MCPService(
+        "search", "index_handlers", "handle_search",
+        SERVICE_SEARCH_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "query_entities", "index_handlers", "handle_query_entities",
+        SERVICE_QUERY_ENTITIES_SCHEMA, cost=CostClass.LISTING,
+    ),
+    MCPService(
+        "get_topology", "index_handlers", "handle_get_topology",
+        SERVICE_GET_TOPOLOGY_SCHEMA, cost=CostClass.LISTING,
+    ),
+    # Debugging services
+    MCPService(
+        "profile", "debug_handlers", "handle_profile",
+        SERVICE_PROFILE_SCHEMA, cost=None, capture_slow_calls=False,
+    ),
+)
+
+
+async def _async_resolve_handler(
+    hass: HomeAssistant, service: MCPService
+) -> ServiceHandler:
+    """Import the handler module for a service and return its handler.
+
+    ``async_import_module`` runs the import in the executor the first time and
+    caches the module afterwards, so later calls cost a dict lookup. Releases
+    of Home Assistant without it get the same from ``sys.modules`` and the
+    executor.
+    """
+    name = f"{__package__}.{service.module}"
+    if async_import_module is not None:
+        module = await async_import_module(hass, name)
+    elif (module := sys.modules.get(name)) is None:
+        module = await hass.async_add_executor_job(importlib.import_module, name)
+    return getattr(module, service.handler)
+
+
+def _response_size(result: Any) -> int | None:
+    """Return the serialized size of a service response, if there is one."""
+    if result is None:
+        return None
+    try:
+        return len(json_bytes(result))
+    except TypeError:
+        return None
+
+
+async def _async_save_capture(hass: HomeAssistant, capture: ProfileCapture) -> None:
+    """Write a slow-call profile to the profile directory."""
+    path = await hass.async_add_executor_job(
+        capture.write, Path(hass.config.path(PROFILE_DIR))
+    )
+    _LOGGER.warning(
+        f"Slow {capture.name} call took {capture.duration * 1000:.0f} ms; "
+        f"profile written to {path}"
+    )
+
+
+def _async_finish_capture(
+    hass: HomeAssistant, profiler: Any, token: int | None, error: bool = False
+) -> None:
+    """Stop watching a call and save its profile if it was slow."""
+    if (capture := profiler.end_call(token, error)) is not None:
+        hass.async_create_background_task(
+            _async_save_capture(hass, capture), f"{DOMAIN} save profile"
+        )
+
+
+def _make_service_callback(
+    hass: HomeAssistant, entry_data: dict[str, Any], service: MCPService
+) -> Callable[[ServiceCall], Awaitable[Any]]:
+    """Build the callback registered with Home Assistant for one service.
+
+    Every call is admitted by the entry's ``OperationScheduler`` according to
+    the service's cost class, then timed and recorded in its
+    ``MetricsRegistry``. The loop watchdog attributes event loop stalls to the
+    call while it runs. When slow-call capture is enabled the call is also
+    watched by the profiler.
+    """
+    # Setup created the scheduler, so this import is already loaded.
+    from .scheduler import AdmissionRejected
+
+    handler: ServiceHandler | None = None
+    metrics = entry_data["metrics"]
+    profiler = entry_data["profiler"]
+    scheduler = entry_data["scheduler"]
+    watchdog = entry_data["watchdog"]
+
+    async def _async_handle(call: ServiceCall) -> Any:
+        watched = watchdog.begin_call(service.name, call.data)
+        try:
+            return await _async_handle_watched(call)
+        finally:
+            watchdog.end_call(watched)
+
+    async def _async_handle_watched(call: ServiceCall) -> Any:
+        nonlocal handler
+        token = (
+            profiler.begin_call(service.name, service.handler, call.data)
+            if service.capture_slow_calls
+            else None
+        )
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                handler = await _async_resolve_handler(hass, service)
+            if service.cost is None:
+                result = await handler(hass, entry_data, call)
+            else:
+                async with scheduler.admit(service.cost):
+                    result = await handler(hass, entry_data, call)
+        except AdmissionRejected as err:
+            metrics.record(service.name, time.perf_counter() - start, error=True)
+            _async_finish_capture(hass, profiler, token, error=True)
+            raise HomeAssistantError(str(err)) from err
+        except Exception:
+            metrics.record(service.name, time.perf_counter() - start, error=True)
+            _async_finish_capture(hass, profiler, token, error=True)
+            raise
+        duration = time.perf_counter() - start
+        metrics.record(service.name, duration, response_bytes=_response_size(result))
+        _async_finish_capture(hass, profiler, token)
+        return result
+
+    return _async_handle
+
+
+def async_register_services(hass: HomeAssistant, entry_data: dict[str, Any]) -> None:
+    """Register every service in ``SERVICES``."""
+    for service in SERVICES:
+        hass.services.async_register(
+            DOMAIN,
+            service.name,
+            _make_service_callback(hass, entry_data, service),
+            schema=service.schema,
+        )
+    _LOGGER.debug(f"Registered {len(SERVICES)} services")
+
+
+def async_unregister_services(hass: HomeAssistant) -> None:
+    """Remove every service in ``SERVICES``."""
+    for service in SERVICES:
+        hass.services.async_remove(DOMAIN, service.name)
@@ -0,0 +1,372 @@
+"""Content-addressed snapshot store for configuration files.
+
+Every version of a file is stored once, under the SHA-256 of its content,
+in ``objects/<2 hex>/<62 hex>``. Blobs are compressed with zstd when the
+``zstandard`` package is installed and with zlib otherwise; the codec is
+recorded in each blob, so a store written with one can be read with the
+other available. Large files are stored as line deltas against their
+previous version, up to ``MAX_CHAIN_DEPTH`` deltas deep, whenever the delta
+is substantially smaller than a full copy.
+
+``index.json`` holds the version list of every file and the reference counts
+of every object, so listing, diffing, rolling back and pruning work from the
+index and the objects they touch, and never scan the store. The store does
+blocking file I/O and is meant to be called from a worker thread.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import difflib
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import struct
+import tempfile
+import threading
+import time
+from typing import Any
+import zlib
+
+_LOGGER = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DEFAULT_KEEP_VERSIONS = 20
+DEFAULT_MAX_AGE = 30 * 24 * 3600  # seconds
+DELTA_MIN_SIZE = 64 * 1024
+MAX_CHAIN_DEPTH = 16
+# A delta is only kept if it is at most this fraction of a full blob.
+DELTA_MAX_RATIO = 0.5
+
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+KIND_FULL = b"F"
+KIND_DELTA = b"D"
+
+_OP = struct.Struct("<cII")
+
+
+class SnapshotError(ValueError):
+    """Raised when a version does not exist or the store is damaged."""
+
+
+def _compress(data: bytes) -> bytes:
+    try:
+        import zstandard
+    except ImportError:
+        return CODEC_ZLIB + zlib.compress(data, 6)
+    return CODEC_ZSTD + zstandard.ZstdCompressor(level=10).compress(data)
+
+
+def _decompress(blob: bytes) -> bytes:
+    codec, payload = blob[:1], blob[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_ZSTD:
+        try:
+            import zstandard
+        except ImportError as err:
+            raise SnapshotError(
+                "Snapshot was written with zstd; install zstandard to read it"
+            ) from err
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise SnapshotError(f"Unknown snapshot codec {codec!r}")
+
+
+def make_delta(base: bytes, target: bytes) -> bytes:
+    """Encode ``target`` as line copies from ``base`` plus inserted bytes."""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines)
+    parts = []
+    for tag, base_start, base_end, target_start, target_end in matcher.get_opcodes():
+        if tag == "equal":
+            parts.append(_OP.pack(b"C", base_start, base_end - base_start))
+        elif target_end > target_start:
+            data = b"".join(target_lines[target_start:target_end])
+            parts.append(_OP.pack(b"I", len(data), 0))
+            parts.append(data)
+    return b"".join(parts)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Rebuild the target encoded by ``make_delta``."""
+    base_lines = base.splitlines(keepends=True)
+    out = []
+    position = 0
+    while position < len(delta):
+        op, first, second = _OP.unpack_from(delta, position)
+        position += _OP.size
+        if op == b"C":
+            out.extend(base_lines[first : first + second])
+        elif op == b"I":
+            out.append(delta[position : position + first])
+            position += first
+        else:
+            raise SnapshotError(f"Corrupt delta op {op!r}")
+    return b"".join(out)
+
+
+@dataclass(slots=True)
+class Version:
+    """One recorded version of a file."""
+
+    version: int
+    hash: str
+    size: int
+    created: float
+    source: str
+
+
+@dataclass(slots=True)
+class _Object:
+    """Index entry for one stored blob."""
+
+    refs: int
+    size: int
+    base: str | None = None
+    depth: int = 0
+
+
+class SnapshotStore:
+    """Versioned, deduplicated history of configuration files."""
+
+    def __init__(
+        self,
+        root: Path,
+        keep_versions: int = DEFAULT_KEEP_VERSIONS,
+        max_age: float = DEFAULT_MAX_AGE,
+    ) -> None:
+        """Initialize the store; nothing is read until first use.
+
+        Args:
+            root: Directory holding the index and the objects
+            keep_versions: Versions kept per file
+            max_age: Seconds after which versions are pruned; the latest
+                version of a file is always kept
+        """
+        self.root = root
+        self.keep_versions = keep_versions
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._files: dict[str, list[Version]] | None = None
+        self._objects: dict[str, _Object] = {}
+
+    # Index
+
+    def _load(self) -> dict[str, list[Version]]:
+        """Return the version lists, reading the index on first use.
+
+        A damaged index, or one from an unsupported version, is moved aside
+        and a fresh one is started, so history is lost but writes go on.
+        """
+        if self._files is not None:
+            return self._files
+        path = self.root / "index.json"
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self._files = {}
+            return self._files
+        except (OSError, ValueError) as err:
+            self._discard_index(path, f"cannot be read: {err}")
+            return self._files
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            version = data.get("version") if isinstance(data, dict) else None
+            self._discard_index(path, f"has unsupported version {version}")
+            return self._files
+        try:
+            files = {
+                name: [Version(**version) for version in versions]
+                for name, versions in data["files"].items()
+            }
+            objects = {
+                digest: _Object(**entry) for digest, entry in data["objects"].items()
+            }
+        except (AttributeError, KeyError, TypeError) as err:
+            self._discard_index(path, f"is malformed: {err!r}")
+            return self._files
+        self._files, self._objects = files, objects
+        return self._files
+
+    def _discard_index(self, path: Path, reason: str) -> None:
+        """Move a bad index aside and start with an empty history."""
+        self._files = {}
+        self._objects = {}
+        aside = path.with_name(f"index.json.corrupt-{int(time.time())}")
+        try:
+            os.replace(path, aside)
+        except OSError:
+            aside = None
+        _LOGGER.warning(
+            f"Snapshot index {path} {reason}; starting a new history"
+            + ("" if aside is None else f", the old index was moved to {aside.name}")
+        )
+
+    def _save(self) -> None:
+        assert self._files is not None
+        data = {
+            "version": INDEX_VERSION,
+            "files": {
+                name: [asdict(version) for version in versions]
+                for name, versions in self._files.items()
+            },
+            "objects": {digest: asdict(entry) for digest, entry in self._objects.items()},
+        }
+        self._atomic_write(
+            self.root / "index.json", json.dumps(data, separators=(",", ":")).encode()
+        )
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    # Objects
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest[2:]
+
+    def _read_object(self, digest: str) -> bytes:
+        """Return the content of an object, resolving its delta chain."""
+        chain = []
+        while True:
+            try:
+                blob = self._object_path(digest).read_bytes()
+            except FileNotFoundError as err:
+                raise SnapshotError(f"Snapshot object {digest} is missing") from err
+            if blob[:1] == KIND_FULL:
+                content = _decompress(blob[1:])
+                break
+            chain.append(blob)
+            digest = blob[1:65].decode()
+        for blob in reversed(chain):
+            content = apply_delta(content, _decompress(blob[65:]))
+        return content
+
+    def _store_object(self, digest: str, content: bytes, previous: str | None) -> None:
+        full = KIND_FULL + _compress(content)
+        blob, base, depth = full, None, 0
+        if (
+            previous is not None
+            and len(content) >= DELTA_MIN_SIZE
+            and (previous_entry := self._objects.get(previous)) is not None
+            and previous_entry.depth < MAX_CHAIN_DEPTH
+        ):
+            delta = (
+                KIND_DELTA
+                + previous.encode()
+                + _compress(make_delta(self._read_object(previous), content))
+            )
+            if len(delta) <= len(full) * DELTA_MAX_RATIO:
+                blob, base, depth = delta, previous, previous_entry.depth + 1
+        self._atomic_write(self._object_path(digest), blob)
+        self._objects[digest] = _Object(refs=0, size=len(blob), base=base, depth=depth)
+        if base is not None:
+            self._objects[base].refs += 1
+
+    def _release(self, digest: str) -> None:
+        """Drop one reference; delete the object and walk its chain at zero."""
+        while digest is not None:
+            entry = self._objects[digest]
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            del self._objects[digest]
+            try:
+                self._object_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+            digest = entry.base
+
+    # Public API
+
+    def record(self, filename: str, content: bytes, source: str = "write") -> Version:
+        """Record ``content`` as the latest version of ``filename``.
+
+        Nothing is added when it equals the latest version already recorded.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            files = self._load()
+            versions = files.setdefault(filename, [])
+            if versions and versions[-1].hash == digest:
+                return versions[-1]
+            if digest not in self._objects:
+                self._store_object(
+                    digest, content, versions[-1].hash if versions else None
+                )
+            self._objects[digest].refs += 1
+            version = Version(
+                version=versions[-1].version + 1 if versions else 1,
+                hash=digest,
+                size=len(content),
+                created=time.time(),
+                source=source,
+            )
+            versions.append(version)
+            self._prune(filename)
+            self._save()
+        return version
+
+    def _prune(self, filename: str) -> None:
+        versions = self._files[filename]
+        cutoff = time.time() - self.max_age
+        drop = max(0, len(versions) - self.keep_versions)
+        while drop < len(versions) - 1 and versions[drop].created < cutoff:
+            drop += 1
+        for version in versions[:drop]:
+            self._release(version.hash)
+        del versions[:drop]
+
+    def versions(self, filename: str) -> list[Version]:
+        """Return the recorded versions of ``filename``, oldest first."""
+        with self._lock:
+            return list(self._load().get(filename, ()))
+
+    def latest(self, filename: str) -> Version | None:
+        """Return the latest recorded version of ``filename``."""
+        with self._lock:
+            versions = self._load().get(filename)
+            return versions[-1] if versions else None
+
+    def read(self, filename: str, version: int) -> bytes:
+        """Return the content of one version."""
+        with self._lock:
+            for entry in self._load().get(filename, ()):
+                if entry.version == version:
+                    return self._read_object(entry.hash)
+        raise SnapshotError(f"Version {version} of {filename} not found")
+
+    def diff(self, filename: str, old: int, new: int) -> str:
+        """Return a unified diff between two versions."""
+        before = self.read(filename, old).decode("utf-8", errors="replace")
+        after = self.read(filename, new).decode("utf-8", errors="replace")
+        return "".join(
+            difflib.unified_diff(
+                before.splitlines(keepends=True),
+                after.splitlines(keepends=True),
+                fromfile=f"{filename}@{old}",
+                tofile=f"{filename}@{new}",
+            )
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Return the size of the store."""
+        with self._lock:
+            files = self._load()
+            return {
+                "files": len(files),
+                "versions": sum(len(versions) for versions in files.values()),
+                "objects": len(self._objects),
+                "deltas": sum(1 for entry in self._objects.values() if entry.base),
+                "bytes": sum(entry.size for entry in self._objects.values()),
+            }
@@ -0,0 +1,218 @@
+"""Streaming export of registries and states, with revision-based deltas.
+
+An export is a compressed stream of records: JSON lines, or concatenated
+msgpack objects when the ``msgpack`` package is installed. The stream is
+compressed with zstd when ``zstandard`` is installed and gzip otherwise.
+``SnapshotWriter`` encodes and compresses records as they are handed to it,
+one chunk at a time, so neither the caller nor the writer ever holds the
+whole export in memory. The file is written under a temporary name and
+renamed into place when complete, so readers never see a partial export.
+
+``ChangeLog`` gives deltas their revision numbers. Every area, device and
+entity change bumps a counter and moves the changed record to the end of an
+insertion-ordered dict, so the dict stays sorted by revision. The records
+changed since a revision are then read from the end of the dict, at a cost
+proportional to the size of the delta. Revision tokens carry a random epoch
+drawn at startup. A token from an earlier run, or one older than the oldest
+removal still remembered, cannot be answered as a delta, and the caller
+falls back to a full export.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+import gzip
+import json
+import os
+from pathlib import Path
+import secrets
+import tempfile
+from typing import IO, Any
+
+from .const import FORMAT_JSONL, FORMAT_MSGPACK
+
+EXPORT_VERSION = 1
+DEFAULT_MAX_REMOVED = 10_000
+
+Key = tuple[str, str]
+
+
+class ChangeLog:
+    """Revision numbers for changed and removed records, newest last."""
+
+    def __init__(self, max_removed: int = DEFAULT_MAX_REMOVED) -> None:
+        """Initialize an empty log remembering at most ``max_removed`` removals."""
+        self.epoch = secrets.token_hex(4)
+        self.revision = 0
+        self.max_removed = max_removed
+        self._changed: dict[Key, int] = {}
+        self._removed: dict[Key, int] = {}
+        # The last revision that changed a record of each kind.
+        self._kinds: dict[str, int] = {}
+        # Deltas can only be computed from this revision on.
+        self._floor = 0
+
+    def touch(self, kind: str, key: str) -> None:
+        """Record that ``key`` of ``kind`` was added or changed."""
+        self.revision += 1
+        item = (kind, key)
+        self._removed.pop(item, None)
+        self._changed.pop(item, None)
+        self._changed[item] = self.revision
+        self._kinds[kind] = self.revision
+
+    def remove(self, kind: str, key: str) -> None:
+        """Record that ``key`` of ``kind`` was removed."""
+        item = (kind, key)
+        if self._changed.pop(item, None) is None and item in self._removed:
+            return
+        self.revision += 1
+        self._removed.pop(item, None)
+        self._removed[item] = self.revision
+        self._kinds[kind] = self.revision
+        if len(self._removed) > self.max_removed:
+            oldest = next(iter(self._removed))
+            self._floor = self._removed.pop(oldest)
+
+    def token(self) -> str:
+        """Return the current revision as a token for a later delta."""
+        return f"{self.epoch}-{self.revision}"
+
+    def kind_token(self, kind: str) -> str:
+        """Return a token that changes only when a record of ``kind`` does."""
+        return f"{self.epoch}-{self._kinds.get(kind, 0)}"
+
+    def since(self, token: str) -> int | None:
+        """Return the revision of ``token``, or ``None`` if no delta is possible."""
+        epoch, _, revision = token.partition("-")
+        if epoch != self.epoch or not revision.isdigit():
+            return None
+        number = int(revision)
+        if number < self._floor or number > self.revision:
+            return None
+        return number
+
+    def changed_since(self, revision: int) -> list[Key]:
+        """Return the records changed after ``revision``, oldest change first."""
+        return _newer(self._changed, revision)
+
+    def removed_since(self, revision: int) -> list[Key]:
+        """Return the records removed after ``revision``, oldest removal first."""
+        return _newer(self._removed, revision)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return change log statistics."""
+        return {
+            "revision": self.token(),
+            "tracked": len(self._changed),
+            "removed": len(self._removed),
+        }
+
+
+def _newer(items: dict[Key, int], revision: int) -> list[Key]:
+    newer = []
+    for item in reversed(items):
+        if items[item] <= revision:
+            break
+        newer.append(item)
+    newer.reverse()
+    return newer
+
+
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def export_filename(fmt: str, delta: bool) -> str:
+    """Return the file name of an export in ``fmt``."""
+    compression = "zst" if _zstandard() is not None else "gz"
+    return f"snapshot{'-delta' if delta else ''}.{fmt}.{compression}"
+
+
+class SnapshotWriter:
+    """Encode, compress and write export records as they arrive.
+
+    The writer blocks and is meant to be used from a worker thread.
+    """
+
+    def __init__(
+        self, path: Path, fmt: str = FORMAT_JSONL, default: Callable[[Any], Any] | None = None
+    ) -> None:
+        """Open a temporary file next to ``path``.
+
+        Args:
+            path: Final location of the export
+            fmt: ``jsonl`` or ``msgpack``
+            default: Converts objects the encoder cannot serialize
+
+        Raises:
+            ValueError: If ``fmt`` is unknown or its package is missing
+        """
+        if fmt == FORMAT_MSGPACK:
+            try:
+                import msgpack
+            except ImportError as err:
+                raise ValueError("The msgpack format needs the msgpack package") from err
+            packer = msgpack.Packer(default=default, use_bin_type=True)
+            self._encode: Callable[[Any], bytes] = packer.pack
+        elif fmt == FORMAT_JSONL:
+            encoder = json.JSONEncoder(
+                default=default, ensure_ascii=False, separators=(",", ":")
+            )
+            self._encode = lambda record: (encoder.encode(record) + "\n").encode()
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+        zstandard = _zstandard() if path.suffix == ".zst" else None
+        if path.suffix == ".zst" and zstandard is None:
+            raise ValueError("zstd exports need the zstandard package")
+        self.path = path
+        self.records = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._temp = tempfile.mkstemp(dir=path.parent, prefix=".tmp")
+        self._raw = os.fdopen(fd, "wb")
+        self._stream: IO[bytes] = (
+            zstandard.ZstdCompressor(level=3).stream_writer(self._raw, closefd=False)
+            if zstandard is not None
+            else gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        )
+
+    def write(self, records: Iterable[dict[str, Any]]) -> None:
+        """Encode and write a chunk of records."""
+        encoded = [self._encode(record) for record in records]
+        self._stream.write(b"".join(encoded))
+        self.records += len(encoded)
+
+    def close(self) -> int:
+        """Finish the stream, move it into place and return its size in bytes."""
+        self._stream.close()
+        self._raw.close()
+        os.replace(self._temp, self.path)
+        return self.path.stat().st_size
+
+    def abort(self) -> None:
+        """Discard a partly written export."""
+        self._stream.close()
+        self._raw.close()
+        os.unlink(self._temp)
+
+
+def read_snapshot(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the records of an export written by ``SnapshotWriter``."""
+    if path.suffix == ".zst":
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise ValueError("Export was written with zstd; install zstandard to read it")
+        stream: IO[bytes] = zstandard.ZstdDecompressor().stream_reader(path.open("rb"))
+    else:
+        stream = gzip.open(path, "rb")
+    with stream:
+        if path.name.endswith(f".{FORMAT_MSGPACK}{path.suffix}"):
+            import msgpack
+
+            yield from msgpack.Unpacker(stream, raw=False)
+            return
+        for line in stream:
+            yield json.loads(line)
@@ -0,0 +1,162 @@
+"""LRU cache of compiled templates and batch rendering.
+
+Compiling a Jinja template costs far more than rendering it. Agents tend to
+render the same few templates again and again, such as
+``{{ states('sensor.x') | float * 2 }}``. The cache keys compiled templates by
+their source text, so each distinct template is compiled once and reused
+until it becomes the least recently used entry and is evicted.
+
+``render_batch`` renders a list of templates in one synchronous pass:
+- the pass never yields to the event loop, so every template reads the same
+  snapshot of the state machine
+- a source that appears more than once in a batch is rendered once and its
+  result shared
+- each template's compile and render times are reported, so expensive
+  templates stand out
+
+This module does not depend on Home Assistant. The caller supplies the
+``compile`` and ``render`` functions.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+import time
+from typing import Any, Generic, TypeVar
+
+_TemplateT = TypeVar("_TemplateT")
+
+DEFAULT_MAX_TEMPLATES = 256
+
+
+@dataclass(frozen=True, slots=True)
+class RenderResult:
+    """The outcome of rendering one template of a batch."""
+
+    template: str
+    result: Any = None
+    error: str | None = None
+    compile_time: float = 0.0
+    render_time: float = 0.0
+    cached: bool = False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the result for a service response, times in milliseconds."""
+        outcome = {"error": self.error} if self.error is not None else {"result": self.result}
+        return {
+            "template": self.template,
+            **outcome,
+            "cached": self.cached,
+            "compile_ms": round(self.compile_time * 1000, 3),
+            "render_ms": round(self.render_time * 1000, 3),
+        }
+
+
+class TemplateCache(Generic[_TemplateT]):
+    """Compiled templates keyed by source, least recently used evicted first."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_TEMPLATES) -> None:
+        """Initialize an empty cache holding at most ``max_size`` templates."""
+        self.max_size = max_size
+        self._templates: OrderedDict[str, _TemplateT] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached templates."""
+        return len(self._templates)
+
+    def __contains__(self, source: object) -> bool:
+        """Return whether ``source`` has a compiled template cached."""
+        return source in self._templates
+
+    def get(
+        self, source: str, compile: Callable[[str], _TemplateT]
+    ) -> tuple[_TemplateT, bool]:
+        """Return the compiled template for ``source`` and whether it was cached.
+
+        Templates that fail to compile are not cached; the error from
+        ``compile`` propagates.
+        """
+        template = self._templates.get(source)
+        if template is not None:
+            self._templates.move_to_end(source)
+            self.hits += 1
+            return template, True
+        self.misses += 1
+        template = compile(source)
+        self._templates[source] = template
+        if len(self._templates) > self.max_size:
+            self._templates.popitem(last=False)
+            self.evictions += 1
+        return template, False
+
+    def clear(self) -> None:
+        """Drop every cached template."""
+        self._templates.clear()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return cache statistics."""
+        return {
+            "templates": len(self._templates),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def render_batch(
+    cache: TemplateCache[_TemplateT],
+    sources: Iterable[str],
+    compile: Callable[[str], _TemplateT],
+    render: Callable[[_TemplateT], Any],
+) -> list[RenderResult]:
+    """Render ``sources`` in order, compiling through ``cache``.
+
+    An exception from ``compile`` or ``render`` fails only its own template.
+    It is reported as that template's error.
+    """
+    rendered: dict[str, RenderResult] = {}
+    results = []
+    for source in sources:
+        result = rendered.get(source)
+        if result is None:
+            result = rendered[source] = _render_one(cache, source, compile, render)
+        results.append(result)
+    return results
+
+
+def _render_one(
+    cache: TemplateCache[_TemplateT],
+    source: str,
+    compile: Callable[[str], _TemplateT],
+    render: Callable[[_TemplateT], Any],
+) -> RenderResult:
+    started = time.perf_counter()
+    try:
+        template, cached = cache.get(source, compile)
+    except Exception as err:  # noqa: BLE001 - reported per template
+        return RenderResult(
+            source, error=str(err), compile_time=time.perf_counter() - started
+        )
+    compiled = time.perf_counter()
+    try:
+        value = render(template)
+    except Exception as err:  # noqa: BLE001 - reported per template
+        return RenderResult(
+            source,
+            error=str(err),
+            compile_time=0.0 if cached else compiled - started,
+            render_time=time.perf_counter() - compiled,
+            cached=cached,
+        )
+    return RenderResult(
+        source,
+        value,
+        compile_time=0.0 if cached else compiled - started,
+        render_time=time.perf_counter() - compiled,
+        cached=cached,
+    )
@@ -0,0 +1,43 @@
+"""Template service handlers for the Home Assistant MCP Server."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers.template import Template
+
+from .template_cache import render_batch
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def handle_render_templates(
+    hass: HomeAssistant, entry_data: dict[str, Any], call: ServiceCall
+) -> dict[str, Any]:
+    """Handle render_templates service call.
+
+    Templates are compiled through ``entry_data["templates"]``, and the whole
+    batch is rendered without yielding to the event loop.
+    """
+    variables = call.data.get("variables") or {}
+
+    def compile_template(source: str) -> Template:
+        template = Template(source, hass)
+        template.ensure_valid()
+        return template
+
+    def render(template: Template) -> Any:
+        return template.async_render(variables, parse_result=call.data["parse_result"])
+
+    started = time.perf_counter()
+    results = render_batch(
+        entry_data["templates"], call.data["templates"], compile_template, render
+    )
+    elapsed = time.perf_counter() - started
+    _LOGGER.info(f"Rendered {len(results)} templates in {elapsed * 1000:.1f} ms")
+    return {
+        "results": [result.as_dict() for result in results],
+        "total_ms": round(elapsed * 1000, 3),
+    }
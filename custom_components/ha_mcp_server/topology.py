@@ -0,0 +1,211 @@
+"""In-memory area/device/entity graph.
+
+``TopologyGraph`` keeps the membership edges between areas, devices and
+entities together with the few labels needed to describe them, so the whole
+house can be rendered as a tree by walking dictionaries instead of looking
+every id up in the registries.
+
+Entities inherit the area of their device unless they set one of their own.
+In the tree an entity is listed under its device when both end up in the same
+area, and directly under its area otherwise. Devices without an area and
+entities with neither a device nor an area are reported as unassigned.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+EntityDescriber = Callable[[str], dict[str, Any]]
+
+
+@dataclass(slots=True)
+class DeviceNode:
+    """Labels and placement of one device."""
+
+    name: str | None
+    manufacturer: str | None
+    model: str | None
+    area_id: str | None
+
+
+def _add_member(index: dict[str, set[str]], key: str | None, member: str) -> None:
+    if key is not None:
+        index.setdefault(key, set()).add(member)
+
+
+def _discard_member(index: dict[str, set[str]], key: str | None, member: str) -> None:
+    if key is None:
+        return
+    members = index.get(key)
+    if members is not None:
+        members.discard(member)
+        if not members:
+            del index[key]
+
+
+def _label_key(label: str | None) -> str:
+    return (label or "").casefold()
+
+
+class TopologyGraph:
+    """Incrementally maintained area/device/entity graph."""
+
+    def __init__(self) -> None:
+        """Initialize an empty graph."""
+        self.areas: dict[str, str] = {}
+        self.devices: dict[str, DeviceNode] = {}
+        self.entity_names: dict[str, str | None] = {}
+        self._entity_device: dict[str, str] = {}
+        self._entity_area: dict[str, str] = {}
+        self._device_entities: dict[str, set[str]] = {}
+        self._area_devices: dict[str, set[str]] = {}
+        self._area_entities: dict[str, set[str]] = {}
+        self._loose: set[str] = set()
+
+    def set_area(self, area_id: str, name: str | None) -> None:
+        """Add, rename or (with ``name=None``) remove an area."""
+        if name is None:
+            self.areas.pop(area_id, None)
+        else:
+            self.areas[area_id] = name
+
+    def set_device(self, device_id: str, node: DeviceNode | None) -> None:
+        """Add, update or (with ``node=None``) remove a device."""
+        old = self.devices.get(device_id)
+        old_area = None if old is None else old.area_id
+        new_area = None if node is None else node.area_id
+        if old_area != new_area:
+            _discard_member(self._area_devices, old_area, device_id)
+            _add_member(self._area_devices, new_area, device_id)
+        if node is None:
+            self.devices.pop(device_id, None)
+        else:
+            self.devices[device_id] = node
+
+    def set_entity(
+        self,
+        entity_id: str,
+        name: str | None,
+        device_id: str | None,
+        area_id: str | None,
+    ) -> None:
+        """Add or update an entity and its own device and area."""
+        old_device = self._entity_device.get(entity_id)
+        old_area = self._entity_area.get(entity_id)
+        if device_id != old_device:
+            _discard_member(self._device_entities, old_device, entity_id)
+            _add_member(self._device_entities, device_id, entity_id)
+        if area_id != old_area:
+            _discard_member(self._area_entities, old_area, entity_id)
+            _add_member(self._area_entities, area_id, entity_id)
+        for mapping, value in (
+            (self._entity_device, device_id),
+            (self._entity_area, area_id),
+        ):
+            if value is None:
+                mapping.pop(entity_id, None)
+            else:
+                mapping[entity_id] = value
+        if device_id is None and area_id is None:
+            self._loose.add(entity_id)
+        else:
+            self._loose.discard(entity_id)
+        self.entity_names[entity_id] = name
+
+    def remove_entity(self, entity_id: str) -> None:
+        """Remove an entity from the graph."""
+        self.set_entity(entity_id, None, None, None)
+        self._loose.discard(entity_id)
+        del self.entity_names[entity_id]
+
+    def entity_device(self, entity_id: str) -> str | None:
+        """Return the device of an entity."""
+        return self._entity_device.get(entity_id)
+
+    def entity_area(self, entity_id: str) -> str | None:
+        """Return the effective area of an entity (its own or its device's)."""
+        area_id = self._entity_area.get(entity_id)
+        if area_id is None and (device_id := self._entity_device.get(entity_id)):
+            device = self.devices.get(device_id)
+            area_id = None if device is None else device.area_id
+        return area_id
+
+    def device_entities(self, device_id: str) -> set[str]:
+        """Return the ids of the entities belonging to a device."""
+        return self._device_entities.get(device_id, set())
+
+    def area_entities(self, area_id: str) -> set[str]:
+        """Return the ids of the entities in an area, directly or by device."""
+        entity_ids = set(self._area_entities.get(area_id, ()))
+        for device_id in self._area_devices.get(area_id, ()):
+            for entity_id in self._device_entities.get(device_id, ()):
+                if entity_id not in self._entity_area:
+                    entity_ids.add(entity_id)
+        return entity_ids
+
+    def _device_area(self, entity_id: str) -> str | None:
+        device = self.devices.get(self._entity_device.get(entity_id, ""))
+        return None if device is None else device.area_id
+
+    def device_tree(
+        self, device_id: str, describe: EntityDescriber, area_id: str | None
+    ) -> dict[str, Any]:
+        """Return a device with the entities it contributes to ``area_id``."""
+        node = self.devices[device_id]
+        entity_ids = sorted(
+            entity_id
+            for entity_id in self._device_entities.get(device_id, ())
+            if self.entity_area(entity_id) == area_id
+        )
+        return {
+            "device_id": device_id,
+            "name": node.name,
+            "manufacturer": node.manufacturer,
+            "model": node.model,
+            "entities": [describe(entity_id) for entity_id in entity_ids],
+        }
+
+    def area_tree(self, area_id: str, describe: EntityDescriber) -> dict[str, Any]:
+        """Return an area with its devices and the entities placed directly in it."""
+        devices = sorted(
+            self._area_devices.get(area_id, ()),
+            key=lambda device_id: _label_key(self.devices[device_id].name),
+        )
+        direct = sorted(
+            entity_id
+            for entity_id in self._area_entities.get(area_id, ())
+            if self._device_area(entity_id) != area_id
+        )
+        return {
+            "area_id": area_id,
+            "name": self.areas.get(area_id),
+            "devices": [
+                self.device_tree(device_id, describe, area_id) for device_id in devices
+            ],
+            "entities": [describe(entity_id) for entity_id in direct],
+        }
+
+    def sorted_areas(self) -> list[str]:
+        """Return the ids of every area with a name or members, by name."""
+        area_ids = (
+            self.areas.keys() | self._area_devices.keys() | self._area_entities.keys()
+        )
+        return sorted(
+            area_ids, key=lambda area_id: _label_key(self.areas.get(area_id))
+        )
+
+    def unassigned_devices(self) -> list[str]:
+        """Return the ids of devices without an area, by name."""
+        return sorted(
+            (
+                device_id
+                for device_id, node in self.devices.items()
+                if node.area_id is None
+            ),
+            key=lambda device_id: _label_key(self.devices[device_id].name),
+        )
+
+    def unassigned_entities(self) -> list[str]:
+        """Return the ids of entities with neither a device nor an area."""
+        return sorted(self._loose)
@@ -0,0 +1,266 @@
+"""Lightweight tracing spans for MCP Server operations.
+
+Spans are only created while the tracer has an exporter. A disabled tracer
+hands out one shared no-op context manager, so instrumented code pays for a
+method call and nothing else. Parent/child relationships follow the running
+task through a context variable, which keeps concurrent operations apart.
+
+Finished spans go to an exporter:
+
+- ``RingBufferExporter`` keeps the most recent spans in memory.
+- ``OTLPFileExporter`` buffers spans and appends them, as OTLP/JSON
+  ``ExportTraceServiceRequest`` lines, to a local file when ``flush`` is
+  called. The file can be loaded by any OTLP-compatible trace viewer. Once
+  it would grow past ``max_bytes`` it is renamed to ``<name>.1``, replacing
+  the previous one, and a new file is started, so the two never hold more
+  than twice that.
+"""
+from __future__ import annotations
+
+from collections import deque
+from contextvars import ContextVar
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Protocol
+
+SERVICE_NAME = "ha_mcp_server"
+DEFAULT_MAX_TRACE_BYTES = 10 * 1024 * 1024
+
+_CURRENT_SPAN: ContextVar[Span | None] = ContextVar("ha_mcp_server_span", default=None)
+
+
+class SpanExporter(Protocol):
+    """Receives finished spans."""
+
+    def export(self, span: Span) -> None:
+        """Accept one finished span."""
+
+    def flush(self) -> None:
+        """Persist buffered spans, if the exporter buffers."""
+
+
+class Span:
+    """One timed phase of an operation."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "_exporter",
+        "_reset_token",
+    )
+
+    def __init__(
+        self, name: str, exporter: SpanExporter, attributes: dict[str, Any]
+    ) -> None:
+        """Initialize a span; it starts when entered."""
+        self.name = name
+        self.attributes = attributes
+        self.error: str | None = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self._exporter = exporter
+        parent = _CURRENT_SPAN.get()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = None
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        self.span_id = os.urandom(8).hex()
+
+    def __enter__(self) -> Span:
+        self._reset_token = _CURRENT_SPAN.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.end_ns = time.time_ns()
+        _CURRENT_SPAN.reset(self._reset_token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self._exporter.export(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        """Duration of the span in milliseconds."""
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a compact JSON-serializable form."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def as_otlp(self) -> dict[str, Any]:
+        """Return the span in OTLP/JSON form."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _NoopSpan:
+    """Shared span used while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Discard the attribute."""
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Creates spans while an exporter is set."""
+
+    __slots__ = ("exporter",)
+
+    def __init__(self, exporter: SpanExporter | None = None) -> None:
+        """Initialize the tracer, disabled unless ``exporter`` is given."""
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether spans are being recorded."""
+        return self.exporter is not None
+
+    def span(self, name: str, **attributes: Any) -> Span | _NoopSpan:
+        """Return a context manager timing one phase."""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return Span(name, self.exporter, attributes)
+
+
+class RingBufferExporter:
+    """Keeps the most recent spans in memory."""
+
+    def __init__(self, maxlen: int = 2048) -> None:
+        """Initialize the buffer."""
+        self._spans: deque[Span] = deque(maxlen=maxlen)
+
+    def export(self, span: Span) -> None:
+        """Store a finished span, evicting the oldest when full."""
+        self._spans.append(span)
+
+    def flush(self) -> None:
+        """Nothing to persist."""
+
+    def spans(self) -> list[dict[str, Any]]:
+        """Return the buffered spans, oldest first."""
+        return [span.as_dict() for span in self._spans]
+
+
+class OTLPFileExporter:
+    """Appends spans to a local file as OTLP/JSON lines.
+
+    ``export`` only buffers; ``flush`` does the file I/O and is meant to be
+    run off the event loop. At most ``max_pending`` spans are buffered between
+    flushes; older ones are dropped first. A line that would take the file
+    past ``max_bytes`` first rolls it over to ``<name>.1``.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_pending: int = 10_000,
+        max_bytes: int = DEFAULT_MAX_TRACE_BYTES,
+    ) -> None:
+        """Initialize the exporter."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self._pending: deque[Span] = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of spans waiting to be flushed."""
+        return len(self._pending)
+
+    def export(self, span: Span) -> None:
+        """Buffer a finished span."""
+        self._pending.append(span)
+
+    def flush(self) -> None:
+        """Write buffered spans as one ``ExportTraceServiceRequest`` line."""
+        with self._lock:
+            spans = []
+            while self._pending:
+                spans.append(self._pending.popleft().as_otlp())
+            if not spans:
+                return
+            request = {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {
+                                    "key": "service.name",
+                                    "value": {"stringValue": SERVICE_NAME},
+                                }
+                            ]
+                        },
+                        "scopeSpans": [
+                            {"scope": {"name": SERVICE_NAME}, "spans": spans}
+                        ],
+                    }
+                ]
+            }
+            line = (json.dumps(request, separators=(",", ":")) + "\n").encode()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                size = self.path.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if size and size + len(line) > self.max_bytes:
+                os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+            with open(self.path, "ab") as file:
+                file.write(line)
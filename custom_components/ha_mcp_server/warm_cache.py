@@ -0,0 +1,145 @@
+"""Versioned binary cache of derived indexes, kept in ``.storage``.
+
+Indexes such as the config key path index or the entity search tokens can
+all be rebuilt from their sources, but rebuilding them at startup competes
+with the rest of Home Assistant booting. ``WarmCache`` keeps them in one
+file so the next start can begin from them. The file layout is:
+- a header with a magic number, the format version, Python's ``marshal``
+  version and the number of sections
+- one section per index: its name, its own version and a payload encoded
+  with ``marshal`` and compressed with zlib
+
+Nothing is read until a section is first asked for. Each section is decoded
+only when it is asked for, and only if the version the caller expects
+matches the one stored. A damaged file, or one written by a different
+format or ``marshal`` version, reads as empty. The owner of a section checks
+the decoded data against its sources, for example file mtimes or registry
+modification times, and rebuilds only what is stale.
+
+Sections are replaced in memory by ``put`` and written by ``save``. Sections
+nobody touched in this run are written back unchanged, as raw bytes. All
+methods block and are safe to call from any thread.
+"""
+from __future__ import annotations
+
+import logging
+import marshal
+import os
+from pathlib import Path
+import struct
+import tempfile
+import threading
+from typing import Any
+import zlib
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"HAMCPWC\0"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sHHH")
+_SECTION = struct.Struct("<HHI")
+
+
+class WarmCache:
+    """Named, versioned sections of derived data saved in one file."""
+
+    def __init__(self, path: Path | None) -> None:
+        """Initialize the cache; ``None`` keeps everything in memory only."""
+        self.path = path
+        self._sections: dict[str, tuple[int, bytes]] = {}
+        self._loaded = path is None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        except OSError as err:
+            _LOGGER.warning(f"Ignoring unreadable warm cache: {err}")
+            return
+        try:
+            magic, fmt, marshal_version, count = _HEADER.unpack_from(data)
+            if (magic, fmt, marshal_version) != (MAGIC, FORMAT_VERSION, marshal.version):
+                return
+            offset = _HEADER.size
+            sections = {}
+            for _ in range(count):
+                name_size, version, size = _SECTION.unpack_from(data, offset)
+                offset += _SECTION.size
+                name = data[offset : offset + name_size].decode()
+                offset += name_size
+                payload = data[offset : offset + size]
+                if len(payload) != size:
+                    raise ValueError("truncated section")
+                offset += size
+                sections[name] = (version, payload)
+        except (struct.error, UnicodeDecodeError, ValueError) as err:
+            _LOGGER.warning(f"Ignoring damaged warm cache: {err}")
+            return
+        self._sections = sections
+
+    def get(self, name: str, version: int) -> Any | None:
+        """Return the data of section ``name`` if it was saved at ``version``."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            section = self._sections.get(name)
+        if section is None or section[0] != version:
+            return None
+        try:
+            return marshal.loads(zlib.decompress(section[1]))
+        except (EOFError, TypeError, ValueError, zlib.error) as err:
+            _LOGGER.warning(f"Ignoring damaged warm cache section {name}: {err}")
+            return None
+
+    def put(self, name: str, version: int, data: Any) -> None:
+        """Replace section ``name``; it is written by the next ``save``.
+
+        Raises:
+            ValueError: If ``data`` holds types ``marshal`` cannot encode
+        """
+        payload = zlib.compress(marshal.dumps(data), 1)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._sections[name] = (version, payload)
+            self._dirty = True
+
+    def save(self) -> bool:
+        """Write the cache if any section changed; return whether it did."""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return False
+            parts = [
+                _HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, len(self._sections))
+            ]
+            for name, (version, payload) in self._sections.items():
+                encoded = name.encode()
+                parts.append(_SECTION.pack(len(encoded), version, len(payload)))
+                parts.append(encoded)
+                parts.append(payload)
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.writelines(parts)
+            os.replace(temp, self.path)
+        except BaseException:
+            os.unlink(temp)
+            with self._lock:
+                self._dirty = True
+            raise
+        return True
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the size of each loaded section."""
+        with self._lock:
+            return {
+                name: {"version": version, "bytes": len(payload)}
+                for name, (version, payload) in self._sections.items()
+            }
@@ -0,0 +1,292 @@
+"""Event loop lag watchdog that attributes stalls to MCP service calls.
+
+A heartbeat callback is scheduled on the event loop every ``interval``
+seconds and records how late it ran. That is the loop lag, measured for the
+cost of one timer callback per interval. A watcher thread checks the time of
+the last heartbeat. Once it is overdue by more than ``threshold``, the loop
+is stalled, and on every check until the heartbeat runs again the watcher
+samples what the loop thread is doing:
+- the running task, which maps to the service call that began in it
+- the phase, named by the innermost frame on the loop thread's stack that
+  belongs to a known phase, such as a YAML parse, response serialization or
+  a cooperative registry walk
+
+When the heartbeat finally runs, the stall is recorded with the call,
+phase and task sampled most often. Work running in a task of its own, such
+as the index build, has no call and is recorded under its task name.
+
+Stalls are kept in two bounded buffers: the most recent ones and the worst
+ones. Per-service totals are kept for every stall. Call arguments are
+redacted the same way as in slow-call profiles.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+import heapq
+import os
+import sys
+import threading
+import time
+from typing import Any
+
+from .profiler import redact_arguments
+
+DEFAULT_INTERVAL = 0.05
+DEFAULT_THRESHOLD = 0.1
+DEFAULT_CAPACITY = 20
+# Heartbeat lags the rolling lag statistics are computed over.
+LAG_WINDOW = 1200
+
+# Functions that mark a phase wherever they are on the stack.
+PHASE_FUNCTIONS = {
+    "_response_size": "serialization",
+    "json_bytes": "serialization",
+    "parse_content": "parse",
+    "async_build_list": "registry_walk",
+    "async_for_each": "registry_walk",
+    "render_batch": "template_render",
+}
+# Packages whose frames mark a phase.
+PHASE_PACKAGES = {
+    "yaml": "yaml_parse",
+    "json": "serialization",
+    "jinja2": "template_render",
+    "voluptuous": "validation",
+}
+_PACKAGE_PATHS = tuple(
+    (f"{os.sep}{package}{os.sep}", phase) for package, phase in PHASE_PACKAGES.items()
+)
+MAX_STACK_DEPTH = 128
+
+
+def frame_phase(frame: Any) -> str | None:
+    """Return the phase of the innermost frame of a known phase, if any."""
+    depth = 0
+    while frame is not None and depth < MAX_STACK_DEPTH:
+        code = frame.f_code
+        if (phase := PHASE_FUNCTIONS.get(code.co_name)) is not None:
+            return phase
+        for path, phase in _PACKAGE_PATHS:
+            if path in code.co_filename:
+                return phase
+        frame = frame.f_back
+        depth += 1
+    return None
+
+
+@dataclass(eq=False, slots=True)
+class WatchedCall:
+    """A service call the watchdog can attribute stalls to.
+
+    Calls compare by identity, so that samples count each call separately.
+    """
+
+    service: str
+    arguments: dict[str, Any]
+
+
+@dataclass(frozen=True, slots=True, order=True)
+class Stall:
+    """One period in which the event loop did not run its heartbeat."""
+
+    duration: float
+    at: float = field(compare=False)
+    service: str | None = field(compare=False)
+    phase: str | None = field(compare=False)
+    task: str | None = field(compare=False)
+    arguments: dict[str, Any] | None = field(compare=False)
+    samples: int = field(compare=False)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stall as a JSON-friendly dict."""
+        return {
+            "at": self.at,
+            "duration_ms": round(self.duration * 1000, 1),
+            "service": self.service,
+            "phase": self.phase,
+            "task": self.task,
+            "arguments": self.arguments,
+            "samples": self.samples,
+        }
+
+
+class LoopWatchdog:
+    """Measures event loop lag and records who caused each stall."""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        threshold: float = DEFAULT_THRESHOLD,
+        capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        """Initialize the watchdog; nothing runs until ``start``.
+
+        Args:
+            interval: Seconds between two heartbeats
+            threshold: Lag from which a late heartbeat counts as a stall
+            capacity: Stalls kept in each of the recent and worst buffers
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.capacity = capacity
+        self.stalls = 0
+        self.recent: deque[Stall] = deque(maxlen=capacity)
+        self._worst: list[Stall] = []
+        self._by_service: dict[str, list[float]] = {}
+        self._lags: deque[float] = deque(maxlen=LAG_WINDOW)
+        self._calls: dict[asyncio.Task[Any], WatchedCall] = {}
+        self._samples: Counter[tuple[WatchedCall | None, str | None, str | None]] = (
+            Counter()
+        )
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread = 0
+        self._handle: asyncio.TimerHandle | None = None
+        self._expected = 0.0
+        self._last_beat = 0.0
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the heartbeat and the watcher thread; call from the loop."""
+        if self._handle is not None:
+            return
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._expected = loop.time() + self.interval
+        self._handle = loop.call_at(self._expected, self._beat)
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="ha_mcp_server_watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the heartbeat; the watcher thread exits on its next check."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stopping.set()
+        self._thread = None
+
+    def begin_call(self, service: str, arguments: Mapping[str, Any]) -> Any:
+        """Attribute stalls in the current task to a call; call from the loop.
+
+        Returns a token for ``end_call``.
+        """
+        task = asyncio.current_task()
+        if task is not None:
+            self._calls[task] = WatchedCall(service, redact_arguments(arguments))
+        return task
+
+    def end_call(self, token: Any) -> None:
+        """Stop attributing stalls to the call ``token`` was returned for."""
+        if token is not None:
+            self._calls.pop(token, None)
+
+    def _beat(self) -> None:
+        loop = self._loop
+        now = loop.time()
+        lag = max(0.0, now - self._expected)
+        self._last_beat = time.monotonic()
+        self._expected = now + self.interval
+        self._handle = loop.call_at(self._expected, self._beat)
+        self._lags.append(lag)
+        if lag >= self.threshold:
+            self._record(lag)
+        elif self._samples:
+            with self._lock:
+                self._samples.clear()
+
+    def _record(self, lag: float) -> None:
+        with self._lock:
+            samples, self._samples = self._samples, Counter()
+        call = phase = task = None
+        if samples:
+            (call, phase, task), _ = samples.most_common(1)[0]
+        stall = Stall(
+            duration=lag,
+            at=time.time() - lag,
+            service=None if call is None else call.service,
+            phase=phase,
+            task=task,
+            arguments=None if call is None else call.arguments,
+            samples=sum(samples.values()),
+        )
+        self.stalls += 1
+        self.recent.append(stall)
+        if len(self._worst) < self.capacity:
+            heapq.heappush(self._worst, stall)
+        else:
+            heapq.heappushpop(self._worst, stall)
+        name = stall.service or task or "unknown"
+        totals = self._by_service.setdefault(name, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += lag
+        totals[2] = max(totals[2], lag)
+
+    def _watch(self) -> None:
+        # Check twice per interval so that short stalls still get a sample.
+        period = self.interval / 2
+        while not self._stopping.wait(period):
+            if time.monotonic() - self._last_beat > self.interval + self.threshold:
+                self._sample()
+
+    def _sample(self) -> None:
+        """Record what the loop thread is running; called from the watcher."""
+        frame = sys._current_frames().get(self._loop_thread)  # pylint: disable=protected-access
+        # A stalled loop does not switch tasks, so reading its current task
+        # from this thread is safe.
+        task = asyncio.current_task(self._loop)
+        call = None if task is None else self._calls.get(task)
+        key = (
+            call,
+            frame_phase(frame) or ("handler" if call is not None else None),
+            None if task is None else task.get_name(),
+        )
+        del frame
+        with self._lock:
+            self._samples[key] += 1
+
+    def lag_ms(self, quantile: float = 1.0) -> float | None:
+        """Return a quantile of the recent heartbeat lags in milliseconds."""
+        if not self._lags:
+            return None
+        ordered = sorted(self._lags)
+        position = min(len(ordered) - 1, int(len(ordered) * quantile))
+        return round(ordered[position] * 1000, 1)
+
+    def worst(self) -> list[Stall]:
+        """Return the longest stalls recorded, longest first."""
+        return sorted(self._worst, reverse=True)
+
+    def by_service(self) -> dict[str, dict[str, Any]]:
+        """Return stall counts and times per service, or per task."""
+        return {
+            name: {
+                "stalls": count,
+                "total_ms": round(total * 1000, 1),
+                "max_ms": round(longest * 1000, 1),
+            }
+            for name, (count, total, longest) in sorted(
+                self._by_service.items(), key=lambda item: -item[1][1]
+            )
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return lag statistics, the stall buffers and per-service totals."""
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag_p50_ms": self.lag_ms(0.5),
+            "lag_p99_ms": self.lag_ms(0.99),
+            "lag_max_ms": self.lag_ms(),
+            "stalls": self.stalls,
+            "by_service": self.by_service(),
+            "worst": [stall.as_dict() for stall in self.worst()],
+            "recent": [stall.as_dict() for stall in reversed(self.recent)],
+        }
@@ -0,0 +1,22 @@
+"""Helpers shared by the tests."""
+import importlib
+from pathlib import Path
+import sys
+import types
+
+COMPONENT_DIR = Path(__file__).parent.parent / "custom_components" / "ha_mcp_server"
+PACKAGE = "ha_mcp_server"
+
+
+def load_component_module(name: str) -> types.ModuleType:
+    """Import an integration module without running the package ``__init__``.
+
+    The integration's ``__init__`` needs Home Assistant. Modules that do not
+    can still be imported, together with their relative imports, by giving
+    them a bare package to live in.
+    """
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [str(COMPONENT_DIR)]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
@@ -0,0 +1,146 @@
+"""Test the cross-file configuration index."""
+import os
+
+import pytest
+
+from tests.common import load_component_module
+
+config_index = load_component_module("config_index")
+warm_cache = load_component_module("warm_cache")
+
+CONFIGURATION = """\
+homeassistant:
+  name: Home
+recorder:
+  purge_keep_days: 7
+  exclude:
+    entities:
+      - sensor.noisy
+automation: !include automations.yaml
+"""
+
+AUTOMATIONS = """\
+- alias: Kitchen lights
+  trigger:
+    - platform: state
+      entity_id: binary_sensor.kitchen_motion
+  condition: "{{ is_state('sun.sun', 'below_horizon') }}"
+  action:
+    - service: light.turn_on
+      target:
+        entity_id: light.kitchen
+    - service: notify.notify
+      data:
+        message: >
+          Motion in the kitchen,
+          lamp is {{ states('light.kitchen') }}
+"""
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    """Return a small config dir."""
+    (tmp_path / "configuration.yaml").write_text(CONFIGURATION)
+    (tmp_path / "automations.yaml").write_text(AUTOMATIONS)
+    (tmp_path / ".storage").mkdir()
+    (tmp_path / ".storage" / "core.yaml").write_text("ignored: true\n")
+    return tmp_path
+
+
+def test_scan_yaml_lines():
+    """Test key paths and entity references with their lines."""
+    keys, entities = config_index.scan_yaml(AUTOMATIONS)
+    assert ("trigger.platform", 3) in keys
+    assert ("action.target.entity_id", 9) in keys
+    assert entities == [
+        ("binary_sensor.kitchen_motion", 4),
+        ("sun.sun", 5),
+        ("light.turn_on", 7),
+        ("light.kitchen", 9),
+        ("notify.notify", 10),
+        ("light.kitchen", 13),
+    ]
+    _, entities = config_index.scan_yaml("a: |\n  x\n  {{ states('sun.sun') }}\n")
+    assert entities == [("sun.sun", 3)]
+    _, entities = config_index.scan_yaml(
+        "a: automations.yaml\nb: 1.5\nc: states.sensor.x\nd: value.split('.')\n"
+    )
+    assert entities == []
+
+
+def test_find_keys_and_entities(config_dir):
+    """Test exact, suffix and glob key lookups and entity lookups."""
+    index = config_index.ConfigIndex(config_dir)
+    assert index.refresh() == (2, 0)
+    assert index.find_key("recorder.purge_keep_days") == [
+        {"file": "configuration.yaml", "line": 4, "key": "recorder.purge_keep_days"}
+    ]
+    assert index.find_key("purge_keep_days") == index.find_key("*.purge_keep_days")
+    assert [match["file"] for match in index.find_entity("light.kitchen")] == [
+        "automations.yaml",
+        "automations.yaml",
+    ]
+    assert index.find_entity("sensor.noisy")[0]["line"] == 7
+    assert index.find_key("ignored") == []
+
+
+def test_refresh_is_incremental_and_persistent(config_dir, monkeypatch):
+    """Test that only changed files are re-parsed, across restarts too."""
+    storage = config_dir / ".storage" / "warm"
+    index = config_index.ConfigIndex(config_dir, warm_cache.WarmCache(storage))
+    index.refresh()
+    assert index.refresh() == (0, 0)
+
+    automations = config_dir / "automations.yaml"
+    automations.write_text("- alias: Other\n  action:\n    - service: light.toggle\n")
+    stat = automations.stat()
+    os.utime(automations, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    (config_dir / "configuration.yaml").unlink()
+    (config_dir / "broken.yaml").write_text("a: [\n")
+    assert index.refresh() == (2, 1)
+    assert index.find_entity("light.kitchen") == []
+    assert index.find_key("recorder") == []
+    assert index.as_dict()["errors"] == ["broken.yaml"]
+    assert index.cache.save()
+
+    parsed = []
+    monkeypatch.setattr(
+        config_index, "scan_yaml", lambda text: parsed.append(text) or ([], [])
+    )
+    reloaded = config_index.ConfigIndex(config_dir, warm_cache.WarmCache(storage))
+    assert reloaded.find(entity_id="light.toggle") == {
+        "entities": [{"file": "automations.yaml", "line": 3, "entity_id": "light.toggle"}]
+    }
+    assert parsed == []
+
+
+def test_skipped_dirs_and_refresh_interval(config_dir, monkeypatch):
+    """Test that non-config dirs are pruned and queries reuse a fresh index."""
+    for name in ("custom_components/demo", "www", "blueprints/automation"):
+        (config_dir / name).mkdir(parents=True)
+        (config_dir / name / "x.yaml").write_text("light.hidden: 1\n")
+    (config_dir / "packages" / "www").mkdir(parents=True)
+    (config_dir / "packages" / "www" / "p.yaml").write_text("sensor.kept: 1\n")
+    index = config_index.ConfigIndex(config_dir)
+    assert index.find(entity_id="light.hidden") == {"entities": []}
+    assert sorted(index.files) == [
+        "automations.yaml",
+        "configuration.yaml",
+        "packages/www/p.yaml",
+    ]
+
+    walks = []
+    walk = index._walk
+    monkeypatch.setattr(index, "_walk", lambda: walks.append(1) or walk())
+    index.find(key="recorder")
+    assert walks == []
+    index.invalidate()
+    index.find(key="recorder")
+    assert walks == [1]
+    index.refresh_interval = 0
+    index.find(key="recorder")
+    assert walks == [1, 1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,187 @@
+"""Test off-loop configuration validation."""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
+
+import pytest
+
+from tests.common import load_component_module
+
+config_validation = load_component_module("config_validation")
+mcp_server = load_component_module("mcp_server")
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    """Return a config dir with includes and secrets."""
+    (tmp_path / "secrets.yaml").write_text("api_key: abc\n")
+    (tmp_path / "packages").mkdir()
+    (tmp_path / "packages" / "lights.yaml").write_text("light:\n  - platform: demo\n")
+    (tmp_path / "automations.yaml").write_text(
+        "- alias: Wake\n  trigger: []\n  action: []\n"
+    )
+    (tmp_path / "scripts.yaml").write_text("")
+    return tmp_path
+
+
+def messages(issues):
+    """Return ``line: message`` for each issue."""
+    return [f"{issue.file}:{issue.line}: {issue.message}" for issue in issues]
+
+
+def test_valid_config_with_includes(config_dir):
+    """Test that includes, directories, secrets and env vars resolve."""
+    issues, stamps = config_validation.check_config_text(
+        str(config_dir),
+        "configuration.yaml",
+        "homeassistant:\n  name: Home\n  latitude: 51.5\n"
+        "automation: !include automations.yaml\n"
+        "homeassistant_packages: !include_dir_named packages\n"
+        "weather:\n  api_key: !secret api_key\n  region: !env_var REGION\n",
+    )
+    assert issues == []
+    stamped = {os.path.basename(path) for path, _, _ in stamps}
+    assert stamped == {"automations.yaml", "packages", "lights.yaml", "secrets.yaml"}
+
+
+def test_reports_errors_with_locations(config_dir):
+    """Test syntax errors, missing includes and secrets, and duplicates."""
+    issues, _ = config_validation.check_config_text(
+        str(config_dir),
+        "configuration.yaml",
+        "sensor: !include missing.yaml\n"
+        "weather:\n  api_key: !secret nope\n"
+        "sensor: []\n",
+    )
+    assert messages(issues) == [
+        "configuration.yaml:1: Included file missing.yaml not found",
+        "configuration.yaml:3: Secret 'nope' is not defined in secrets.yaml",
+        "configuration.yaml:4: Duplicate key 'sensor'",
+    ]
+
+    issues, _ = config_validation.check_config_text(
+        str(config_dir), "configuration.yaml", "automation: !include broken.yaml\n"
+    )
+    assert messages(issues) == ["configuration.yaml:1: Included file broken.yaml not found"]
+    (config_dir / "broken.yaml").write_text("- alias: x\n  trigger: [\n")
+    issues, _ = config_validation.check_config_text(
+        str(config_dir), "configuration.yaml", "automation: !include broken.yaml\n"
+    )
+    assert [issue.file for issue in issues] == ["broken.yaml"]
+    assert issues[0].line == 3
+
+    issues, _ = config_validation.check_config_text(
+        str(config_dir), "settings.json", '{"a": 1,}'
+    )
+    assert (issues[0].line, issues[0].column) == (1, 9)
+
+
+def test_includes_stay_in_the_config_dir(config_dir, tmp_path_factory):
+    """Test that includes leaving the config dir are reported, not read."""
+    outside = tmp_path_factory.mktemp("outside")
+    (outside / "leak.yaml").write_text("password: hunter2\n")
+    (config_dir / "link.yaml").symlink_to(outside / "leak.yaml")
+    issues, stamps = config_validation.check_config_text(
+        str(config_dir),
+        "configuration.yaml",
+        f"a: !include ../{outside.name}/leak.yaml\n"
+        f"b: !include {outside / 'leak.yaml'}\n"
+        "c: !include link.yaml\n"
+        f"d: !include_dir_list ../{outside.name}\n",
+    )
+    assert messages(issues) == [
+        f"configuration.yaml:1: Included path ../{outside.name}/leak.yaml is "
+        "outside the configuration directory",
+        f"configuration.yaml:2: Included path {outside / 'leak.yaml'} is "
+        "outside the configuration directory",
+        "configuration.yaml:3: Included path link.yaml is outside the "
+        "configuration directory",
+        f"configuration.yaml:4: Included path ../{outside.name} is outside the "
+        "configuration directory",
+    ]
+    assert stamps == []
+
+
+def test_schema_checks(config_dir):
+    """Test the structural checks for files with a fixed shape."""
+    issues, _ = config_validation.check_config_text(
+        str(config_dir),
+        "automations.yaml",
+        "- alias: Wake\n  trigger: []\n- alias: Sleep\n  actions: []\n- 3\n",
+    )
+    assert [issue.message for issue in issues] == [
+        "Automation 'Wake' has no actions",
+        "Automation 'Sleep' has no triggers",
+        "Automation 3 is not a mapping",
+    ]
+    issues, _ = config_validation.check_config_text(
+        str(config_dir), "scripts.yaml", "morning:\n  alias: Morning\n"
+    )
+    assert [issue.message for issue in issues] == ["Script 'morning' has no sequence"]
+    issues, _ = config_validation.check_config_text(
+        str(config_dir), "scripts.yaml", ""
+    )
+    assert issues == []
+
+
+@pytest.mark.asyncio
+async def test_validator_caches_until_includes_change(config_dir):
+    """Test that results are reused until a file the check read changes."""
+    with ThreadPoolExecutor(1) as executor:
+        validator = config_validation.ConfigValidator(executor)
+        text = "automation: !include automations.yaml\n"
+        assert await validator.validate(config_dir, "configuration.yaml", text) == []
+        assert await validator.validate(config_dir, "configuration.yaml", text) == []
+        assert (validator.hits, validator.misses) == (1, 1)
+
+        (config_dir / "automations.yaml").write_text("- alias: [Wake\n")
+        issues = await validator.validate(config_dir, "configuration.yaml", text)
+        assert [issue.file for issue in issues] == ["automations.yaml"]
+        assert validator.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_validator_runs_in_a_process(config_dir):
+    """Test that the check and its results cross a process boundary."""
+    executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("fork"))
+    validator = config_validation.ConfigValidator(executor)
+    try:
+        issues = await validator.validate(
+            config_dir, "configuration.yaml", "a: !secret missing\n"
+        )
+    finally:
+        executor.shutdown()
+    assert messages(issues) == [
+        "configuration.yaml:1: Secret 'missing' is not defined in secrets.yaml"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_server_refuses_invalid_writes(config_dir):
+    """Test that validated writes leave the file untouched on errors."""
+    with ThreadPoolExecutor(1) as executor:
+        server = mcp_server.MCPConfigServer(
+            str(config_dir), validator=config_validation.ConfigValidator(executor)
+        )
+        with pytest.raises(config_validation.ConfigValidationError) as err:
+            await server.write_config_file(
+                "automations.yaml", "- alias: Broken\n", validate=True
+            )
+        assert "has no triggers" in str(err.value)
+        assert len(err.value.issues) == 2
+        assert "Wake" in (config_dir / "automations.yaml").read_text()
+
+        # Validation is off by default, then follows validate_writes.
+        await server.set_config_value("scripts.yaml", "morning.alias", "Morning")
+        server.validate_writes = True
+        with pytest.raises(ValueError):
+            await server.set_config_value("scripts.yaml", "evening.alias", "Evening")
+        assert await server.validate_config_file("scripts.yaml") == [
+            config_validation.ValidationIssue(
+                "scripts.yaml", None, None, "Script 'morning' has no sequence"
+            )
+        ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
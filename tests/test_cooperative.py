@@ -0,0 +1,89 @@
+"""Test cooperative list building."""
+import asyncio
+import time
+
+import pytest
+
+from tests.common import load_component_module
+
+cooperative = load_component_module("cooperative")
+
+
+@pytest.mark.asyncio
+async def test_build_list_filters_and_maps():
+    """Test that the builder maps items and drops ``None`` results."""
+    result = await cooperative.async_build_list(
+        range(10), lambda value: value * 2 if value % 2 else None
+    )
+    assert result == [2, 6, 10, 14, 18]
+
+
+@pytest.mark.asyncio
+async def test_build_list_yields_within_budget():
+    """Test that no slice blocks the loop much longer than the budget."""
+    budget = 0.002
+
+    def slow_build(value):
+        deadline = time.perf_counter() + 0.00002
+        while time.perf_counter() < deadline:
+            pass
+        return value
+
+    gaps = []
+    done = asyncio.Event()
+
+    async def probe():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0)
+    result = await cooperative.async_build_list(range(5000), slow_build, budget)
+    done.set()
+    await probe_task
+
+    assert result == list(range(5000))
+    assert len(gaps) > 10
+    # One check interval of slack on top of the budget.
+    assert max(gaps) < budget + cooperative.CHECK_EVERY * 0.00002 + 0.005
+
+
+@pytest.mark.asyncio
+async def test_build_list_uses_snapshot():
+    """Test that mutating the source while suspended is harmless."""
+    source = {index: index for index in range(2000)}
+
+    def build(value):
+        time.sleep(0.00001)
+        return value
+
+    async def mutate():
+        await asyncio.sleep(0)
+        source.clear()
+
+    task = asyncio.create_task(mutate())
+    result = await cooperative.async_build_list(source.values(), build, 0.0005)
+    await task
+    assert len(result) == 2000
+
+
+@pytest.mark.asyncio
+async def test_for_each_visits_snapshot():
+    """Test that every item is visited even if the source changes meanwhile."""
+    source = {number: None for number in range(200)}
+    seen = []
+
+    def visit(number):
+        seen.append(number)
+        source.pop(number + 1, None)
+
+    await cooperative.async_for_each(source, visit, budget=0)
+    assert seen == list(range(200))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,187 @@
+"""Test the HA data access service handlers."""
+from datetime import timedelta
+import sys
+import time
+from types import ModuleType, SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from tests.common import load_component_module  # noqa: E402
+
+# Importing homeassistant.core replaces time.sleep with a version that fails
+# on the event loop; other tests stall the loop on purpose.
+_sleep = time.sleep
+data_handlers = load_component_module("data_handlers")
+time.sleep = _sleep
+history_cache = load_component_module("history_cache")
+topology = load_component_module("topology")
+
+DEVICE_ID = "device_1"
+
+
+def _entity(entity_id, device_id=DEVICE_ID, disabled_by=None):
+    return SimpleNamespace(
+        entity_id=entity_id,
+        name=None,
+        original_name=entity_id,
+        platform="hue",
+        domain=entity_id.split(".")[0],
+        device_id=device_id,
+        area_id=None,
+        disabled_by=disabled_by,
+        unique_id=entity_id,
+        capabilities=None,
+        supported_features=0,
+        device_class=None,
+        unit_of_measurement=None,
+    )
+
+
+ENTITIES = {
+    entity.entity_id: entity
+    for entity in (
+        _entity("light.lamp"),
+        _entity("sensor.lamp_power", disabled_by="user"),
+        _entity("light.other", device_id="device_2"),
+    )
+}
+
+
+class FakeIndex:
+    """Index stand-in that fails the test if it is built."""
+
+    def __init__(self, ready):
+        self.ready = ready
+        self.graph = topology.TopologyGraph()
+        for entity in ENTITIES.values():
+            self.graph.set_entity(entity.entity_id, None, entity.device_id, None)
+
+    async def async_ensure_ready(self, budget):
+        raise AssertionError("get_device must not build the index")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ready", [False, True])
+async def test_get_device_joins_entities_without_building_the_index(ready):
+    """Test that the device join is the same from the registry and the index."""
+    device = SimpleNamespace(
+        id=DEVICE_ID,
+        name="Lamp",
+        name_by_user=None,
+        manufacturer="Signify",
+        model="LCT001",
+        sw_version=None,
+        hw_version=None,
+        identifiers=set(),
+        connections=set(),
+        config_entries={"entry_1"},
+        area_id=None,
+        disabled_by=None,
+    )
+    device_registry = MagicMock()
+    device_registry.async_get.return_value = device
+    entity_registry = MagicMock()
+    entity_registry.async_get.side_effect = ENTITIES.get
+    hass = MagicMock()
+    hass.states.get.return_value = None
+    entries_for_device = MagicMock(
+        side_effect=lambda registry, device_id, include_disabled_entities=False: [
+            entity
+            for entity in ENTITIES.values()
+            if entity.device_id == device_id
+            and (include_disabled_entities or entity.disabled_by is None)
+        ]
+    )
+    entry_data = {"index": FakeIndex(ready), "loop_budget": 0.005}
+    call = SimpleNamespace(data={"device_id": DEVICE_ID, "include_entities": True})
+
+    with patch.object(
+        data_handlers.dr, "async_get", return_value=device_registry
+    ), patch.object(
+        data_handlers.er, "async_get", return_value=entity_registry
+    ), patch.object(
+        data_handlers.er, "async_entries_for_device", entries_for_device
+    ):
+        result = await data_handlers.handle_get_device(hass, entry_data, call)
+
+    assert [entity["entity_id"] for entity in result["entities"]] == [
+        "light.lamp",
+        "sensor.lamp_power",
+    ]
+    assert entries_for_device.called is not ready
+
+
+class FakeRecorder:
+    """Recorder instance stand-in that runs its executor jobs inline."""
+
+    def __init__(self):
+        self.queries = []
+
+    async def async_add_executor_job(self, target, *args):
+        return target(*args)
+
+    def state_changes_during_period(self, hass, start_time, end_time, entity_id):
+        self.queries.append((start_time, end_time))
+        changed = start_time + timedelta(minutes=1)
+        state = SimpleNamespace(
+            state="on", attributes={}, last_changed=changed, last_updated=changed
+        )
+        return {entity_id: [state]}
+
+
+@pytest.mark.asyncio
+async def test_entity_history_miss_and_fill():
+    """Test that history is read from the recorder and cached when recent."""
+    import homeassistant.util.dt as dt_util
+
+    # A stand-in recorder package, so the test needs neither the recorder's
+    # database dependencies nor a running instance.
+    recorder = FakeRecorder()
+    recorder_module = ModuleType("homeassistant.components.recorder")
+    recorder_module.get_instance = lambda hass: recorder
+    recorder_module.history = SimpleNamespace(
+        state_changes_during_period=recorder.state_changes_during_period
+    )
+    hass = MagicMock()
+    hass.states.get.return_value = None
+    entry_data = {"history": history_cache.HistoryCache()}
+    now = dt_util.utcnow()
+
+    def call(start, end):
+        return SimpleNamespace(
+            data={
+                "entity_id": "light.lamp",
+                "start_time": start.isoformat(),
+                "end_time": end.isoformat(),
+            }
+        )
+
+    with patch.dict(sys.modules, {recorder_module.__name__: recorder_module}):
+        # Older than the cache keeps: a plain miss for exactly the window.
+        old = now - timedelta(days=3)
+        result = await data_handlers.handle_get_entity_history(
+            hass, entry_data, call(old, old + timedelta(hours=1))
+        )
+        assert len(result["history"]) == 1
+        assert recorder.queries[-1][1] is not None
+        assert "light.lamp" not in entry_data["history"]
+
+        # Recent: the cache is filled up to now, then answers without a query.
+        recent = now - timedelta(hours=2)
+        result = await data_handlers.handle_get_entity_history(
+            hass, entry_data, call(recent, now)
+        )
+        assert len(result["history"]) == 1
+        assert recorder.queries[-1] == (recent, None)
+        assert "light.lamp" in entry_data["history"]
+        await data_handlers.handle_get_entity_history(
+            hass, entry_data, call(recent + timedelta(minutes=5), now)
+        )
+        assert len(recorder.queries) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
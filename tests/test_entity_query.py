@@ -0,0 +1,165 @@
+"""Test the entity query language and planner."""
+import pytest
+
+from tests.common import load_component_module
+
+entity_query = load_component_module("entity_query")
+Predicate = entity_query.Predicate
+
+
+def test_parse_clauses():
+    """Test parsing every operator and literal kind."""
+    predicates = entity_query.parse_query(
+        "domain = sensor and state >= 25.5 and attributes.unit_of_measurement != '°C' "
+        "AND area_id in (kitchen, \"living room\") and entity_id ~ Sensor.*_Temp "
+        "and device_class == null and attributes.on = true"
+    )
+    assert predicates == [
+        Predicate("domain", "=", "sensor"),
+        Predicate("state", ">=", 25.5),
+        Predicate("attributes.unit_of_measurement", "!=", "°C"),
+        Predicate("area_id", "in", ("kitchen", "living room")),
+        Predicate("entity_id", "~", "sensor.*_temp"),
+        Predicate("device_class", "=", None),
+        Predicate("attributes.on", "=", True),
+    ]
+    assert entity_query.parse_query("state>25") == [Predicate("state", ">", 25)]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "",
+        "colour = red",
+        "attributes. = 1",
+        "state",
+        "state = ",
+        "state 25",
+        "state > null",
+        "state = on or state = off",
+        "area_id in kitchen",
+        "area_id in (kitchen",
+        "state = 'unterminated",
+    ],
+)
+def test_parse_errors(query):
+    """Test that malformed queries are rejected with ``QueryError``."""
+    with pytest.raises(entity_query.QueryError):
+        entity_query.parse_query(query)
+
+
+def test_predicate_semantics():
+    """Test numeric coercion, nulls, globs and ranges."""
+    assert Predicate("state", ">", 25).test("25.5")
+    assert not Predicate("state", ">", 25).test("unavailable")
+    assert not Predicate("state", ">", 25).test(None)
+    assert Predicate("state", "=", 21).test("21.0")
+    assert Predicate("state", "<", "b").test("a")
+    assert Predicate("attributes.x", "=", None).test(None)
+    assert Predicate("attributes.x", "!=", None).test(0)
+    assert Predicate("attributes.on", "=", True).test(True)
+    assert not Predicate("attributes.on", "=", True).test(1)
+    assert Predicate("state", "in", ("on", "open")).test("open")
+    assert Predicate("entity_id", "~", "light.kitchen_*").test("Light.Kitchen_Main")
+    assert not Predicate("entity_id", "~", "light.*").test(None)
+
+
+def test_field_index_set_and_remove():
+    """Test that moving and removing entities keeps the index consistent."""
+    index = entity_query.FieldIndex()
+    index.set("light.a", "on")
+    index.set("light.b", "on")
+    index.set("light.a", "off")
+    assert index.lookup(Predicate("state", "=", "on")) == {"light.b"}
+    assert index.lookup(Predicate("state", "in", ("on", "off"))) == {
+        "light.a",
+        "light.b",
+    }
+    index.discard("light.b")
+    index.discard("light.b")
+    assert index.lookup(Predicate("state", "=", "on")) == set()
+    assert index.distinct == 1
+    assert len(index) == 1
+    assert index.get("light.a") == "off"
+    assert index.get("light.b") is None
+
+
+@pytest.fixture
+def indexes():
+    """Return field indexes over a small house."""
+    indexes = {name: entity_query.FieldIndex() for name in entity_query.INDEXED_FIELDS}
+    rows = [
+        ("sensor.kitchen_temp", "sensor", "temperature", "kitchen", "23.5"),
+        ("sensor.office_temp", "sensor", "temperature", "office", "26.1"),
+        ("sensor.office_humidity", "sensor", "humidity", "office", "40"),
+        ("light.kitchen", "light", None, "kitchen", "on"),
+        ("light.office", "light", None, "office", "off"),
+    ]
+    for entity_id, domain, device_class, area_id, state in rows:
+        indexes["domain"].set(entity_id, domain)
+        indexes["device_class"].set(entity_id, device_class)
+        indexes["area_id"].set(entity_id, area_id)
+        indexes["platform"].set(entity_id, "demo")
+        indexes["state"].set(entity_id, state)
+    return indexes
+
+
+def test_plan_uses_lookups_smallest_first(indexes):
+    """Test that exact lookups are intersected and reported."""
+    plan = entity_query.plan_query(
+        entity_query.parse_query("domain = sensor and device_class = temperature"),
+        indexes,
+    )
+    assert plan.candidates == {"sensor.kitchen_temp", "sensor.office_temp"}
+    assert plan.indexed == ["device_class", "domain"]
+    assert plan.residual == []
+
+
+def test_plan_keeps_unindexable_predicates(indexes):
+    """Test that ``!=``, null checks and registry fields stay residual."""
+    predicates = entity_query.parse_query(
+        "domain = light and state != on and device_class = null and device_id = abc"
+    )
+    plan = entity_query.plan_query(predicates, indexes)
+    assert plan.candidates == {"light.kitchen", "light.office"}
+    assert [predicate.field for predicate in plan.residual] == [
+        "state",
+        "device_class",
+        "device_id",
+    ]
+
+
+def test_plan_scans_only_when_cheaper(indexes):
+    """Test that a range scan is skipped once few candidates remain."""
+    plan = entity_query.plan_query(
+        entity_query.parse_query("state > 25"), indexes
+    )
+    assert plan.candidates == {"sensor.office_temp", "sensor.office_humidity"}
+    assert plan.indexed == ["state"]
+
+    plan = entity_query.plan_query(
+        entity_query.parse_query("area_id = kitchen and state > 25"), indexes
+    )
+    assert plan.candidates == {"sensor.kitchen_temp", "light.kitchen"}
+    assert [predicate.field for predicate in plan.residual] == ["state"]
+    assert plan.as_dict() == {
+        "indexed": ["area_id"],
+        "residual": ["state"],
+        "candidates": 2,
+    }
+
+
+def test_plan_does_not_alias_index_sets(indexes):
+    """Test that planning never mutates the indexes."""
+    entity_query.plan_query(
+        entity_query.parse_query("area_id = office and domain = light"), indexes
+    )
+    assert indexes["area_id"].lookup(Predicate("area_id", "=", "office")) == {
+        "sensor.office_temp",
+        "sensor.office_humidity",
+        "light.office",
+    }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,129 @@
+"""Test the history window cache."""
+import pytest
+
+from tests.common import load_component_module
+
+history_cache = load_component_module("history_cache")
+HistoryRow = history_cache.HistoryRow
+
+
+class Clock:
+    """Settable wall clock."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def row(state, at, attributes=None):
+    """Return a state change row at ``at``."""
+    return HistoryRow(state, attributes if attributes is not None else {}, at, at)
+
+
+def states(rows):
+    """Return the states of rows."""
+    return [item.state for item in rows]
+
+
+@pytest.fixture
+def clock():
+    """Return a clock at t=10000."""
+    return Clock(10_000.0)
+
+
+@pytest.fixture
+def cache(clock):
+    """Return a cache with a 1000 second retention."""
+    return history_cache.HistoryCache(max_rows=100, retention=1000, clock=clock)
+
+
+def test_miss_fill_and_hit(cache):
+    """Test that a filled window is answered from memory afterwards."""
+    assert cache.lookup("sensor.a", 9_500, 10_000) is None
+    assert cache.begin_fill("sensor.a")
+    assert not cache.begin_fill("sensor.a")
+    cache.append("sensor.a", row("3", 9_950))
+    history = cache.complete_fill(
+        "sensor.a", 9_500, [row("1", 9_400), row("2", 9_900), row("3", 9_950)]
+    )
+    assert states(history.window(9_500, 10_000)) == ["1", "2", "3"]
+    assert len(history) == 3
+
+    cache.append("sensor.a", row("4", 9_990))
+    assert states(cache.lookup("sensor.a", 9_500, 10_000)) == ["1", "2", "3", "4"]
+    # The state in effect at the start of the window comes first.
+    assert states(cache.lookup("sensor.a", 9_920, 9_960)) == ["2", "3"]
+    assert cache.lookup("sensor.a", 9_000, 10_000) is None
+    stats = cache.as_dict()
+    assert (stats["hits"], stats["misses"], stats["rows"]) == (2, 2, 4)
+
+
+def test_changes_during_fill_are_kept(cache):
+    """Test that changes made while the recorder is queried are not lost."""
+    cache.begin_fill("sensor.a")
+    cache.append("sensor.a", row("late", 9_999))
+    cache.complete_fill("sensor.a", 9_500, [row("1", 9_600)])
+    assert states(cache.lookup("sensor.a", 9_500, 10_000)) == ["1", "late"]
+
+    cache.begin_fill("sensor.b")
+    cache.abort_fill("sensor.b")
+    assert "sensor.b" not in cache
+    cache.append("sensor.b", row("ignored", 9_999))
+    assert cache.lookup("sensor.b", 9_500, 10_000) is None
+
+
+def test_interning_shares_values(cache):
+    """Test that states and repeated attribute mappings are stored once."""
+    attributes = {"unit_of_measurement": "°C"}
+    rows = [
+        row("on" if number % 2 else "off", 9_100 + number, attributes)
+        for number in range(50)
+    ]
+    history = cache.complete_fill("switch.a", 9_100, rows)
+    assert len(history) == 50
+    assert history._states == ["off", "on"]
+    assert len(history._attributes) == 1
+    assert history.window(9_100, 9_200)[-1].attributes is attributes
+
+
+def test_trim_keeps_state_in_effect(cache, clock):
+    """Test retention trimming and the rebuilt tables."""
+    cache.complete_fill(
+        "sensor.a", 9_000, [row(str(n), 9_000 + n * 10) for n in range(40)]
+    )
+    clock.now = 10_300
+    cache.append("sensor.a", row("new", 10_300))
+    history = cache._entities["sensor.a"]
+    assert history.covered_from == 9_300
+    assert history.changed[0] <= 9_300 < history.changed[1]
+    assert states(cache.lookup("sensor.a", 9_300, 10_300))[0] == "30"
+    assert cache.lookup("sensor.a", 9_200, 10_300) is None
+    assert cache.as_dict()["rows"] == len(history)
+    assert len(history._states) == len(history)
+
+
+def test_eviction_is_least_recently_queried(cache):
+    """Test that the row budget evicts whole entities, oldest query first."""
+    for name in ("a", "b", "c"):
+        cache.complete_fill(
+            f"sensor.{name}", 9_500, [row(str(n), 9_500 + n) for n in range(40)]
+        )
+    assert "sensor.a" not in cache
+    assert cache.as_dict()["evictions"] == 1
+    cache.lookup("sensor.b", 9_500, 10_000)
+    cache.complete_fill("sensor.d", 9_500, [row("x", 9_600 + n) for n in range(30)])
+    assert "sensor.b" in cache
+    assert "sensor.c" not in cache
+    assert cache.as_dict()["rows"] <= 100
+
+
+def test_cacheable(cache):
+    """Test that windows older than the retention are not cached."""
+    assert cache.cacheable(9_500)
+    assert not cache.cacheable(8_000)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
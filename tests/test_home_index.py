@@ -0,0 +1,52 @@
+"""Test the registry-backed home index."""
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from tests.common import load_component_module  # noqa: E402
+
+# Importing homeassistant.core replaces time.sleep with a version that fails
+# on the event loop; other tests stall the loop on purpose.
+_sleep = time.sleep
+home_index = load_component_module("home_index")
+time.sleep = _sleep
+
+
+@pytest.mark.asyncio
+async def test_failed_build_is_retried():
+    """Test that a failed build unsubscribes and the next caller rebuilds."""
+    hass = MagicMock()
+    hass.async_create_task.side_effect = lambda coro, name: asyncio.create_task(coro)
+    unsubscribes = []
+
+    def listen(event_type, listener):
+        unsubscribes.append(MagicMock())
+        return unsubscribes[-1]
+
+    hass.bus.async_listen.side_effect = listen
+    index = home_index.HomeIndex(hass)
+
+    with patch.object(
+        home_index.dr, "async_get", side_effect=RuntimeError("registry not loaded")
+    ):
+        with pytest.raises(RuntimeError):
+            await index.async_ensure_ready()
+    assert not index.ready
+    assert unsubscribes
+    assert all(unsubscribe.called for unsubscribe in unsubscribes)
+
+    called = len(unsubscribes)
+    with patch.object(
+        home_index.dr, "async_get", side_effect=RuntimeError("still not loaded")
+    ):
+        with pytest.raises(RuntimeError, match="still not loaded"):
+            await index.async_ensure_ready()
+    assert len(unsubscribes) == 2 * called
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
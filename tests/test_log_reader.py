@@ -0,0 +1,147 @@
+"""Test tailing and searching the Home Assistant log."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.common import load_component_module
+
+log_reader = load_component_module("log_reader")
+
+START = datetime(2025, 1, 15, 8, 0, 0)
+LEVELS = ["INFO", "INFO", "WARNING", "DEBUG", "ERROR"]
+
+
+def entry_line(index, level=None, message=None):
+    """Return one log header line, one second after the previous."""
+    stamp = (START + timedelta(seconds=index)).isoformat(sep=" ", timespec="milliseconds")
+    level = level or LEVELS[index % len(LEVELS)]
+    message = message or f"event {index}"
+    return f"{stamp} {level} (MainThread) [homeassistant.test] {message}\n"
+
+
+def write_log(path, first, count):
+    """Write ``count`` entries starting at ``first``, with a traceback on errors."""
+    lines = []
+    for index in range(first, first + count):
+        lines.append(entry_line(index))
+        if LEVELS[index % len(LEVELS)] == "ERROR":
+            lines.append("Traceback (most recent call last):\n")
+            lines.append(f"ValueError: boom {index}\n")
+    path.write_text("".join(lines))
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    """Return a config dir with a current, a rotated and an old log."""
+    write_log(tmp_path / "home-assistant.log.old", 0, 100)
+    write_log(tmp_path / "home-assistant.log.1", 100, 100)
+    write_log(tmp_path / "home-assistant.log", 200, 20_000)
+    return tmp_path
+
+
+def test_log_files_order(config_dir):
+    """Test that logs are listed newest first."""
+    (config_dir / "home-assistant.log.2").write_text("")
+    (config_dir / "home-assistant.log.fault").write_text("")
+    assert [path.name for path in log_reader.log_files(config_dir)] == [
+        "home-assistant.log",
+        "home-assistant.log.1",
+        "home-assistant.log.2",
+        "home-assistant.log.old",
+    ]
+
+
+def test_date_rotated_logs(tmp_path):
+    """Test that logs rotated at midnight are listed and searched by date."""
+    write_log(tmp_path / "home-assistant.log.2025-01-13", 0, 100)
+    write_log(tmp_path / "home-assistant.log.2025-01-14", 100, 100)
+    write_log(tmp_path / "home-assistant.log", 200, 100)
+    (tmp_path / "home-assistant.log.2025-1-1").write_text("")
+    assert [path.name for path in log_reader.log_files(tmp_path)] == [
+        "home-assistant.log",
+        "home-assistant.log.2025-01-14",
+        "home-assistant.log.2025-01-13",
+    ]
+
+    entries, truncated = log_reader.search(
+        tmp_path,
+        start=START + timedelta(seconds=50),
+        end=START + timedelta(seconds=150),
+        limit=1000,
+    )
+    assert not truncated
+    assert {entry.file for entry in entries} == {
+        "home-assistant.log.2025-01-13",
+        "home-assistant.log.2025-01-14",
+    }
+    assert len(entries) == 101
+
+
+def test_tail_reads_only_the_end(config_dir):
+    """Test the last entries, their tracebacks and the bytes read."""
+    entries = log_reader.tail(config_dir, 3)
+    assert [entry.message.splitlines()[0] for entry in entries] == [
+        "event 20197",
+        "event 20198",
+        "event 20199",
+    ]
+    assert entries[-1].level == "ERROR"
+    assert entries[-1].message.endswith("ValueError: boom 20199")
+    assert entries[-1].logger == "homeassistant.test"
+    assert entries[-1].timestamp == START + timedelta(seconds=20199)
+
+    with log_reader.MappedLog(config_dir / "home-assistant.log") as log:
+        for _ in zip(range(10), log.entries()):
+            pass
+        assert log.bytes_read < 2000 < log.size
+
+
+def test_tail_by_level_crosses_rotated_logs(config_dir):
+    """Test that rotated logs are read when the current one runs out."""
+    (config_dir / "home-assistant.log").write_text(entry_line(300, "ERROR"))
+    entries = log_reader.tail(config_dir, 3, level="ERROR")
+    assert [(entry.file, entry.message.splitlines()[0]) for entry in entries] == [
+        ("home-assistant.log.1", "event 194"),
+        ("home-assistant.log.1", "event 199"),
+        ("home-assistant.log", "event 300"),
+    ]
+    assert log_reader.tail(config_dir, 1, level="CRITICAL") == []
+
+
+def test_search_window_and_pattern(config_dir):
+    """Test regex search bounded by a time window found by bisection."""
+    entries, truncated = log_reader.search(
+        config_dir,
+        pattern=r"boom 100[258]4\b",
+        start=START + timedelta(seconds=10_000),
+        end=START + timedelta(seconds=10_100),
+    )
+    assert [entry.timestamp for entry in entries] == [
+        START + timedelta(seconds=seconds) for seconds in (10_024, 10_054, 10_084)
+    ]
+    assert not truncated
+
+    entries, truncated = log_reader.search(
+        config_dir, level="WARNING", end=START + timedelta(seconds=150), limit=5
+    )
+    assert truncated
+    assert [entry.file for entry in entries] == ["home-assistant.log.1"] * 5
+    assert entries[-1].timestamp == START + timedelta(seconds=149)
+
+    entries, truncated = log_reader.search(config_dir, pattern="nothing", max_scan_bytes=10_000)
+    assert (entries, truncated) == ([], True)
+
+
+def test_offset_after(config_dir):
+    """Test the binary search for the end of a window."""
+    path = config_dir / "home-assistant.log"
+    with log_reader.MappedLog(path) as log:
+        offset = log.offset_after(START + timedelta(seconds=500))
+        line = path.read_bytes()[offset:].split(b"\n", 1)[0]
+        assert line.decode() + "\n" == entry_line(501)
+        assert log.offset_after(START) == 0
+        assert log.offset_after(START + timedelta(days=1)) == log.size
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
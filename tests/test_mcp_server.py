@@ -1,6 +1,10 @@
 """Test the MCP Server functionality."""
+import asyncio
+import os
+import subprocess
 import sys
 import tempfile
+import time
 from pathlib import Path
 
 import pytest
@@ -8,17 +12,12 @@ import pytest
 # Add the parent directory to the path first
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# Import only the mcp_server module directly
-import importlib.util
-
-spec = importlib.util.spec_from_file_location(
-    "mcp_server",
-    Path(__file__).parent.parent / "custom_components" / "ha_mcp_server" / "mcp_server.py"
-)
-mcp_server_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(mcp_server_module)
+# Import the mcp_server module without the Home Assistant package __init__
+from tests.common import load_component_module
 
+mcp_server_module = load_component_module("mcp_server")
 MCPConfigServer = mcp_server_module.MCPConfigServer
+etags = load_component_module("etags")
 
 
 @pytest.fixture
@@ -157,5 +156,154 @@ async def test_file_not_found(mcp_server, temp_config_dir):
         await mcp_server.read_config_file("nonexistent.yaml")
 
 
+@pytest.mark.asyncio
+async def test_read_config_files(mcp_server, temp_config_dir):
+    """Test batch reads by name and glob with per-file errors."""
+    packages = Path(temp_config_dir) / "packages"
+    packages.mkdir()
+    (packages / "lights.yaml").write_text("light: []\n")
+    (packages / "broken.yaml").write_text("light: [\n")
+    (Path(temp_config_dir) / ".storage").mkdir()
+    (Path(temp_config_dir) / ".storage" / "hidden.yaml").write_text("a: 1\n")
+    await mcp_server.write_config_file("settings.json", {"a": 1})
+
+    result = await mcp_server.read_config_files(
+        ["settings.json", "missing.yaml", "../etc/passwd"],
+        pattern="**/*.yaml",
+        concurrency=2,
+    )
+    assert list(result) == [
+        "settings.json",
+        "missing.yaml",
+        "../etc/passwd",
+        "packages/broken.yaml",
+        "packages/lights.yaml",
+    ]
+    assert result["settings.json"] == {"content": {"a": 1}}
+    assert result["packages/lights.yaml"] == {"content": {"light": []}}
+    assert result["missing.yaml"] == {"error": "File missing.yaml not found"}
+    assert "not allowed" in result["../etc/passwd"]["error"]
+    assert "error" in result["packages/broken.yaml"]
+
+
+@pytest.mark.asyncio
+async def test_iter_config_files_streams(mcp_server, temp_config_dir):
+    """Test that the streaming reader yields every file and can stop early."""
+    names = [f"file{index}.json" for index in range(20)]
+    for index, name in enumerate(names):
+        await mcp_server.write_config_file(name, {"index": index})
+
+    seen = {}
+    async for filename, content, error in mcp_server.iter_config_files(names, 4):
+        assert error is None
+        seen[filename] = content["index"]
+    assert seen == {name: index for index, name in enumerate(names)}
+
+    async for _ in mcp_server.iter_config_files(names, 4):
+        break
+
+
+@pytest.mark.asyncio
+async def test_file_etag_and_if_match(mcp_server, temp_config_dir):
+    """Test version tokens and writes that only apply at a given version."""
+    await mcp_server.write_config_file("test.yaml", {"a": 1})
+    path = Path(temp_config_dir) / "test.yaml"
+    etag = await mcp_server.file_etag("test.yaml")
+    assert etag == etags.content_etag(path.read_bytes())
+
+    await mcp_server.write_config_file("test.yaml", {"a": 2}, if_match=etag)
+    assert await mcp_server.file_etag("test.yaml") != etag
+    with pytest.raises(etags.PreconditionFailed):
+        await mcp_server.write_config_file("test.yaml", {"a": 3}, if_match=etag)
+    assert await mcp_server.read_config_file("test.yaml") == {"a": 2}
+
+    with pytest.raises(etags.PreconditionFailed):
+        await mcp_server.write_config_file("new.yaml", {"a": 1}, if_match=etag)
+    assert not (Path(temp_config_dir) / "new.yaml").exists()
+    with pytest.raises(FileNotFoundError):
+        await mcp_server.file_etag("new.yaml")
+    with pytest.raises(ValueError):
+        await mcp_server.file_etag("../etc/passwd")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_set_config_value_keeps_every_update(mcp_server):
+    """Test that read-modify-writes do not lose each other's updates."""
+    await mcp_server.write_config_file("test.json", {})
+    await asyncio.gather(
+        *(
+            mcp_server.set_config_value("test.json", f"key{index}", index)
+            for index in range(10)
+        )
+    )
+    assert await mcp_server.read_config_file("test.json") == {
+        f"key{index}": index for index in range(10)
+    }
+
+    etag = await mcp_server.file_etag("test.json")
+    await mcp_server.set_config_value("test.json", "key0", "a", if_match=etag)
+    with pytest.raises(etags.PreconditionFailed):
+        await mcp_server.set_config_value("test.json", "key0", "b", if_match=etag)
+    assert (await mcp_server.read_config_file("test.json"))["key0"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_writes_replace_files_atomically(mcp_server, temp_config_dir):
+    """Test that writes replace a file's target and keep its mode."""
+    config_dir = Path(temp_config_dir)
+    (config_dir / "real").mkdir()
+    target = config_dir / "real" / "lights.yaml"
+    target.write_text("a: 1\n")
+    os.chmod(target, 0o640)
+    (config_dir / "lights.yaml").symlink_to(target)
+
+    await mcp_server.set_config_value("lights.yaml", "a", 2)
+    assert (config_dir / "lights.yaml").is_symlink()
+    assert target.read_text() == "a: 2\n"
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert sorted(path.name for path in target.parent.iterdir()) == ["lights.yaml"]
+
+
+@pytest.mark.asyncio
+async def test_file_etag_only_rehashes_changed_files(mcp_server, temp_config_dir):
+    """Test that an unchanged file is checked without reading it."""
+    path = Path(temp_config_dir) / "test.yaml"
+    path.write_text("a: 1\n")
+    versions = mcp_server.versions
+
+    # Files changed within the racy window are hashed on every check.
+    first = await mcp_server.file_etag("test.yaml")
+    assert await mcp_server.file_etag("test.yaml") == first
+    assert versions.hits == 0
+
+    stamp = time.time_ns() - 10 * 10**9
+    os.utime(path, ns=(stamp, stamp))
+    assert await mcp_server.file_etag("test.yaml") == first
+    assert await mcp_server.file_etag("test.yaml") == first
+    assert versions.hits == 1
+
+    # Same size, new content: the new mtime alone invalidates the hash.
+    path.write_text("a: 2\n")
+    assert await mcp_server.file_etag("test.yaml") != first
+
+
+def test_module_import_is_lazy():
+    """Test that loading the module does not import aiofiles or yaml."""
+    code = (
+        "import sys\n"
+        "from tests.common import load_component_module\n"
+        "load_component_module('mcp_server')\n"
+        "print('aiofiles' in sys.modules, 'yaml' in sys.modules)\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent.parent,
+    )
+    assert out.stdout.split() == ["False", "False"]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,107 @@
+"""Test the fixed-memory service metrics."""
+
+import pytest
+
+from tests.common import load_component_module
+
+metrics_module = load_component_module("metrics")
+Histogram = metrics_module.Histogram
+MetricsRegistry = metrics_module.MetricsRegistry
+LATENCY_BOUNDS = metrics_module.LATENCY_BOUNDS
+
+
+class FakeClock:
+    """A manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_histogram_percentiles():
+    """Test that percentiles land in the bucket of the ranked observation."""
+    histogram = Histogram((1, 2, 4, 8))
+    for value in (0.5, 1.5, 1.5, 3, 7):
+        histogram.add(value)
+
+    assert histogram.percentile(0.2) == 1
+    assert histogram.percentile(0.5) == 2
+    assert histogram.percentile(1.0) == 8
+    assert histogram.overflow == 0
+    histogram.add(100)
+    assert histogram.percentile(1.0) == 8
+    assert histogram.overflow == 1
+
+
+def test_histogram_empty():
+    """Test that an empty histogram has no percentiles."""
+    assert Histogram((1, 2)).percentile(0.5) is None
+
+
+def test_histogram_memory_is_fixed():
+    """Test that recording does not grow the histogram."""
+    histogram = Histogram(LATENCY_BOUNDS)
+    size = len(histogram.counts)
+    for index in range(10000):
+        histogram.add(index * 1e-4)
+    assert len(histogram.counts) == size
+    assert histogram.total == 10000
+
+
+def test_latency_percentile_accuracy():
+    """Test that reported percentiles are within one bucket of the truth."""
+    registry = MetricsRegistry()
+    for index in range(1, 1001):
+        registry.record("get_entity", index / 1000)
+
+    p50 = registry.get("get_entity").latency_ms(0.50)
+    assert 500 <= p50 <= 500 * 2 ** 0.25
+
+
+def test_latency_overflow_is_finite_and_flagged():
+    """Test that calls slower than the last bucket stay JSON and state safe."""
+    registry = MetricsRegistry()
+    registry.record("get_entity_history", 1000.0)
+
+    summary = registry.as_dict()["get_entity_history"]
+    assert summary["p95_ms"] == round(LATENCY_BOUNDS[-1] * 1000, 3)
+    assert summary["window_overflow"] == 1
+    assert summary["response_bytes"]["overflow"] == 0
+
+
+def test_registry_counts_calls_and_errors():
+    """Test call, error and response size accounting."""
+    registry = MetricsRegistry()
+    registry.record("read_config", 0.010, response_bytes=1000)
+    registry.record("read_config", 0.020, error=True)
+
+    summary = registry.as_dict()["read_config"]
+    assert summary["calls"] == 2
+    assert summary["errors"] == 1
+    assert summary["response_bytes"]["count"] == 1
+    assert summary["response_bytes"]["p50"] == 1024
+
+
+def test_rolling_window_forgets_old_calls():
+    """Test that latency percentiles only cover recent windows."""
+    clock = FakeClock()
+    registry = MetricsRegistry(window=60, clock=clock)
+    registry.record("list_entities", 5.0)
+
+    clock.now = 90
+    registry.record("list_entities", 0.001)
+    assert registry.get("list_entities").latency_ms(0.99) >= 5000
+
+    clock.now = 150
+    registry.record("list_entities", 0.001)
+    assert registry.get("list_entities").latency_ms(0.99) < 5
+    assert registry.get("list_entities").calls == 3
+
+    clock.now = 1000
+    assert registry.get("list_entities").latency_ms(0.5) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,69 @@
+"""Test choosing where configuration files are parsed."""
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import multiprocessing
+
+import pytest
+
+from tests.common import load_component_module
+
+parse_backend = load_component_module("parse_backend")
+mcp_server = load_component_module("mcp_server")
+
+
+def test_mode_by_format_and_size():
+    """Test that only large YAML files go to a process."""
+    backend = parse_backend.ParseBackend()
+    assert backend.mode("a.yaml", 100) == parse_backend.PARSE_INLINE
+    assert backend.mode("a.yaml", 10_000) == parse_backend.PARSE_THREAD
+    assert backend.mode("a.yml", 1_000_000) == parse_backend.PARSE_PROCESS
+    assert backend.mode("a.json", 10_000) == parse_backend.PARSE_INLINE
+    assert backend.mode("a.json", 1_000_000) == parse_backend.PARSE_THREAD
+    assert backend.as_dict()["process_pool"] is False
+
+
+def test_encoding_round_trip():
+    """Test marshal for plain content and the pickle fallback."""
+    plain = {"a": [1, 2.5, "x", None, True], "b": {"c": {}}}
+    encoded = parse_backend._MARSHAL + parse_backend.marshal.dumps(plain)
+    assert parse_backend._decode(encoded) == plain
+
+    when = {"at": datetime.date(2025, 1, 15)}
+    with pytest.raises(ValueError):
+        parse_backend.marshal.dumps(when)
+    encoded = parse_backend._PICKLE + parse_backend.pickle.dumps(when)
+    assert parse_backend._decode(encoded) == when
+
+
+@pytest.mark.asyncio
+async def test_parses_in_each_place(tmp_path):
+    """Test inline, thread and process parsing give the same content."""
+    text = "".join(f"key_{index}: {{value: {index}, at: 2025-01-15}}\n" for index in range(400))
+    (tmp_path / "large.yaml").write_text(text)
+    (tmp_path / "small.yaml").write_text("a: 1\n")
+    expected = parse_backend.parse_content("large.yaml", text)
+
+    executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("fork"))
+    backend = parse_backend.ParseBackend(executor, process_min_bytes=4096)
+    try:
+        for mode in (None, *backend.counts):
+            content = await backend.read_and_parse(tmp_path / "large.yaml", "large.yaml", mode)
+            assert content == expected
+        assert await backend.read_and_parse(tmp_path / "small.yaml", "small.yaml") == {"a": 1}
+        assert backend.counts == {"inline": 2, "thread": 1, "process": 2}
+
+        with pytest.raises(FileNotFoundError, match="missing.yaml not found"):
+            await backend.read_and_parse(tmp_path / "missing.yaml", "missing.yaml")
+
+        server = mcp_server.MCPConfigServer(str(tmp_path), parser=backend)
+        assert await server.read_config_file("large.yaml") == expected
+        result = await server.read_config_files(["large.yaml", "small.yaml"])
+        assert result["large.yaml"] == {"content": expected}
+        assert backend.counts["process"] == 4
+        server.close()
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,106 @@
+"""Test the sampling profiler and slow-call capture."""
+import sys
+import time
+
+import pytest
+
+from tests.common import load_component_module
+
+profiler_module = load_component_module("profiler")
+SamplingProfiler = profiler_module.SamplingProfiler
+
+
+def busy_handler(seconds):
+    """Spin on the CPU so the sampler has something to see."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(100))
+
+
+def test_redact_arguments():
+    """Test that only identifying arguments survive redaction."""
+    redacted = profiler_module.redact_arguments(
+        {"filename": "secrets.yaml", "content": "api_key: hunter2", "value": 1}
+    )
+    assert redacted == {
+        "filename": "secrets.yaml",
+        "content": profiler_module.REDACTED,
+        "value": profiler_module.REDACTED,
+    }
+
+
+def test_collapse_stack_marker():
+    """Test that a marker trims the stack to the handler's frames."""
+    def handle_marker():
+        return inner()
+
+    def inner():
+        return sys._getframe()
+
+    frame = handle_marker()
+    stack = profiler_module.collapse_stack(frame, "handle_marker")
+    assert stack.startswith("handle_marker (")
+    assert stack.split(";")[-1].startswith("inner (")
+    assert profiler_module.collapse_stack(frame, "not_on_stack") is None
+
+
+def test_disabled_profiler_does_not_watch():
+    """Test that nothing is watched while capture is disabled."""
+    profiler = SamplingProfiler()
+    assert profiler.begin_call("read_config", "busy_handler", {}) is None
+    assert profiler.end_call(None) is None
+
+
+def test_slow_call_capture(tmp_path):
+    """Test that a slow call produces collapsed stacks and a sidecar."""
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.configure(True, 0.05)
+    try:
+        token = profiler.begin_call(
+            "read_config", "busy_handler", {"filename": "a.yaml", "content": "x"}
+        )
+        busy_handler(0.2)
+        capture = profiler.end_call(token)
+    finally:
+        profiler.shutdown()
+
+    assert capture is not None
+    assert any("busy_handler" in stack for stack in capture.samples)
+    assert capture.metadata["arguments"]["content"] == profiler_module.REDACTED
+
+    path = capture.write(tmp_path)
+    lines = path.read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert path.with_suffix(".json").exists()
+    assert capture.write(tmp_path) != path
+    assert len(list(tmp_path.glob("*.collapsed"))) == 2
+
+
+def test_fast_call_is_not_captured():
+    """Test that calls under the threshold are discarded."""
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.configure(True, 10)
+    try:
+        token = profiler.begin_call("get_entity", "busy_handler", {})
+        busy_handler(0.01)
+        assert profiler.end_call(token) is None
+    finally:
+        profiler.shutdown()
+
+
+def test_sampling_window():
+    """Test that a window samples whatever the thread runs."""
+    profiler = SamplingProfiler(interval=0.001)
+    try:
+        token = profiler.begin_window()
+        busy_handler(0.1)
+        capture = profiler.end_window(token, 0.1)
+    finally:
+        profiler.shutdown()
+
+    assert sum(capture.samples.values()) > 0
+    assert any("busy_handler" in stack for stack in capture.samples)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,144 @@
+"""Test the admission control scheduler."""
+import asyncio
+
+import pytest
+
+from tests.common import load_component_module
+
+scheduler_module = load_component_module("scheduler")
+AdmissionRejected = scheduler_module.AdmissionRejected
+ClassLimits = scheduler_module.ClassLimits
+CostClass = scheduler_module.CostClass
+OperationScheduler = scheduler_module.OperationScheduler
+
+
+async def hold(scheduler, cost, started, release, order=None, name=None):
+    """Occupy a slot of ``cost`` until ``release`` is set."""
+    async with scheduler.admit(cost):
+        if order is not None:
+            order.append(name)
+        started.set()
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_class_concurrency_limit():
+    """Test that a class never runs more than its concurrency."""
+    scheduler = OperationScheduler(
+        {CostClass.HEAVY: ClassLimits(concurrency=1, queue_size=4)}
+    )
+    release = asyncio.Event()
+    first, second = asyncio.Event(), asyncio.Event()
+    tasks = [
+        asyncio.create_task(hold(scheduler, CostClass.HEAVY, first, release)),
+        asyncio.create_task(hold(scheduler, CostClass.HEAVY, second, release)),
+    ]
+    await first.wait()
+    await asyncio.sleep(0)
+    stats = scheduler.as_dict()["classes"]["heavy"]
+    assert stats["running"] == 1
+    assert stats["queued"] == 1
+    assert not second.is_set()
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.as_dict()["classes"]["heavy"]["admitted"] == 2
+    assert scheduler.as_dict()["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cheap_calls_are_not_blocked_by_heavy():
+    """Test that a saturated heavy class leaves cheap calls alone."""
+    scheduler = OperationScheduler(
+        {CostClass.HEAVY: ClassLimits(concurrency=1, queue_size=4)}
+    )
+    release = asyncio.Event()
+    started = asyncio.Event()
+    heavy = asyncio.create_task(hold(scheduler, CostClass.HEAVY, started, release))
+    await started.wait()
+
+    async with scheduler.admit(CostClass.CHEAP):
+        pass
+
+    release.set()
+    await heavy
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    """Test that a full queue rejects instead of waiting."""
+    scheduler = OperationScheduler(
+        {CostClass.LISTING: ClassLimits(concurrency=1, queue_size=1)}
+    )
+    release = asyncio.Event()
+    started = asyncio.Event()
+    running = asyncio.create_task(hold(scheduler, CostClass.LISTING, started, release))
+    await started.wait()
+    queued = asyncio.create_task(
+        hold(scheduler, CostClass.LISTING, asyncio.Event(), release)
+    )
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected):
+        async with scheduler.admit(CostClass.LISTING):
+            pass
+    assert scheduler.as_dict()["classes"]["listing"]["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+
+
+@pytest.mark.asyncio
+async def test_cheap_waiters_are_admitted_first():
+    """Test that freed global slots go to the cheapest class first."""
+    scheduler = OperationScheduler(total_concurrency=1)
+    release_first = asyncio.Event()
+    started = asyncio.Event()
+    first = asyncio.create_task(
+        hold(scheduler, CostClass.HEAVY, started, release_first)
+    )
+    await started.wait()
+
+    order = []
+    release = asyncio.Event()
+    release.set()
+    heavy = asyncio.create_task(
+        hold(scheduler, CostClass.HEAVY, asyncio.Event(), release, order, "heavy")
+    )
+    await asyncio.sleep(0)
+    cheap = asyncio.create_task(
+        hold(scheduler, CostClass.CHEAP, asyncio.Event(), release, order, "cheap")
+    )
+    await asyncio.sleep(0)
+
+    release_first.set()
+    await asyncio.gather(first, heavy, cheap)
+    assert order == ["cheap", "heavy"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    """Test that cancelling a queued call frees its queue slot."""
+    scheduler = OperationScheduler(
+        {CostClass.HEAVY: ClassLimits(concurrency=1, queue_size=1)}
+    )
+    release = asyncio.Event()
+    started = asyncio.Event()
+    running = asyncio.create_task(hold(scheduler, CostClass.HEAVY, started, release))
+    await started.wait()
+    waiting = asyncio.create_task(
+        hold(scheduler, CostClass.HEAVY, asyncio.Event(), release)
+    )
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    assert scheduler.as_dict()["classes"]["heavy"]["queued"] == 0
+    release.set()
+    await running
+    assert scheduler.as_dict()["running"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
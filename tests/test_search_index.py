@@ -0,0 +1,167 @@
+"""Test the fuzzy search index."""
+import pytest
+
+from tests.common import load_component_module
+
+search_index = load_component_module("search_index")
+
+
+@pytest.fixture
+def index():
+    """Return an index over a few entities."""
+    index = search_index.SearchIndex()
+    index.upsert(
+        "light.kitchen_ceiling",
+        {
+            "entity_id": "light.kitchen_ceiling",
+            "name": "Kitchen Ceiling",
+            "area": "Kitchen",
+            "manufacturer": "Signify",
+            "model": "Hue White",
+        },
+    )
+    index.upsert(
+        "light.living_room_lamp",
+        {"entity_id": "light.living_room_lamp", "name": "Reading Lamp", "area": "Living Room"},
+    )
+    index.upsert(
+        "sensor.kitchen_temperature",
+        {"entity_id": "sensor.kitchen_temperature", "area": "Kitchen"},
+    )
+    index.upsert(
+        "switch.coffee_maker",
+        {"entity_id": "switch.coffee_maker", "name": "Coffee Maker", "area": "Kitchen"},
+    )
+    return index
+
+
+def ids(results):
+    """Return the document ids of search results."""
+    return [doc_id for doc_id, _ in results]
+
+
+def test_tokenize():
+    """Test that text is split into lowercase words."""
+    assert search_index.tokenize("light.Kitchen_Ceiling 2") == [
+        "light",
+        "kitchen",
+        "ceiling",
+        "2",
+    ]
+    assert search_index.tokenize(None) == []
+
+
+def test_exact_match_ranks_first(index):
+    """Test that the document matching every term wins."""
+    results = index.search("kitchen ceiling")
+    assert ids(results) == ["light.kitchen_ceiling"]
+    assert results[0][1] > index.search("kitchen")[-1][1]
+
+
+def test_typo_and_prefix(index):
+    """Test that misspelled and partial words still match."""
+    assert ids(index.search("kitchn celing"))[0] == "light.kitchen_ceiling"
+    assert ids(index.search("temp"))[0] == "sensor.kitchen_temperature"
+    assert ids(index.search("coffe"))[0] == "switch.coffee_maker"
+
+
+def test_fields_are_weighted(index):
+    """Test that a name match beats a match on a minor field."""
+    index.upsert("light.hue_go", {"entity_id": "light.hue_go", "name": "Hue Go"})
+    assert ids(index.search("hue"))[0] == "light.hue_go"
+
+
+def test_stopwords_and_unknown_terms(index):
+    """Test that stopwords are ignored and unknown words do not empty results."""
+    assert ids(index.search("the coffee"))[0] == "switch.coffee_maker"
+    assert ids(index.search("coffee xyzzy"))[0] == "switch.coffee_maker"
+    assert index.search("xyzzy") == []
+    assert index.search("") == []
+
+
+def test_limit_and_accept(index):
+    """Test the result limit and the document filter."""
+    assert len(index.search("kitchen", limit=2)) == 2
+    results = index.search("kitchen", accept=lambda doc_id: doc_id.startswith("light."))
+    assert ids(results) == ["light.kitchen_ceiling"]
+    results = index.search(
+        "kitchen coffee", accept=lambda doc_id: doc_id.startswith("light.")
+    )
+    assert ids(results) == ["light.kitchen_ceiling"]
+
+
+def test_update_and_remove(index):
+    """Test that updates replace old text and removals drop the vocabulary."""
+    index.upsert(
+        "switch.coffee_maker",
+        {"entity_id": "switch.coffee_maker", "name": "Espresso Machine"},
+    )
+    assert ids(index.search("espresso")) == ["switch.coffee_maker"]
+    assert "maker" in search_index.tokenize("switch.coffee_maker")
+    assert ids(index.search("machine")) == ["switch.coffee_maker"]
+
+    index.remove("switch.coffee_maker")
+    assert "switch.coffee_maker" not in index
+    assert index.search("espresso") == []
+    assert len(index) == 3
+    index.remove("switch.coffee_maker")
+
+
+def test_large_index_top_k():
+    """Test ranking over enough documents to exercise the top-k paths."""
+    index = search_index.SearchIndex()
+    for number in range(2000):
+        index.upsert(
+            f"sensor.room_{number}_temperature",
+            {"entity_id": f"sensor.room_{number}_temperature", "area": f"Room {number}"},
+        )
+    index.upsert(
+        "sensor.attic_temperature",
+        {"entity_id": "sensor.attic_temperature", "name": "Attic Temperature"},
+    )
+    assert ids(index.search("temperature", limit=1)) == ["sensor.attic_temperature"]
+    assert ids(index.search("attic temperature", limit=1)) == [
+        "sensor.attic_temperature"
+    ]
+    assert len(index.search("temperature", limit=50)) == 50
+
+
+def test_postings_shrink_back_to_single_documents():
+    """Test that a token shared and then unshared still finds its document."""
+    index = search_index.SearchIndex()
+    index.upsert("light.desk", {"entity_id": "light.desk", "name": "Desk Lamp"})
+    index.upsert("light.floor", {"entity_id": "light.floor", "name": "Floor Lamp"})
+    index.upsert("switch.lamp", {"entity_id": "switch.lamp"})
+    assert set(ids(index.search("lamp"))) == {"light.desk", "light.floor", "switch.lamp"}
+
+    index.remove("light.floor")
+    index.upsert("switch.lamp", {"entity_id": "switch.lamp", "name": "Plug"})
+    assert ids(index.search("floor")) == []
+    assert ids(index.search("lamp")) == ["light.desk", "switch.lamp"]
+    index.remove("light.desk")
+    assert ids(index.search("desk")) == []
+    assert ids(index.search("lamp")) == ["switch.lamp"]
+    index.remove("switch.lamp")
+    assert len(index) == 0
+    assert index.search("lamp") == []
+
+
+def test_restore_from_saved_tokens():
+    """Test that restored tokens search like freshly tokenized ones."""
+    index = search_index.SearchIndex()
+    index.upsert("light.kitchen", {"entity_id": "light.kitchen", "area": "Kitchen"})
+    index.upsert("light.porch", {"entity_id": "light.porch", "name": "Front Porch"})
+    saved = index.doc_tokens()
+
+    restored = search_index.SearchIndex()
+    for doc_id, tokens in saved.items():
+        restored.restore(doc_id, tokens)
+    assert restored.doc_tokens() == saved
+    assert restored.tokens("light.porch") == saved["light.porch"]
+    assert restored.tokens("light.attic") is None
+    for query in ("kitchen", "porch", "frnt porch", "light"):
+        assert restored.search(query) == index.search(query)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
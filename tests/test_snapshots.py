@@ -0,0 +1,150 @@
+"""Test the config snapshot store."""
+import pytest
+
+from tests.common import load_component_module
+
+snapshots = load_component_module("snapshots")
+mcp_server = load_component_module("mcp_server")
+
+
+def large_config(marker):
+    """Return a config file big enough to be stored as a delta."""
+    lines = [f"sensor_{index}:\n  name: Sensor {index}\n" for index in range(4000)]
+    lines[2000] = f"marker: {marker}\n"
+    return "".join(lines).encode()
+
+
+def test_delta_round_trip():
+    """Test that deltas rebuild inserts, deletes and edits exactly."""
+    base = b"a\nb\nc\nd\n"
+    for target in (b"a\nb\nc\nd\n", b"x\nb\nd\ne", b"", b"a\nb\nc\nd\ne\n"):
+        assert snapshots.apply_delta(base, snapshots.make_delta(base, target)) == target
+
+
+def test_record_dedups_and_reads_back(tmp_path):
+    """Test that identical content is stored once and versions read back."""
+    store = snapshots.SnapshotStore(tmp_path)
+    first = store.record("configuration.yaml", b"name: Home\n")
+    again = store.record("configuration.yaml", b"name: Home\n")
+    assert again == first
+    store.record("configuration.yaml", b"name: Cabin\n")
+    store.record("configuration.yaml", b"name: Home\n", "rollback")
+    store.record("copy.yaml", b"name: Home\n")
+
+    assert [version.version for version in store.versions("configuration.yaml")] == [
+        1,
+        2,
+        3,
+    ]
+    assert store.read("configuration.yaml", 3) == b"name: Home\n"
+    assert store.stats()["objects"] == 2
+    assert "-name: Cabin\n+name: Home\n" in store.diff("configuration.yaml", 2, 3)
+    with pytest.raises(snapshots.SnapshotError):
+        store.read("configuration.yaml", 9)
+
+    # A fresh store reads the same history from the index.
+    reopened = snapshots.SnapshotStore(tmp_path)
+    assert reopened.latest("configuration.yaml").source == "rollback"
+    assert reopened.read("copy.yaml", 1) == b"name: Home\n"
+
+
+def test_large_files_are_delta_chained(tmp_path):
+    """Test that versions of large files are stored as small deltas."""
+    store = snapshots.SnapshotStore(tmp_path)
+    for marker in range(5):
+        store.record("big.yaml", large_config(marker))
+    stats = store.stats()
+    assert stats["deltas"] == 4
+    for version in range(1, 6):
+        assert store.read("big.yaml", version) == large_config(version - 1)
+
+
+def test_prune_releases_unreferenced_objects(tmp_path):
+    """Test that pruning deletes objects once nothing needs them."""
+    store = snapshots.SnapshotStore(tmp_path, keep_versions=2)
+    for marker in range(4):
+        store.record("big.yaml", large_config(marker))
+    assert [version.version for version in store.versions("big.yaml")] == [3, 4]
+    # Version 3 is a delta, so the chain it is built on is still kept.
+    assert store.read("big.yaml", 3) == large_config(2)
+
+    store.record("small.yaml", b"a: 1\n")
+    store.record("small.yaml", b"a: 2\n")
+    store.record("small.yaml", b"a: 3\n")
+    assert store.versions("small.yaml")[0].version == 2
+    objects = list((tmp_path / "objects").rglob("*"))
+    assert sum(path.is_file() for path in objects) == store.stats()["objects"]
+
+
+def test_prune_by_age_keeps_latest(tmp_path):
+    """Test that age pruning never drops the latest version."""
+    store = snapshots.SnapshotStore(tmp_path, max_age=0)
+    store.record("a.yaml", b"1\n")
+    store.record("a.yaml", b"2\n")
+    assert [version.version for version in store.versions("a.yaml")] == [2]
+
+
+@pytest.mark.asyncio
+async def test_server_snapshots_writes_and_rolls_back(tmp_path):
+    """Test that writes are versioned and a rollback restores the file."""
+    (tmp_path / "automations.yaml").write_text("- id: original\n")
+    (tmp_path / "settings.json").write_text("{}")
+    server = mcp_server.MCPConfigServer(
+        str(tmp_path), snapshots=snapshots.SnapshotStore(tmp_path / ".snapshots")
+    )
+    await server.write_config_file("automations.yaml", "- id: first\n")
+    await server.set_config_value("settings.json", "a.b", 1)
+
+    versions = await server.list_config_versions("automations.yaml")
+    assert [(version["version"], version["source"]) for version in versions] == [
+        (1, "external"),
+        (2, "write"),
+    ]
+    diff = await server.diff_config_versions("automations.yaml", 1)
+    assert "+- id: first" in diff
+
+    assert await server.rollback_config_file("automations.yaml", 1) == 3
+    assert (tmp_path / "automations.yaml").read_text() == "- id: original\n"
+    assert len(await server.list_config_versions("./settings.json")) == 2
+
+    with pytest.raises(ValueError):
+        await server.rollback_config_file("../outside.yaml", 1)
+    with pytest.raises(ValueError):
+        await mcp_server.MCPConfigServer(str(tmp_path)).list_config_versions("a.yaml")
+
+
+@pytest.mark.asyncio
+async def test_damaged_index_does_not_block_writes(tmp_path):
+    """Test that a bad index is moved aside and writes still go through."""
+    root = tmp_path / ".snapshots"
+    root.mkdir()
+    (root / "index.json").write_text("{not json")
+    server = mcp_server.MCPConfigServer(
+        str(tmp_path), snapshots=snapshots.SnapshotStore(root)
+    )
+    await server.write_config_file("a.yaml", "a: 1\n")
+    assert (tmp_path / "a.yaml").read_text() == "a: 1\n"
+    assert len(list(root.glob("index.json.corrupt-*"))) == 1
+    assert len(await server.list_config_versions("a.yaml")) == 1
+
+    store = snapshots.SnapshotStore(root)
+    (root / "index.json").write_text('{"version": 99}')
+    assert store.versions("a.yaml") == []
+
+
+@pytest.mark.asyncio
+async def test_snapshot_failure_does_not_fail_write(tmp_path, monkeypatch):
+    """Test that a write is reported as done even if snapshotting fails."""
+    store = snapshots.SnapshotStore(tmp_path / ".snapshots")
+    server = mcp_server.MCPConfigServer(str(tmp_path), snapshots=store)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "record", fail)
+    assert await server.write_config_file("a.yaml", "a: 1\n")
+    assert (tmp_path / "a.yaml").read_text() == "a: 1\n"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
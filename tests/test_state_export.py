@@ -0,0 +1,110 @@
+"""Test streaming state exports and the change log behind deltas."""
+from datetime import datetime, timezone
+
+import pytest
+
+from tests.common import load_component_module
+
+state_export = load_component_module("state_export")
+
+
+def test_change_log_deltas():
+    """Test changes and removals since a revision, oldest first."""
+    changes = state_export.ChangeLog()
+    changes.touch("entity", "light.a")
+    changes.touch("entity", "light.b")
+    changes.touch("device", "d1")
+    token = changes.token()
+    since = changes.since(token)
+    assert since == 3
+
+    changes.touch("entity", "light.a")
+    changes.remove("entity", "light.b")
+    changes.remove("entity", "light.b")
+    changes.touch("area", "kitchen")
+    assert changes.changed_since(since) == [("entity", "light.a"), ("area", "kitchen")]
+    assert changes.removed_since(since) == [("entity", "light.b")]
+    assert changes.changed_since(changes.revision) == []
+
+    changes.touch("entity", "light.b")
+    assert changes.removed_since(since) == []
+    assert changes.changed_since(since)[-1] == ("entity", "light.b")
+
+
+def test_change_log_rejects_unusable_tokens():
+    """Test that foreign, future and forgotten revisions need a full export."""
+    changes = state_export.ChangeLog(max_removed=2)
+    changes.touch("entity", "light.a")
+    assert changes.since("00000000-1") is None
+    assert changes.since(f"{changes.epoch}-99") is None
+    assert changes.since("garbage") is None
+
+    token = changes.token()
+    for index in range(3):
+        changes.remove("entity", f"light.gone_{index}")
+    assert changes.since(token) is None
+    assert changes.since(changes.token()) == changes.revision
+
+
+def test_change_log_kind_tokens():
+    """Test that a kind's token only changes with records of that kind."""
+    changes = state_export.ChangeLog()
+    devices = changes.kind_token("device")
+    entities = changes.kind_token("entity")
+    changes.touch("entity", "light.a")
+    assert changes.kind_token("device") == devices
+    assert changes.kind_token("entity") != entities
+
+    entities = changes.kind_token("entity")
+    changes.remove("device", "d1")
+    assert changes.kind_token("entity") == entities
+    assert changes.kind_token("device") != devices
+
+
+def test_writer_streams_and_replaces_atomically(tmp_path):
+    """Test a chunked JSONL export round trip."""
+    path = tmp_path / "exports" / state_export.export_filename("jsonl", delta=False)
+    writer = state_export.SnapshotWriter(path, "jsonl", default=lambda value: value.isoformat())
+    writer.write([{"type": "header", "version": 1}])
+    assert not path.exists()
+    when = datetime(2025, 1, 15, tzinfo=timezone.utc)
+    for chunk in range(3):
+        writer.write(
+            {"type": "entity", "entity_id": f"sensor.s{chunk}_{index}", "at": when}
+            for index in range(100)
+        )
+    size = writer.close()
+    assert writer.records == 301
+    assert size == path.stat().st_size
+    assert list(path.parent.iterdir()) == [path]
+
+    records = list(state_export.read_snapshot(path))
+    assert records[0] == {"type": "header", "version": 1}
+    assert records[-1] == {
+        "type": "entity",
+        "entity_id": "sensor.s2_99",
+        "at": "2025-01-15T00:00:00+00:00",
+    }
+    assert len(records) == 301
+
+
+def test_writer_abort_and_formats(tmp_path):
+    """Test that aborted exports leave nothing behind and bad formats fail."""
+    path = tmp_path / "snapshot.jsonl.gz"
+    writer = state_export.SnapshotWriter(path)
+    writer.write([{"a": 1}])
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+    with pytest.raises(ValueError):
+        state_export.SnapshotWriter(path, "csv")
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        with pytest.raises(ValueError):
+            state_export.SnapshotWriter(tmp_path / "snapshot.msgpack.gz", "msgpack")
+    assert list(tmp_path.iterdir()) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
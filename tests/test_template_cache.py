@@ -0,0 +1,81 @@
+"""Test the compiled template cache and batch rendering."""
+import pytest
+
+from tests.common import load_component_module
+
+template_cache = load_component_module("template_cache")
+
+
+class Compiler:
+    """Compile ``str.format`` templates, counting compilations."""
+
+    def __init__(self):
+        """Initialize the counter."""
+        self.compiled = []
+
+    def __call__(self, source):
+        """Compile ``source``; a source containing ``{{`` is a syntax error."""
+        self.compiled.append(source)
+        if "{{" in source:
+            raise ValueError(f"Invalid template: {source}")
+        return source.format
+
+
+def test_cache_evicts_least_recently_used():
+    """Test hits, misses and LRU eviction."""
+    compiler = Compiler()
+    cache = template_cache.TemplateCache(max_size=2)
+    assert cache.get("a", compiler)[1] is False
+    assert cache.get("b", compiler)[1] is False
+    assert cache.get("a", compiler)[1] is True
+    cache.get("c", compiler)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert compiler.compiled == ["a", "b", "c"]
+    assert cache.as_dict() == {
+        "templates": 2,
+        "max_size": 2,
+        "hits": 1,
+        "misses": 3,
+        "evictions": 1,
+    }
+
+    with pytest.raises(ValueError):
+        cache.get("{{", compiler)
+    assert "{{" not in cache
+
+
+def test_render_batch():
+    """Test shared renders of duplicates and per-template errors."""
+    compiler = Compiler()
+    cache = template_cache.TemplateCache()
+    renders = []
+
+    def render(template):
+        renders.append(template)
+        return template(power=21, factor=2)
+
+    sources = ["{power}", "{factor}x", "{{", "{missing}", "{power}"]
+    results = template_cache.render_batch(cache, sources, compiler, render)
+    assert [result.result for result in results] == ["21", "2x", None, None, "21"]
+    assert results[2].error == "Invalid template: {{"
+    assert results[3].error == "'missing'"
+    assert results[0] is results[4]
+    assert len(renders) == 3
+    assert all(result.render_time >= 0 for result in results)
+
+    again = template_cache.render_batch(cache, ["{power}"], compiler, render)
+    assert again[0].cached and again[0].compile_time == 0
+    assert compiler.compiled.count("{power}") == 1
+    assert again[0].as_dict() == {
+        "template": "{power}",
+        "result": "21",
+        "cached": True,
+        "compile_ms": 0.0,
+        "render_ms": round(again[0].render_time * 1000, 3),
+    }
+    assert results[2].as_dict()["error"] == "Invalid template: {{"
+    assert "result" not in results[2].as_dict()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
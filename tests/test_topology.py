@@ -0,0 +1,94 @@
+"""Test the area/device/entity graph."""
+import pytest
+
+from tests.common import load_component_module
+
+topology = load_component_module("topology")
+DeviceNode = topology.DeviceNode
+
+
+def describe(entity_id):
+    """Describe an entity by id only."""
+    return {"entity_id": entity_id}
+
+
+def entity_ids(nodes):
+    """Return the ids of described entities."""
+    return [node["entity_id"] for node in nodes]
+
+
+@pytest.fixture
+def graph():
+    """Return a graph of a small house."""
+    graph = topology.TopologyGraph()
+    graph.set_area("kitchen", "Kitchen")
+    graph.set_area("office", "Office")
+    graph.set_device("hub", DeviceNode("Hub", "Acme", "H1", None))
+    graph.set_device("fridge", DeviceNode("Fridge", "Acme", "F2", "kitchen"))
+    graph.set_entity("sensor.fridge_temp", "Fridge Temp", "fridge", None)
+    # Overrides the device's area.
+    graph.set_entity("light.fridge_lamp", None, "fridge", "office")
+    graph.set_entity("sensor.hub_uptime", "Uptime", "hub", None)
+    graph.set_entity("switch.desk", "Desk", None, "office")
+    graph.set_entity("sun.sun", None, None, None)
+    return graph
+
+
+def test_effective_area(graph):
+    """Test that entities inherit their device's area unless they set one."""
+    assert graph.entity_area("sensor.fridge_temp") == "kitchen"
+    assert graph.entity_area("light.fridge_lamp") == "office"
+    assert graph.entity_area("sensor.hub_uptime") is None
+    assert graph.area_entities("office") == {"light.fridge_lamp", "switch.desk"}
+    assert graph.area_entities("kitchen") == {"sensor.fridge_temp"}
+    assert graph.device_entities("fridge") == {
+        "sensor.fridge_temp",
+        "light.fridge_lamp",
+    }
+
+
+def test_tree_places_every_entity_once(graph):
+    """Test where each entity lands in the tree."""
+    assert graph.sorted_areas() == ["kitchen", "office"]
+    kitchen = graph.area_tree("kitchen", describe)
+    assert kitchen["name"] == "Kitchen"
+    assert [device["device_id"] for device in kitchen["devices"]] == ["fridge"]
+    assert entity_ids(kitchen["devices"][0]["entities"]) == ["sensor.fridge_temp"]
+    assert kitchen["entities"] == []
+
+    office = graph.area_tree("office", describe)
+    assert office["devices"] == []
+    assert entity_ids(office["entities"]) == ["light.fridge_lamp", "switch.desk"]
+
+    assert graph.unassigned_devices() == ["hub"]
+    hub = graph.device_tree("hub", describe, None)
+    assert hub["manufacturer"] == "Acme"
+    assert entity_ids(hub["entities"]) == ["sensor.hub_uptime"]
+    assert graph.unassigned_entities() == ["sun.sun"]
+
+
+def test_moves_and_removals(graph):
+    """Test that moving devices and entities updates the edges."""
+    graph.set_device("fridge", DeviceNode("Fridge", "Acme", "F2", "office"))
+    assert graph.entity_area("sensor.fridge_temp") == "office"
+    assert graph.sorted_areas() == ["kitchen", "office"]
+    assert graph.area_tree("kitchen", describe)["devices"] == []
+
+    graph.set_entity("sun.sun", "Sun", None, "office")
+    assert graph.unassigned_entities() == []
+    graph.set_entity("switch.desk", "Desk", None, None)
+    assert graph.unassigned_entities() == ["switch.desk"]
+
+    graph.remove_entity("switch.desk")
+    assert "switch.desk" not in graph.entity_names
+    assert graph.unassigned_entities() == []
+    graph.set_area("kitchen", None)
+    assert graph.sorted_areas() == ["office"]
+
+    graph.set_device("fridge", None)
+    assert graph.entity_area("sensor.fridge_temp") is None
+    assert graph.area_entities("office") == {"light.fridge_lamp", "sun.sun"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,150 @@
+"""Test the tracing spans."""
+import asyncio
+import json
+
+import pytest
+
+from tests.common import load_component_module
+
+tracing = load_component_module("tracing")
+MCPConfigServer = load_component_module("mcp_server").MCPConfigServer
+
+
+def test_disabled_tracer_returns_noop_span():
+    """Test that a tracer without exporter records nothing."""
+    tracer = tracing.Tracer()
+    assert not tracer.enabled
+    with tracer.span("anything", key="value") as span:
+        span.set_attribute("more", 1)
+    assert span is tracing.NOOP_SPAN
+
+
+def test_nested_spans_share_trace():
+    """Test that child spans link to their parent."""
+    exporter = tracing.RingBufferExporter()
+    tracer = tracing.Tracer(exporter)
+    with tracer.span("outer"):
+        with tracer.span("inner"):
+            pass
+
+    inner, outer = exporter.spans()
+    assert inner["parent_id"] == outer["span_id"]
+    assert inner["trace_id"] == outer["trace_id"]
+    assert outer["parent_id"] is None
+
+
+
+def test_otlp_file_exporter_rolls_over(tmp_path):
+    """Test that the trace file is capped and rolled over to ``.1``."""
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing.OTLPFileExporter(path, max_bytes=1000)
+    tracer = tracing.Tracer(exporter)
+    for index in range(20):
+        with tracer.span("op", index=index):
+            pass
+        exporter.flush()
+        assert path.stat().st_size <= 1000
+    rolled = tmp_path / "traces.jsonl.1"
+    assert rolled.stat().st_size <= 1000
+    assert sorted(tmp_path.iterdir()) == [path, rolled]
+
+    def indexes(file):
+        return [
+            json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0][
+                "attributes"
+            ][0]["value"]
+            for line in file.read_text().splitlines()
+        ]
+
+    assert indexes(path)[-1] == {"intValue": "19"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_get_separate_traces():
+    """Test that spans in concurrent tasks do not nest into each other."""
+    exporter = tracing.RingBufferExporter()
+    tracer = tracing.Tracer(exporter)
+
+    async def operation(name):
+        with tracer.span(name):
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(operation("a"), operation("b"))
+    spans = exporter.spans()
+    assert {span["parent_id"] for span in spans} == {None}
+    assert spans[0]["trace_id"] != spans[1]["trace_id"]
+
+
+def test_span_records_error():
+    """Test that an exception marks the span."""
+    exporter = tracing.RingBufferExporter()
+    tracer = tracing.Tracer(exporter)
+    with pytest.raises(KeyError):
+        with tracer.span("lookup"):
+            raise KeyError("missing")
+    assert exporter.spans()[0]["error"].startswith("KeyError")
+
+
+def test_ring_buffer_is_bounded():
+    """Test that the ring buffer keeps only the newest spans."""
+    exporter = tracing.RingBufferExporter(maxlen=3)
+    tracer = tracing.Tracer(exporter)
+    for index in range(10):
+        with tracer.span(f"span_{index}"):
+            pass
+    assert [span["name"] for span in exporter.spans()] == ["span_7", "span_8", "span_9"]
+
+
+def test_otlp_file_exporter(tmp_path):
+    """Test that flushed spans form an OTLP/JSON request."""
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing.OTLPFileExporter(path)
+    tracer = tracing.Tracer(exporter)
+    with tracer.span("outer", filename="a.yaml"):
+        with tracer.span("inner"):
+            pass
+    assert exporter.pending == 2
+    exporter.flush()
+    exporter.flush()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    request = json.loads(lines[0])
+    spans = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["inner", "outer"]
+    assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+    assert spans[1]["attributes"] == [
+        {"key": "filename", "value": {"stringValue": "a.yaml"}}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_set_config_value_phases(tmp_path):
+    """Test that set_config_value records each of its phases."""
+    exporter = tracing.RingBufferExporter()
+    server = MCPConfigServer(str(tmp_path), tracer=tracing.Tracer(exporter))
+    await server.write_config_file("test.yaml", {"a": {"b": 1}})
+    exporter._spans.clear()
+
+    await server.set_config_value("test.yaml", "a.b", 2)
+
+    spans = exporter.spans()
+    names = [span["name"] for span in spans]
+    assert names == [
+        "resolve_path",
+        "read",
+        "parse",
+        "read_config_file",
+        "update",
+        "resolve_path",
+        "serialize",
+        "write",
+        "write_config_file",
+        "set_config_value",
+    ]
+    root = spans[-1]
+    assert {span["trace_id"] for span in spans} == {root["trace_id"]}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
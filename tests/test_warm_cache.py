@@ -0,0 +1,85 @@
+"""Test the binary cache derived indexes are persisted in."""
+import pytest
+
+from tests.common import load_component_module
+
+warm_cache = load_component_module("warm_cache")
+
+
+def test_round_trip_and_versions(tmp_path):
+    """Test that sections are saved and read back at their own version."""
+    path = tmp_path / ".storage" / "warm_cache"
+    cache = warm_cache.WarmCache(path)
+    assert cache.get("index", 1) is None
+    assert cache.save() is False
+
+    data = {"light.kitchen": ((("name", "Kitchen"), ("area", None)), {"kitchen": 3.0})}
+    cache.put("index", 1, data)
+    cache.put("files", 2, {"configuration.yaml": (1, 2, [("a", 1)], [], None)})
+    assert cache.save() is True
+    assert cache.save() is False
+    assert list(path.parent.iterdir()) == [path]
+
+    reloaded = warm_cache.WarmCache(path)
+    assert reloaded.get("index", 1) == data
+    assert reloaded.get("index", 2) is None
+    assert reloaded.get("files", 2)["configuration.yaml"][2] == [("a", 1)]
+    assert reloaded.as_dict()["index"]["version"] == 1
+
+
+def test_untouched_sections_are_kept(tmp_path):
+    """Test that saving one section writes the others back unchanged."""
+    path = tmp_path / "warm_cache"
+    cache = warm_cache.WarmCache(path)
+    cache.put("a", 1, [1, 2, 3])
+    cache.put("b", 1, "unchanged")
+    cache.save()
+
+    cache = warm_cache.WarmCache(path)
+    cache.put("a", 1, [4])
+    cache.save()
+    reloaded = warm_cache.WarmCache(path)
+    assert reloaded.get("a", 1) == [4]
+    assert reloaded.get("b", 1) == "unchanged"
+
+
+def test_damaged_and_foreign_files_read_as_empty(tmp_path):
+    """Test that unusable files are ignored, and then replaced."""
+    path = tmp_path / "warm_cache"
+    cache = warm_cache.WarmCache(path)
+    cache.put("a", 1, {"x": 1})
+    cache.save()
+    data = path.read_bytes()
+
+    path.write_bytes(data[:-5])
+    assert warm_cache.WarmCache(path).get("a", 1) is None
+
+    path.write_bytes(data[:-5] + b"junk!")
+    assert warm_cache.WarmCache(path).get("a", 1) is None
+
+    path.write_bytes(b"not a cache")
+    cache = warm_cache.WarmCache(path)
+    assert cache.get("a", 1) is None
+    cache.put("a", 1, {"x": 2})
+    cache.save()
+    assert warm_cache.WarmCache(path).get("a", 1) == {"x": 2}
+
+
+def test_nothing_is_read_before_first_use(tmp_path):
+    """Test that the file is only opened when a section is asked for."""
+    path = tmp_path / "warm_cache"
+    cache = warm_cache.WarmCache(path)
+    path.write_bytes(b"")
+    assert cache.as_dict() == {}
+    assert not cache._loaded
+    assert cache.get("a", 1) is None
+    assert cache._loaded
+
+    in_memory = warm_cache.WarmCache(None)
+    in_memory.put("a", 1, [1])
+    assert in_memory.get("a", 1) == [1]
+    assert in_memory.save() is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,67 @@
+"""Test the event loop lag watchdog."""
+import asyncio
+import time
+
+import pytest
+
+from tests.common import load_component_module
+
+watchdog = load_component_module("watchdog")
+
+
+def parse_content():
+    """Block the event loop where the watchdog sees a parse phase."""
+    time.sleep(0.15)
+
+
+@pytest.mark.asyncio
+async def test_stall_attributed_to_call_and_phase():
+    """Test that a blocking call is recorded with its service and phase."""
+    dog = watchdog.LoopWatchdog(interval=0.01, threshold=0.05, capacity=2)
+    dog.start(asyncio.get_running_loop())
+    try:
+        await asyncio.sleep(0.05)
+        token = dog.begin_call("read_config", {"filename": "a.yaml", "content": "x"})
+        parse_content()
+        await asyncio.sleep(0.05)
+        dog.end_call(token)
+    finally:
+        dog.stop()
+
+    assert dog.stalls == 1
+    stall = dog.recent[-1]
+    assert stall.service == "read_config"
+    assert stall.phase == "parse"
+    assert stall.arguments == {"filename": "a.yaml", "content": "**REDACTED**"}
+    assert stall.samples >= 1
+    assert stall.duration >= 0.1
+    assert dog.by_service()["read_config"]["stalls"] == 1
+    assert dog.lag_ms() >= 100
+
+
+@pytest.mark.asyncio
+async def test_unattributed_stalls_and_bounded_buffers():
+    """Test stalls outside calls and that only the worst ones are kept."""
+    dog = watchdog.LoopWatchdog(interval=0.01, threshold=0.03, capacity=2)
+    dog.start(asyncio.get_running_loop())
+    try:
+        for seconds in (0.06, 0.15, 0.09):
+            await asyncio.sleep(0.03)
+            time.sleep(seconds)
+        await asyncio.sleep(0.03)
+    finally:
+        dog.stop()
+
+    assert dog.stalls == 3
+    worst = dog.worst()
+    assert len(worst) == 2
+    assert worst[0].duration > worst[1].duration > 0.06
+    assert all(stall.service is None and stall.phase is None for stall in worst)
+    assert len(dog.recent) == 2
+    summary = dog.as_dict()
+    assert summary["stalls"] == 3
+    assert summary["recent"][0]["duration_ms"] >= 80
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])